@@ -1,132 +1,275 @@
-from flask import Flask, render_template, jsonify
-from flask_caching import Cache
-import requests
+from flask import Flask, Response, g, render_template, jsonify, request
 import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
-from typing import Dict, List, Optional
+from feishu_transport import (
+    RECORD_ID_PAGE_SIZE, FeishuAPIError, FeishuTransport, changed_records_search, page_params,
+    record_ids_params, records_page, records_path
+)
+from article_store import ArticleSnapshot, ArticleStore, records_to_articles
+from article_sync import IncrementalArticleSync
+from snapshot_file import SharedSnapshotFile
+from response_cache import VersionedResponseCache
+from search_index import SearchIndex
+from recommender import RelatedArticles
+from article_api import ArticleQueryError, build_list_body, make_cached_response, parse_list_query, summarize
+from metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, REGISTRY, TEMPLATE_RENDER_SECONDS, register_store_metrics
+from typing import Callable, Dict, Hashable, Iterator, List, Optional
 
 app = Flask(__name__)
 app.config.from_object(Config)
-cache = Cache(app)
 
 class FeishuAPI:
-    def __init__(self, app_id: str, app_secret: str):
-        self.app_id = app_id
-        self.app_secret = app_secret
-        self.base_url = "https://open.feishu.cn/open-apis"
-        self.access_token = None
+    def __init__(self, transport: FeishuTransport, page_size: int = 100, prefetch_workers: int = 2):
+        # 凭据只保存在 transport 中
+        self.transport = transport
+        self.base_url = self.transport.base_url
+        self.page_size = page_size
+        # 最近若干页的拉取耗时，用于评估合适的分页大小
+        self.page_latencies = deque(maxlen=100)
+        self._prefetch_pool = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix='feishu-prefetch') if prefetch_workers > 0 else None
+    
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.transport.token
     
     def get_access_token(self) -> Optional[str]:
         """获取飞书访问令牌"""
-        url = f"{self.base_url}/auth/v3/tenant_access_token/internal"
-        payload = {
-            "app_id": self.app_id,
-            "app_secret": self.app_secret
-        }
-        
         try:
-            response = requests.post(url, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("code") == 0:
-                self.access_token = data.get("tenant_access_token")
-                return self.access_token
-            else:
-                app.logger.error(f"获取访问令牌失败: {data.get('msg')}")
-                return None
-        except requests.RequestException as e:
-            app.logger.error(f"请求访问令牌时发生错误: {str(e)}")
+            return self.transport.get_token()
+        except FeishuAPIError as e:
+            app.logger.error(str(e))
             return None
     
-    def get_table_records(self, base_id: str, table_id: str) -> List[Dict]:
-        """获取多维表格记录"""
-        if not self.access_token:
-            if not self.get_access_token():
-                return []
+    def _fetch_records_page(self, base_id: str, table_id: str, page_size: int, page_token: Optional[str], params: Optional[Dict] = None, search: Optional[Dict] = None) -> Dict:
+        """拉取多维表格的一页记录，返回接口的 data 部分
+        
+        传入 search 时调用记录搜索接口（POST .../records/search），search 为请求体。
+        """
+        path = records_path(base_id, table_id)
+        params = page_params(params, page_size, page_token)
+        
+        started = time.perf_counter()
+        if search is None:
+            data = self.transport.request('GET', path, params=params)
+        else:
+            data = self.transport.request('POST', f"{path}/search", params=params, json=search)
+        elapsed = time.perf_counter() - started
+        
+        page = records_page(data)
+        item_count = len(page.get("items") or [])
+        self.page_latencies.append({"page_size": page_size, "items": item_count, "seconds": elapsed})
+        app.logger.debug(f"拉取表格记录一页: {item_count} 条, 耗时 {elapsed * 1000:.1f} ms (page_size={page_size})")
+        return page
+    
+    def iter_record_pages(self, base_id: str, table_id: str, page_size: Optional[int] = None, params: Optional[Dict] = None, search: Optional[Dict] = None) -> Iterator[List[Dict]]:
+        """逐页产出多维表格记录
         
-        url = f"{self.base_url}/bitable/v1/apps/{base_id}/tables/{table_id}/records"
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
-        }
+        下一页的 page_token 只能从上一页得到，因此预取深度为一页：
+        拿到当前页后立即在线程池中请求下一页，再把当前页交给调用方处理。
+        """
+        page_size = page_size or self.page_size
         
+        def fetch(page_token: Optional[str]):
+            if self._prefetch_pool:
+                return self._prefetch_pool.submit(self._fetch_records_page, base_id, table_id, page_size, page_token, params, search)
+            return self._fetch_records_page(base_id, table_id, page_size, page_token, params, search)
+        
+        pending = fetch(None)
+        try:
+            while pending is not None:
+                page = pending.result() if self._prefetch_pool else pending
+                page_token = page.get("page_token")
+                pending = fetch(page_token) if page.get("has_more") and page_token else None
+                yield page.get("items") or []
+        finally:
+            if pending is not None and self._prefetch_pool:
+                pending.cancel()
+    
+    def iter_table_records(self, base_id: str, table_id: str, page_size: Optional[int] = None, automatic_fields: bool = False) -> Iterator[Dict]:
+        """逐条产出多维表格的全部记录（自动翻页）
+        
+        automatic_fields 为 True 时记录中会带上 last_modified_time 等系统字段。
+        """
+        params = {"automatic_fields": "true"} if automatic_fields else None
+        for items in self.iter_record_pages(base_id, table_id, page_size, params=params):
+            yield from items
+    
+    def iter_changed_records(self, base_id: str, table_id: str, modified_field: str, since_ms: int, page_size: Optional[int] = None) -> Iterator[Dict]:
+        """逐条产出 modified_field 的日期晚于 since_ms 所在日期的记录（见 changed_records_search）"""
+        search = changed_records_search(modified_field, since_ms)
+        for items in self.iter_record_pages(base_id, table_id, page_size, search=search):
+            yield from items
+    
+    def iter_record_ids(self, base_id: str, table_id: str, id_field: str) -> Iterator[str]:
+        """逐个产出表格中全部记录的 record_id，只请求 id_field 一个字段以减小响应体"""
+        for items in self.iter_record_pages(base_id, table_id, RECORD_ID_PAGE_SIZE, params=record_ids_params(id_field)):
+            for record in items:
+                yield record.get("record_id")
+    
+    def get_table_records(self, base_id: str, table_id: str) -> List[Dict]:
+        """获取多维表格记录"""
         try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("code") == 0:
-                return data.get("data", {}).get("items", [])
-            else:
-                app.logger.error(f"获取表格记录失败: {data.get('msg')}")
-                return []
-        except requests.RequestException as e:
-            app.logger.error(f"请求表格记录时发生错误: {str(e)}")
+            return list(self.iter_table_records(base_id, table_id))
+        except FeishuAPIError as e:
+            app.logger.error(str(e))
             return []
 
 # 初始化飞书API
-feishu_api = FeishuAPI(app.config['FEISHU_APP_ID'], app.config['FEISHU_APP_SECRET'])
+feishu_transport = FeishuTransport(
+    app.config['FEISHU_APP_ID'],
+    app.config['FEISHU_APP_SECRET'],
+    base_url=app.config['FEISHU_BASE_URL'],
+    pool_size=app.config['FEISHU_HTTP_POOL_SIZE'],
+    timeout=app.config['FEISHU_HTTP_TIMEOUT'],
+    max_retries=app.config['FEISHU_MAX_RETRIES'],
+    refresh_margin=app.config['FEISHU_TOKEN_REFRESH_MARGIN'],
+    logger=app.logger
+)
+feishu_api = FeishuAPI(
+    feishu_transport,
+    page_size=app.config['FEISHU_PAGE_SIZE'],
+    prefetch_workers=app.config['FEISHU_PREFETCH_WORKERS']
+)
+
+def load_articles() -> List[Dict]:
+    """从飞书多维表格加载全部文章，失败时抛出 FeishuAPIError"""
+    records = list(feishu_api.iter_table_records(app.config['BASE_ID'], app.config['TABLE_ID']))
+    return records_to_articles(records)
+
+article_sync = IncrementalArticleSync(
+    feishu_api,
+    app.config['BASE_ID'],
+    app.config['TABLE_ID'],
+    modified_field=app.config['FEISHU_MODIFIED_FIELD'],
+    reconcile_interval=app.config['ARTICLE_RECONCILE_INTERVAL'],
+    logger=app.logger
+)
+
+# 多个 worker 共享的本地快照文件：启动时直接从文件提供服务，同一时刻只有一个 worker 访问飞书
+shared_snapshot = SharedSnapshotFile(
+    app.config['ARTICLE_SNAPSHOT_PATH'] or os.path.join(app.instance_path, 'articles_snapshot.json'),
+    get_state=lambda: article_sync.state,
+    on_load=article_sync.restore
+)
+
+article_store = ArticleStore(
+    article_sync if app.config['ARTICLE_INCREMENTAL_SYNC'] else load_articles,
+    ttl=app.config['CACHE_DEFAULT_TIMEOUT'],
+    refresh_ahead=app.config['ARTICLE_REFRESH_AHEAD'],
+    retry_interval=app.config['ARTICLE_REFRESH_RETRY_INTERVAL'],
+    shared=shared_snapshot,
+    logger=app.logger
+)
+
+register_store_metrics(article_store)
+
+# 按快照版本缓存的接口响应体
+response_cache = VersionedResponseCache(max_entries=app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+# 按快照版本缓存的页面 HTML：快照刷新后自动失效
+page_cache = VersionedResponseCache(max_entries=app.config['PAGE_CACHE_MAX_ENTRIES'])
+
+# 文章全文检索索引，随快照变化增量更新
+search_index = SearchIndex()
+article_store.subscribe(search_index.update)
+
+# 相关文章推荐，快照变化时在后台线程中批量重新计算，算完之前沿用上一版结果
+related_articles = RelatedArticles(top_k=app.config['RELATED_TOP_K'], logger=app.logger)
+article_store.subscribe(related_articles.update)
+# 其他回调完成后再淘汰旧版本的缓存响应
+article_store.subscribe(lambda snapshot: response_cache.publish(snapshot.version))
+article_store.subscribe(lambda snapshot: page_cache.publish(snapshot.version))
 
-@cache.cached(timeout=300, key_prefix='articles')
 def get_articles() -> List[Dict]:
     """获取文章列表（带缓存）"""
-    records = feishu_api.get_table_records(app.config['BASE_ID'], app.config['TABLE_ID'])
-    articles = []
-    
-    for record in records:
-        fields = record.get('fields', {})
-        article = {
-            'id': record.get('record_id'),
-            'title': fields.get('标题', ''),
-            'quote': fields.get('金句输出', ''),
-            'review': fields.get('黄叔点评', ''),
-            'content': fields.get('概要内容输出', ''),
-            'preview': fields.get('概要内容输出', '')[:100] + '...' if len(fields.get('概要内容输出', '')) > 100 else fields.get('概要内容输出', '')
-        }
-        articles.append(article)
-    
-    return articles
+    return article_store.get_articles()
+
+def get_article(article_id: str) -> Optional[Dict]:
+    """按 id 获取文章（带缓存，常数时间查找）"""
+    return article_store.get_article(article_id)
+
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+def record_request_duration(response: Response) -> Response:
+    if 'started' in g:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.started, endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+def render_page(template: str, **context) -> str:
+    """渲染模板，耗时计入 template_render_duration_seconds"""
+    with TEMPLATE_RENDER_SECONDS.time(template=template):
+        return render_template(template, **context)
 
 @app.route('/')
 def index():
-    """首页"""
-    articles = get_articles()
-    return render_template('index.html', articles=articles)
+    """首页：同一快照版本只渲染一次"""
+    def build_body(snapshot: ArticleSnapshot) -> bytes:
+        return render_page('index.html', articles=snapshot.articles).encode('utf-8')
+    
+    snapshot = article_store.get_snapshot()
+    return make_cached_response(request, Response, page_cache, snapshot, ('index',), build_body, 'text/html')
 
 @app.route('/article/<article_id>')
 def article_detail(article_id: str):
-    """文章详情页"""
-    articles = get_articles()
-    article = next((a for a in articles if a['id'] == article_id), None)
+    """文章详情页：每篇文章在同一快照版本下只渲染一次"""
+    snapshot = article_store.get_snapshot()
+    article = snapshot.by_id.get(article_id)
     
     if not article:
         return render_template('404.html'), 404
     
-    return render_template('detail.html', article=article)
+    def build_body(snapshot: ArticleSnapshot) -> bytes:
+        related = [related_article for related_article, _ in related_articles.get_related(article_id, articles=snapshot.by_id)]
+        return render_page('detail.html', article=article, related=related).encode('utf-8')
+    
+    # 相关文章在快照发布后才算好，缓存键带上其版本，算好后页面随之更新
+    key = ('detail', article_id, related_articles.version)
+    return make_cached_response(request, Response, page_cache, snapshot, key, build_body, 'text/html')
+
+def api_error(code: int, message: str):
+    """API接口的统一错误响应"""
+    return jsonify({
+        'code': code,
+        'data': None,
+        'message': message
+    }), code
+
+def cached_response(key: Hashable, build_body: Callable[[ArticleSnapshot], bytes], mimetype: str) -> Response:
+    """按快照版本缓存的响应，见 article_api.make_cached_response"""
+    return make_cached_response(request, Response, response_cache, article_store.get_snapshot(), key, build_body, mimetype)
 
 @app.route('/api/articles')
 def api_articles():
-    """API接口：获取文章列表"""
-    articles = get_articles()
-    return jsonify({
-        'code': 0,
-        'data': articles,
-        'message': 'success'
-    })
+    """API接口：获取文章列表
+    
+    可选参数：
+    - page / page_size：分页，不传 page_size 时返回全部文章
+    - fields：逗号分隔的字段列表（如 title,quote,preview），id 总会返回
+    """
+    try:
+        page, page_size, fields = parse_list_query(request.args, app.config['API_MAX_PAGE_SIZE'])
+    except ArticleQueryError as e:
+        return api_error(400, str(e))
+    
+    def build_body(snapshot: ArticleSnapshot) -> bytes:
+        return build_list_body(snapshot, page, page_size, fields)
+    
+    return cached_response(('articles', page, page_size, fields), build_body, 'application/json')
 
 @app.route('/api/article/<article_id>')
 def api_article_detail(article_id: str):
     """API接口：获取文章详情"""
-    articles = get_articles()
-    article = next((a for a in articles if a['id'] == article_id), None)
+    article = get_article(article_id)
     
     if not article:
-        return jsonify({
-            'code': 404,
-            'data': None,
-            'message': 'Article not found'
-        }), 404
+        return api_error(404, 'Article not found')
     
     return jsonify({
         'code': 0,
@@ -134,6 +277,70 @@ def api_article_detail(article_id: str):
         'message': 'success'
     })
 
+@app.route('/api/article/<article_id>/related')
+def api_related_articles(article_id: str):
+    """API接口：获取相关文章"""
+    limit = request.args.get('limit', app.config['RELATED_TOP_K'], type=int)
+    if not 1 <= limit <= app.config['RELATED_TOP_K']:
+        return api_error(400, f"limit must be between 1 and {app.config['RELATED_TOP_K']}")
+    if not get_article(article_id):
+        return api_error(404, 'Article not found')
+    
+    return jsonify({
+        'code': 0,
+        'data': [
+            summarize(article, score)
+            for article, score in related_articles.get_related(article_id, limit)
+        ],
+        'message': 'success'
+    })
+
+@app.route('/api/search')
+def api_search():
+    """API接口：全文检索文章
+    
+    参数：q 为查询词（中文按二元组匹配），limit 为返回数量
+    """
+    query = request.args.get('q', '').strip()
+    limit = request.args.get('limit', 20, type=int)
+    if not query:
+        return api_error(400, 'q is required')
+    if not 1 <= limit <= app.config['API_MAX_PAGE_SIZE']:
+        return api_error(400, f"limit must be between 1 and {app.config['API_MAX_PAGE_SIZE']}")
+    
+    # 确保冷启动时快照（以及随之建立的索引）已加载
+    article_store.get_snapshot()
+    results = search_index.search(query, limit)
+    return jsonify({
+        'code': 0,
+        'data': [
+            summarize(article, score)
+            for article, score in results
+        ],
+        'message': 'success'
+    })
+
+@app.route('/api/cache/stats')
+def api_cache_stats():
+    """API接口：本 worker 的文章缓存统计"""
+    snapshot = article_store.get_snapshot()
+    return jsonify({
+        'code': 0,
+        'data': {
+            'pid': os.getpid(),
+            'version': snapshot.version,
+            'articles': len(snapshot.articles),
+            'age': round(time.time() - snapshot.built_at, 1),
+            'counters': article_store.stats
+        },
+        'message': 'success'
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus 指标（本 worker）"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 @app.errorhandler(404)
 def not_found(error):
     return render_template('404.html'), 404
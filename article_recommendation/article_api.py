@@ -0,0 +1,113 @@
+import json
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from article_store import ArticleSnapshot
+from response_cache import CachedBody, VersionedResponseCache
+
+ARTICLE_FIELDS = ('id', 'title', 'quote', 'review', 'content', 'preview')
+
+
+class ArticleQueryError(ValueError):
+    """接口查询参数不合法"""
+
+
+def json_bytes(payload: Dict) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _int_arg(args, name: str, default: Optional[int] = None) -> Optional[int]:
+    """读取整数参数：缺省时返回 default，不是整数时报错（不能静默回退为默认值）"""
+    value = args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ArticleQueryError(f"{name} must be an integer") from None
+
+
+def parse_list_query(args, max_page_size: int) -> Tuple[int, Optional[int], Optional[Tuple[str, ...]]]:
+    """解析文章列表的 page / page_size / fields 参数，args 为请求的查询参数（MultiDict）"""
+    page = _int_arg(args, 'page', 1)
+    page_size = _int_arg(args, 'page_size')
+    if page < 1:
+        raise ArticleQueryError('page must be a positive integer')
+    if page_size is not None and not 1 <= page_size <= max_page_size:
+        raise ArticleQueryError(f"page_size must be between 1 and {max_page_size}")
+
+    if not args.get('fields'):
+        return page, page_size, None
+    requested = [name.strip() for name in args['fields'].split(',') if name.strip()]
+    unknown = set(requested) - set(ARTICLE_FIELDS)
+    if unknown:
+        raise ArticleQueryError(f"unknown fields: {', '.join(sorted(unknown))}")
+    return page, page_size, tuple(name for name in ARTICLE_FIELDS if name == 'id' or name in requested)
+
+
+def build_list_body(snapshot: ArticleSnapshot, page: int, page_size: Optional[int], fields: Optional[Tuple[str, ...]]) -> bytes:
+    """序列化文章列表接口的响应体"""
+    articles = snapshot.articles
+    if page_size:
+        articles = articles[(page - 1) * page_size:page * page_size]
+    if fields:
+        articles = [{name: article[name] for name in fields} for article in articles]
+    return json_bytes({
+        'code': 0,
+        'data': articles,
+        'message': 'success',
+        'total': len(snapshot.articles),
+        'page': page,
+        'page_size': page_size or len(snapshot.articles)
+    })
+
+
+def summarize(article: Dict, score: float) -> Dict:
+    """检索与推荐结果中的文章摘要"""
+    return {
+        'id': article['id'],
+        'title': article['title'],
+        'quote': article['quote'],
+        'preview': article['preview'],
+        'score': round(score, 4)
+    }
+
+
+def response_etag(request, cache: VersionedResponseCache, snapshot: ArticleSnapshot, key: Hashable) -> Tuple[str, bool]:
+    """由快照版本与 key 得到 ETag（不需要先生成响应体），以及客户端是否接受 gzip"""
+    is_gzip = 'gzip' in request.accept_encodings
+    return cache.etag(snapshot.version, key) + ('-gz' if is_gzip else ''), is_gzip
+
+
+def build_cached_response(response_class, etag: str, cached: Optional[CachedBody], is_gzip: bool, mimetype: str):
+    """cached 为 None 表示客户端缓存仍有效，返回 304"""
+    if cached is None:
+        response = response_class(status=304)
+    else:
+        response = response_class(cached.gzipped if is_gzip else cached.body, mimetype=mimetype)
+        if is_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def make_cached_response(
+    request,
+    response_class,
+    cache: VersionedResponseCache,
+    snapshot: ArticleSnapshot,
+    key: Hashable,
+    build_body: Callable[[ArticleSnapshot], bytes],
+    mimetype: str
+):
+    """按快照版本缓存的响应（Flask 与 Quart 通用）
+
+    响应体（及 gzip 版本）每个快照版本只生成一次；ETag 由快照版本与 key 决定，
+    客户端缓存仍有效时直接返回 304，不做任何序列化。
+    """
+    etag, is_gzip = response_etag(request, cache, snapshot, key)
+    cached = None
+    if not request.if_none_match.contains_weak(etag):
+        cached = cache.get_or_build(snapshot.version, key, lambda: build_body(snapshot))
+    return build_cached_response(response_class, etag, cached, is_gzip, mimetype)
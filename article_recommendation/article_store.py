@@ -0,0 +1,450 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from metrics import ARTICLE_REFRESH_SECONDS, ARTICLE_TRANSFORM_SECONDS
+
+
+def record_to_article(record: Dict) -> Dict:
+    """将多维表格记录转换为文章"""
+    fields = record.get('fields', {})
+    content = fields.get('概要内容输出', '')
+    return {
+        'id': record.get('record_id'),
+        'title': fields.get('标题', ''),
+        'quote': fields.get('金句输出', ''),
+        'review': fields.get('黄叔点评', ''),
+        'content': content,
+        'preview': content[:100] + '...' if len(content) > 100 else content
+    }
+
+
+def records_to_articles(records: List[Dict]) -> List[Dict]:
+    """批量转换记录，耗时计入 article_transform_duration_seconds"""
+    with ARTICLE_TRANSFORM_SECONDS.time():
+        return [record_to_article(record) for record in records]
+
+
+@dataclass(frozen=True)
+class ArticleSnapshot:
+    """某一时刻的文章数据：列表与按 id 建立的索引在同一次刷新中生成"""
+    articles: List[Dict]
+    by_id: Dict[str, Dict]
+    version: str
+    built_at: float = field(default_factory=time.time)
+
+
+def build_snapshot(articles: List[Dict]) -> ArticleSnapshot:
+    """由文章列表构建快照，version 为内容摘要，内容不变则版本不变"""
+    digest = hashlib.sha1(json.dumps(articles, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+    return ArticleSnapshot(
+        articles=articles,
+        by_id={article['id']: article for article in articles},
+        version=digest.hexdigest()[:16]
+    )
+
+
+class _ArticleStoreBase:
+    """ArticleStore 与 AsyncArticleStore 共用的快照策略：过期与提前刷新的判断、失败退避、
+    共享文件快照的采用条件、命中统计与刷新结果的记录
+
+    子类只负责加锁、调度后台刷新，以及调用 loader、回调与快照文件（同步或异步的 I/O）。
+    """
+
+    # 其他 worker 正在刷新时，隔多久再去读取共享文件
+    LOCK_BUSY_RETRY = 1.0
+    # 冷启动加载失败后的首次重试间隔（秒）
+    COLD_RETRY_MIN = 1.0
+
+    def __init__(
+        self,
+        loader: Callable,
+        ttl: float = 300,
+        refresh_ahead: float = 0.8,
+        retry_interval: float = 30,
+        shared=None,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.loader = loader
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.retry_interval = retry_interval
+        self.shared = shared
+        self.logger = logger or logging.getLogger(__name__)
+        self._snapshot: Optional[ArticleSnapshot] = None
+        self._retry_at = 0.0
+        self._cold_failures = 0
+        self._listeners: List[Callable[[ArticleSnapshot], None]] = []
+        self._stats: Dict[str, int] = dict.fromkeys(
+            ('hits', 'stale_hits', 'misses', 'fills', 'fill_errors', 'shared_loads', 'lock_busy'), 0
+        )
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """本进程的缓存计数：命中/过期命中/未命中，以及拉取飞书、读取共享文件等次数"""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    @property
+    def current_snapshot(self) -> Optional[ArticleSnapshot]:
+        """当前持有的快照（不触发加载或刷新），尚未加载时为 None"""
+        return self._snapshot
+
+    def subscribe(self, listener: Callable[[ArticleSnapshot], None]):
+        """注册快照变化（version 改变）时的回调"""
+        self._listeners.append(listener)
+
+    def _listeners_for(self, snapshot: ArticleSnapshot) -> List[Callable[[ArticleSnapshot], None]]:
+        """切换到 snapshot 前需要通知的回调：版本未变时为空"""
+        previous = self._snapshot
+        if previous is None or previous.version != snapshot.version:
+            return list(self._listeners)
+        return []
+
+    def _switch(self, snapshot: ArticleSnapshot):
+        # 回调完成后再切换快照：请求读到新版本时，检索索引等同步计算的派生数据也已就绪，
+        # 按版本缓存的页面不会混入旧版本的数据
+        self._snapshot = snapshot
+        self._cold_failures = 0
+
+    def _is_expired(self, snapshot: ArticleSnapshot) -> bool:
+        return time.time() - snapshot.built_at >= self.ttl
+
+    def _is_due(self, snapshot: ArticleSnapshot) -> bool:
+        return time.time() >= snapshot.built_at + self.ttl * self.refresh_ahead
+
+    def _next_refresh_delay(self) -> float:
+        snapshot = self._snapshot
+        if snapshot is None:
+            # 尚无快照（冷启动失败）：等到重试时间再由后台加载
+            return max(self._retry_at - time.time(), 0)
+        due = max(snapshot.built_at + self.ttl * self.refresh_ahead, self._retry_at)
+        return max(due - time.time(), 0)
+
+    def _schedule_retry(self):
+        """刷新失败后设置重试时间；没有任何快照时从 COLD_RETRY_MIN 开始指数退避，最长 retry_interval"""
+        if self._snapshot is None:
+            self._cold_failures += 1
+            delay = min(self.COLD_RETRY_MIN * 2 ** (self._cold_failures - 1), self.retry_interval)
+        else:
+            delay = self.retry_interval
+        self._retry_at = time.time() + delay
+
+    def _lock_busy(self):
+        """其他 worker 持有文件锁：稍后直接读取它写入的共享文件"""
+        self._count('lock_busy')
+        self._retry_at = time.time() + self.LOCK_BUSY_RETRY
+
+    def _is_fresh(self, adopted: bool) -> bool:
+        """刚采用了共享文件中的快照且尚未到提前刷新时间，不必再拉取飞书"""
+        return adopted and not self._is_due(self._snapshot)
+
+    def _shared_since(self) -> float:
+        """只采用比本进程快照更新的共享文件"""
+        return self._snapshot.built_at if self._snapshot else 0
+
+    def _adopted(self, snapshot: ArticleSnapshot):
+        self._count('shared_loads')
+        self.logger.debug(f"从共享快照文件加载文章 {len(snapshot.articles)} 篇, 版本 {snapshot.version}")
+
+    def _fill_failed(self, started: float, error: Exception):
+        ARTICLE_REFRESH_SECONDS.observe(time.time() - started, result='error')
+        self._count('fill_errors')
+        self._schedule_retry()
+        self.logger.error(f"刷新文章快照失败，继续使用旧数据: {str(error)}")
+
+    def _loaded(self, articles: List[Dict], started: float) -> bool:
+        """记录一次成功的拉取；loader 返回当前快照的同一个列表对象表示没有变化（增量同步），
+        此时只续期不重建，返回 True"""
+        self._count('fills')
+        current = self._snapshot
+        if current is None or articles is not current.articles:
+            return False
+        self._snapshot = replace(current, built_at=time.time())
+        ARTICLE_REFRESH_SECONDS.observe(time.time() - started, result='unchanged')
+        self.logger.debug(f"文章无变化，快照续期, 耗时 {time.time() - started:.2f}s")
+        return True
+
+    def _filled(self, snapshot: ArticleSnapshot, started: float):
+        ARTICLE_REFRESH_SECONDS.observe(time.time() - started, result='success')
+        self.logger.info(f"文章快照已刷新: {len(snapshot.articles)} 篇, 版本 {snapshot.version}, 耗时 {time.time() - started:.2f}s")
+
+    def _save_shared(self, is_renewal: bool = False):
+        if self.shared is None:
+            return
+        try:
+            if is_renewal:
+                self.shared.touch(self._snapshot.built_at)
+            else:
+                self.shared.save(self._snapshot)
+        except OSError as e:
+            self.logger.error(f"写入共享快照文件失败: {str(e)}")
+
+    def _observe_read(self, snapshot: ArticleSnapshot) -> bool:
+        """记录一次命中，返回快照是否已过期（需要唤醒后台刷新，请求直接使用旧快照）"""
+        if self._is_expired(snapshot):
+            self._count('stale_hits')
+            return True
+        self._count('hits')
+        return False
+
+
+class ArticleStore(_ArticleStoreBase):
+    """文章快照缓存（stale-while-revalidate）
+
+    - 快照以对象形式保存在内存中，读取时不需要反序列化
+    - 后台线程在快照到达 ttl * refresh_ahead 时提前重建，请求始终读取最近一次成功的快照
+    - 所有重建都由同一把锁串行化：快照过期只会触发一次刷新
+    - 刷新失败时继续使用旧快照，并在 retry_interval 秒后重试
+    - 只有进程内尚无任何快照（冷启动）时，请求才会同步等待加载
+
+    传入 shared（snapshot_file.SharedSnapshotFile）时，多个 worker 通过同一个快照文件共享数据：
+    刷新前先看文件里是否已有其他 worker 写入的更新快照，需要访问飞书时再用文件锁保证
+    同一时刻只有一个 worker 拉取，其余 worker 继续使用旧快照，稍后直接读取文件。
+    """
+
+    def __init__(self, loader: Callable[[], List[Dict]], **kwargs):
+        super().__init__(loader, **kwargs)
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._scheduler: Optional[threading.Thread] = None
+        self._scheduler_lock = threading.Lock()
+
+    def _publish(self, snapshot: ArticleSnapshot):
+        """回调在刷新线程中执行"""
+        for listener in self._listeners_for(snapshot):
+            try:
+                listener(snapshot)
+            except Exception:
+                self.logger.exception("处理文章快照变化时发生错误")
+        self._switch(snapshot)
+
+    def start(self):
+        """启动后台刷新线程（每个进程一次，首次读取时自动调用，兼容 fork 后的 worker）"""
+        with self._scheduler_lock:
+            if self._scheduler and self._scheduler.is_alive():
+                return
+            self._scheduler = threading.Thread(target=self._run_scheduler, name='article-refresh', daemon=True)
+            self._scheduler.start()
+
+    def _run_scheduler(self):
+        while True:
+            self._wakeup.wait(self._next_refresh_delay())
+            self._wakeup.clear()
+            with self._refresh_lock:
+                # 刚被其他线程刷新过时，重新判断是否仍需刷新；没有快照时由这里按退避间隔重试冷启动加载
+                if self._next_refresh_delay() == 0:
+                    self._refresh_locked()
+
+    def refresh(self) -> bool:
+        """立即重建快照，失败时保留旧快照；返回是否成功"""
+        with self._refresh_lock:
+            return self._refresh_locked()
+
+    def _refresh_locked(self, wait_for_shared: bool = False) -> bool:
+        if self.shared is None:
+            return self._fill()
+        if self._is_fresh(self._adopt_shared()):
+            return True
+        with self.shared.lock(blocking=wait_for_shared) as is_acquired:
+            if not is_acquired:
+                self._lock_busy()
+                return False
+            # 拿到锁时其他 worker 可能刚刚写完新快照
+            if self._is_fresh(self._adopt_shared()):
+                return True
+            return self._fill()
+
+    def _adopt_shared(self) -> bool:
+        """共享文件中的快照比本进程的新时采用它"""
+        snapshot = self.shared.load_if_newer(self._shared_since())
+        if snapshot is None:
+            return False
+        self._publish(snapshot)
+        self._adopted(snapshot)
+        return True
+
+    def _fill(self) -> bool:
+        """调用 loader 从数据源重建快照"""
+        started = time.time()
+        try:
+            articles = self.loader()
+        except Exception as e:
+            self._fill_failed(started, e)
+            return False
+        if self._loaded(articles, started):
+            self._save_shared(is_renewal=True)
+            return True
+        snapshot = build_snapshot(articles)
+        self._publish(snapshot)
+        self._save_shared()
+        self._filled(snapshot, started)
+        return True
+
+    def get_snapshot(self) -> ArticleSnapshot:
+        self.start()
+        snapshot = self._snapshot
+        if snapshot is None:
+            self._count('misses')
+            return self._load_cold()
+        if self._observe_read(snapshot):
+            # 唤醒后台线程刷新（若正处于失败重试的等待期则不会重复请求）
+            self._wakeup.set()
+        return snapshot
+
+    def _load_cold(self) -> ArticleSnapshot:
+        """冷启动时加载：优先使用共享文件中的快照（即使已过期，由后台刷新），
+        否则同步等待加载；并发请求在锁上等待同一次加载的结果"""
+        with self._refresh_lock:
+            if self._snapshot is None and self.shared is not None:
+                self._adopt_shared()
+            if self._snapshot is None and time.time() >= self._retry_at:
+                self._refresh_locked(wait_for_shared=True)
+            return self._snapshot or build_snapshot([])
+
+    def get_articles(self) -> List[Dict]:
+        return self.get_snapshot().articles
+
+    def get_article(self, article_id: str) -> Optional[Dict]:
+        return self.get_snapshot().by_id.get(article_id)
+
+
+class AsyncArticleStore(_ArticleStoreBase):
+    """ArticleStore 的 asyncio 版本，供 ASGI 服务使用
+
+    - loader 为协程函数，刷新在事件循环中的后台任务里进行，请求始终读取最近一次成功的快照
+    - 刷新由 asyncio.Lock 串行化，冷启动时并发请求等待同一次加载
+    - 构建快照（计算内容摘要）、快照变化回调（检索索引、相关文章等 CPU 密集的计算）
+      与快照文件的读写放到线程中执行，不阻塞事件循环
+    - 传入 shared 时与同步版本使用同一个快照文件：启动时直接采用文件中的快照，
+      刷新前先看文件是否已被其他 worker 更新，拉取飞书前获取（非阻塞的）文件锁
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[List[Dict]]], **kwargs):
+        super().__init__(loader, **kwargs)
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._scheduler: Optional[asyncio.Task] = None
+
+    async def _publish(self, snapshot: ArticleSnapshot):
+        """回调在线程中执行"""
+        for listener in self._listeners_for(snapshot):
+            try:
+                await asyncio.to_thread(listener, snapshot)
+            except Exception:
+                self.logger.exception("处理文章快照变化时发生错误")
+        self._switch(snapshot)
+
+    async def start(self):
+        """在事件循环启动后调用：采用共享文件中的快照并启动后台刷新任务"""
+        if self._scheduler is not None:
+            return
+        self._refresh_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        if self.shared is not None:
+            async with self._refresh_lock:
+                await self._adopt_shared()
+        self._scheduler = asyncio.create_task(self._run_scheduler())
+
+    async def stop(self):
+        if self._scheduler is None:
+            return
+        self._scheduler.cancel()
+        try:
+            await self._scheduler
+        except asyncio.CancelledError:
+            pass
+        self._scheduler = None
+
+    async def _run_scheduler(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._next_refresh_delay())
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            async with self._refresh_lock:
+                # 没有快照时（例如首次部署且没有快照文件）由这里按退避间隔加载，不必等到第一个请求
+                if self._next_refresh_delay() == 0:
+                    await self._refresh_locked()
+
+    async def refresh(self) -> bool:
+        """立即重建快照，失败时保留旧快照；返回是否成功"""
+        async with self._refresh_lock:
+            return await self._refresh_locked()
+
+    async def _refresh_locked(self) -> bool:
+        if self.shared is None:
+            return await self._fill()
+        if self._is_fresh(await self._adopt_shared()):
+            return True
+        # 非阻塞获取文件锁，不会卡住事件循环；拿不到时稍后直接读取其他 worker 写入的文件
+        with self.shared.lock(blocking=False) as is_acquired:
+            if not is_acquired:
+                self._lock_busy()
+                return False
+            if self._is_fresh(await self._adopt_shared()):
+                return True
+            return await self._fill()
+
+    async def _adopt_shared(self) -> bool:
+        snapshot = await asyncio.to_thread(self.shared.load_if_newer, self._shared_since())
+        if snapshot is None:
+            return False
+        await self._publish(snapshot)
+        self._adopted(snapshot)
+        return True
+
+    async def _fill(self) -> bool:
+        started = time.time()
+        try:
+            articles = await self.loader()
+        except Exception as e:
+            self._fill_failed(started, e)
+            return False
+        if self._loaded(articles, started):
+            await asyncio.to_thread(self._save_shared, True)
+            return True
+        snapshot = await asyncio.to_thread(build_snapshot, articles)
+        await self._publish(snapshot)
+        await asyncio.to_thread(self._save_shared)
+        self._filled(snapshot, started)
+        return True
+
+    async def get_snapshot(self) -> ArticleSnapshot:
+        await self.start()
+        snapshot = self._snapshot
+        if snapshot is None:
+            self._count('misses')
+            return await self._load_cold()
+        if self._observe_read(snapshot):
+            self._wakeup.set()
+        return snapshot
+
+    async def _load_cold(self) -> ArticleSnapshot:
+        """冷启动时加载；其他 worker 正持有文件锁时，最多等待 lock_timeout 秒由它写入共享文件"""
+        async with self._refresh_lock:
+            deadline = time.time() + (self.shared.lock_timeout if self.shared is not None else 0)
+            while self._snapshot is None and time.time() >= self._retry_at:
+                lock_busy = self._stats['lock_busy']
+                await self._refresh_locked()
+                if self._stats['lock_busy'] == lock_busy or time.time() >= deadline:
+                    break
+                await asyncio.sleep(self.LOCK_BUSY_RETRY)
+            return self._snapshot or build_snapshot([])
+
+    async def get_articles(self) -> List[Dict]:
+        return (await self.get_snapshot()).articles
+
+    async def get_article(self, article_id: str) -> Optional[Dict]:
+        return (await self.get_snapshot()).by_id.get(article_id)
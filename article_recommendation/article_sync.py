@@ -0,0 +1,174 @@
+import logging
+import time
+from typing import Dict, List, Optional, Set
+
+from article_store import records_to_articles
+from feishu_transport import FeishuAPIError
+
+# 飞书“字段名不存在”错误码：表格里没有配置的修改时间字段时退回全量同步
+FIELD_NAME_NOT_FOUND = 1254045
+DAY_MS = 24 * 3600 * 1000
+
+
+class IncrementalArticleSync:
+    """基于修改时间水位线的增量文章同步，作为 ArticleStore 的 loader 使用
+
+    - 首次调用全量拉取，并以记录的 last_modified_time 最大值作为水位线
+    - 之后只通过记录搜索接口拉取水位线当天及以后修改的记录，合并进内存中的文章表；
+      飞书的日期条件只按天比较，当天已同步过的记录按 last_modified_time 跳过
+    - 删除无法从增量结果中得知，每隔 reconcile_interval 秒只拉取 record_id 比对一次
+    - 没有任何变化时返回上一次的列表对象本身，ArticleStore 据此跳过快照重建
+
+    只应在 ArticleStore 的刷新锁内调用，内部状态不做额外加锁。
+    """
+
+    def __init__(
+        self,
+        feishu_api,
+        base_id: str,
+        table_id: str,
+        modified_field: str,
+        reconcile_interval: float = 600,
+        overlap_ms: int = 60000,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.feishu_api = feishu_api
+        self.base_id = base_id
+        self.table_id = table_id
+        self.modified_field = modified_field
+        self.reconcile_interval = reconcile_interval
+        # 向前回退一段时间以容忍飞书侧的时钟与索引延迟，重复拉到的记录按 id 覆盖即可
+        self.overlap_ms = overlap_ms
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._articles: Dict[str, Dict] = {}
+        # 文章 id -> 已同步的 last_modified_time；从快照恢复时为空，此时按内容比对
+        self._modified_times: Dict[str, int] = {}
+        self._article_list: List[Dict] = []
+        self._watermark = 0
+        self._last_reconcile_at = 0.0
+        self._is_incremental = bool(modified_field)
+
+    def __call__(self) -> List[Dict]:
+        if not self._is_incremental or not self._watermark:
+            return self.full_sync()
+        try:
+            # 先完整拉取变更再合并，拉取中途失败时内存中的文章表保持不变
+            changes = list(self.feishu_api.iter_changed_records(
+                self.base_id, self.table_id, self.modified_field, self._changes_since()
+            ))
+        except FeishuAPIError as e:
+            self._disable_incremental(e)
+            return self.full_sync()
+
+        self._merge_changes(changes)
+        if self._is_reconcile_due():
+            remote_ids = set(self.feishu_api.iter_record_ids(self.base_id, self.table_id, '标题'))
+            if self._reconcile(remote_ids):
+                return self.full_sync()
+        return self._article_list
+
+    def _changes_since(self) -> int:
+        """增量查询的日期条件为“晚于前一天”，即从水位线（回退 overlap_ms）当天零点起重新拉取"""
+        since = max(self._watermark - self.overlap_ms, 0)
+        return max(since - DAY_MS, 0)
+
+    def _disable_incremental(self, error: FeishuAPIError):
+        """表格里没有修改时间字段时改为全量同步，其他错误原样抛出"""
+        if error.code != FIELD_NAME_NOT_FOUND:
+            raise error
+        self.logger.warning(f"多维表格中没有字段「{self.modified_field}」，改为每次全量同步")
+        self._is_incremental = False
+
+    def _merge_changes(self, changes: List[Dict]):
+        if self._apply_changes(changes):
+            self._article_list = list(self._articles.values())
+
+    def _is_reconcile_due(self) -> bool:
+        return time.time() - self._last_reconcile_at >= self.reconcile_interval
+
+    @property
+    def state(self) -> Dict:
+        """可持久化的同步状态，配合 restore 在重启后继续增量同步"""
+        return {'watermark': self._watermark, 'modified_field': self.modified_field}
+
+    def restore(self, articles: List[Dict], state: Dict):
+        """从持久化的文章与同步状态恢复；修改时间字段变更过时忽略水位线，下次全量同步"""
+        if state.get('modified_field') != self.modified_field:
+            return
+        self._articles = {article['id']: article for article in articles}
+        self._article_list = articles
+        self._watermark = state.get('watermark') or 0
+
+    def full_sync(self) -> List[Dict]:
+        """全量拉取并重建内存中的文章表"""
+        return self._reset(list(self.feishu_api.iter_table_records(self.base_id, self.table_id, automatic_fields=True)))
+
+    def _reset(self, records: List[Dict]) -> List[Dict]:
+        self._articles = {article['id']: article for article in records_to_articles(records)}
+        self._modified_times = {record.get('record_id'): record.get('last_modified_time') or 0 for record in records}
+        self._watermark = max((record.get('last_modified_time') or 0 for record in records), default=0)
+        self._last_reconcile_at = time.time()
+        self._article_list = list(self._articles.values())
+        return self._article_list
+
+    def _apply_changes(self, records: List[Dict]) -> bool:
+        is_changed = False
+        for record, article in zip(records, records_to_articles(records)):
+            modified_time = record.get('last_modified_time') or 0
+            self._watermark = max(self._watermark, modified_time)
+            if modified_time and modified_time <= self._modified_times.get(article['id'], 0):
+                continue
+            self._modified_times[article['id']] = modified_time
+            if self._articles.get(article['id']) == article:
+                continue
+            self._articles[article['id']] = article
+            is_changed = True
+        return is_changed
+
+    def _reconcile(self, remote_ids: Set[str]) -> bool:
+        """比对全部 record_id，移除已删除的文章；发现遗漏的新记录时返回 True，由调用方全量同步"""
+        self._last_reconcile_at = time.time()
+        if remote_ids - self._articles.keys():
+            self.logger.warning("增量同步遗漏了部分记录，执行一次全量同步")
+            return True
+
+        deleted_ids = self._articles.keys() - remote_ids
+        for article_id in deleted_ids:
+            del self._articles[article_id]
+            self._modified_times.pop(article_id, None)
+        if deleted_ids:
+            self.logger.info(f"同步删除文章 {len(deleted_ids)} 篇")
+            self._article_list = list(self._articles.values())
+        return False
+
+
+class AsyncIncrementalArticleSync(IncrementalArticleSync):
+    """IncrementalArticleSync 的异步版本，作为 AsyncArticleStore 的 loader 使用
+
+    feishu_api 为 feishu_async.AsyncFeishuAPI；同步策略与状态完全相同，只替换拉取方式。
+    """
+
+    async def __call__(self) -> List[Dict]:
+        if not self._is_incremental or not self._watermark:
+            return await self.full_sync()
+        try:
+            changes = [record async for record in self.feishu_api.iter_changed_records(
+                self.base_id, self.table_id, self.modified_field, self._changes_since()
+            )]
+        except FeishuAPIError as e:
+            self._disable_incremental(e)
+            return await self.full_sync()
+
+        self._merge_changes(changes)
+        if self._is_reconcile_due():
+            remote_ids = {record_id async for record_id in self.feishu_api.iter_record_ids(self.base_id, self.table_id, '标题')}
+            if self._reconcile(remote_ids):
+                return await self.full_sync()
+        return self._article_list
+
+    async def full_sync(self) -> List[Dict]:
+        """全量拉取并重建内存中的文章表"""
+        return self._reset([
+            record async for record in self.feishu_api.iter_table_records(self.base_id, self.table_id, automatic_fields=True)
+        ])
@@ -0,0 +1,204 @@
+"""异步服务模式（ASGI）
+
+与 app.py 使用相同的模板、配置与快照文件，首页、详情页及文章接口由 asyncio 事件循环处理，
+等待飞书接口时不占用 worker 线程。启动方式：
+
+    hypercorn asgi_app:app --bind 0.0.0.0:5000
+"""
+import os
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List
+
+from quart import Quart, Response, g, jsonify, render_template, request
+
+from config import Config
+from article_api import ArticleQueryError, build_cached_response, build_list_body, make_cached_response, parse_list_query, response_etag
+from article_store import ArticleSnapshot, AsyncArticleStore
+from article_sync import AsyncIncrementalArticleSync
+from feishu_async import AsyncFeishuAPI
+from response_cache import VersionedResponseCache
+from snapshot_file import SharedSnapshotFile
+from recommender import RelatedArticles
+from metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, REGISTRY, TEMPLATE_RENDER_SECONDS, register_store_metrics
+
+app = Quart(__name__)
+app.config.from_object(Config)
+
+feishu_api = AsyncFeishuAPI(
+    app.config['FEISHU_APP_ID'],
+    app.config['FEISHU_APP_SECRET'],
+    base_url=app.config['FEISHU_BASE_URL'],
+    page_size=app.config['FEISHU_PAGE_SIZE'],
+    pool_size=app.config['FEISHU_HTTP_POOL_SIZE'],
+    timeout=app.config['FEISHU_HTTP_TIMEOUT'],
+    max_retries=app.config['FEISHU_MAX_RETRIES'],
+    refresh_margin=app.config['FEISHU_TOKEN_REFRESH_MARGIN'],
+    logger=app.logger
+)
+
+async def load_articles() -> List[Dict]:
+    """从飞书多维表格加载全部文章，失败时抛出 FeishuAPIError"""
+    return await feishu_api.load_articles(app.config['BASE_ID'], app.config['TABLE_ID'])
+
+article_sync = AsyncIncrementalArticleSync(
+    feishu_api,
+    app.config['BASE_ID'],
+    app.config['TABLE_ID'],
+    modified_field=app.config['FEISHU_MODIFIED_FIELD'],
+    reconcile_interval=app.config['ARTICLE_RECONCILE_INTERVAL'],
+    logger=app.logger
+)
+
+# 与同步服务共用快照文件（含增量同步的水位线）：两种模式的 worker 可以混合部署
+shared_snapshot = SharedSnapshotFile(
+    app.config['ARTICLE_SNAPSHOT_PATH'] or os.path.join(app.instance_path, 'articles_snapshot.json'),
+    get_state=lambda: article_sync.state,
+    on_load=article_sync.restore
+)
+
+article_store = AsyncArticleStore(
+    article_sync if app.config['ARTICLE_INCREMENTAL_SYNC'] else load_articles,
+    ttl=app.config['CACHE_DEFAULT_TIMEOUT'],
+    refresh_ahead=app.config['ARTICLE_REFRESH_AHEAD'],
+    retry_interval=app.config['ARTICLE_REFRESH_RETRY_INTERVAL'],
+    shared=shared_snapshot,
+    logger=app.logger
+)
+
+register_store_metrics(article_store)
+
+response_cache = VersionedResponseCache(max_entries=app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+# 按快照版本缓存的页面 HTML：快照刷新后自动失效
+page_cache = VersionedResponseCache(max_entries=app.config['PAGE_CACHE_MAX_ENTRIES'])
+
+related_articles = RelatedArticles(top_k=app.config['RELATED_TOP_K'], logger=app.logger)
+article_store.subscribe(related_articles.update)
+# 其他回调完成后再淘汰旧版本的缓存响应
+article_store.subscribe(lambda snapshot: response_cache.publish(snapshot.version))
+article_store.subscribe(lambda snapshot: page_cache.publish(snapshot.version))
+
+@app.before_serving
+async def startup():
+    await article_store.start()
+
+@app.after_serving
+async def shutdown():
+    await article_store.stop()
+    await feishu_api.aclose()
+
+@app.before_request
+async def start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+async def record_request_duration(response: Response) -> Response:
+    if 'started' in g:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.started, endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+async def render_page(template: str, **context) -> str:
+    """渲染模板，耗时计入 template_render_duration_seconds"""
+    with TEMPLATE_RENDER_SECONDS.time(template=template):
+        return await render_template(template, **context)
+
+async def cached_page(snapshot: ArticleSnapshot, key: Hashable, render: Callable[[], Awaitable[str]]) -> Response:
+    """按快照版本缓存的页面：模板渲染是异步的，因此不经过 make_cached_response"""
+    etag, is_gzip = response_etag(request, page_cache, snapshot, key)
+    cached = None
+    if not request.if_none_match.contains_weak(etag):
+        async def build() -> bytes:
+            return (await render()).encode('utf-8')
+        cached = await page_cache.get_or_build_async(snapshot.version, key, build)
+    return build_cached_response(Response, etag, cached, is_gzip, 'text/html')
+
+@app.route('/')
+async def index():
+    """首页：同一快照版本只渲染一次"""
+    snapshot = await article_store.get_snapshot()
+    return await cached_page(snapshot, ('index',), lambda: render_page('index.html', articles=snapshot.articles))
+
+@app.route('/article/<article_id>')
+async def article_detail(article_id: str):
+    """文章详情页：每篇文章在同一快照版本下只渲染一次"""
+    snapshot = await article_store.get_snapshot()
+    article = snapshot.by_id.get(article_id)
+
+    if not article:
+        return await render_template('404.html'), 404
+
+    related = [related_article for related_article, _ in related_articles.get_related(article_id, articles=snapshot.by_id)]
+    # 相关文章在快照发布后才算好，缓存键带上其版本，算好后页面随之更新
+    return await cached_page(snapshot, ('detail', article_id, related_articles.version), lambda: render_page('detail.html', article=article, related=related))
+
+def api_error(code: int, message: str):
+    """API接口的统一错误响应"""
+    return jsonify({
+        'code': code,
+        'data': None,
+        'message': message
+    }), code
+
+async def cached_response(key: Hashable, build_body: Callable[[ArticleSnapshot], bytes], mimetype: str) -> Response:
+    """按快照版本缓存的响应，见 article_api.make_cached_response"""
+    snapshot = await article_store.get_snapshot()
+    return make_cached_response(request, Response, response_cache, snapshot, key, build_body, mimetype)
+
+@app.route('/api/articles')
+async def api_articles():
+    """API接口：获取文章列表，参数与同步服务相同（page / page_size / fields）"""
+    try:
+        page, page_size, fields = parse_list_query(request.args, app.config['API_MAX_PAGE_SIZE'])
+    except ArticleQueryError as e:
+        return api_error(400, str(e))
+
+    def build_body(snapshot: ArticleSnapshot) -> bytes:
+        return build_list_body(snapshot, page, page_size, fields)
+
+    return await cached_response(('articles', page, page_size, fields), build_body, 'application/json')
+
+@app.route('/api/article/<article_id>')
+async def api_article_detail(article_id: str):
+    """API接口：获取文章详情"""
+    article = await article_store.get_article(article_id)
+
+    if not article:
+        return api_error(404, 'Article not found')
+
+    return jsonify({
+        'code': 0,
+        'data': article,
+        'message': 'success'
+    })
+
+@app.route('/api/cache/stats')
+async def api_cache_stats():
+    """API接口：本 worker 的文章缓存统计"""
+    snapshot = await article_store.get_snapshot()
+    return jsonify({
+        'code': 0,
+        'data': {
+            'pid': os.getpid(),
+            'version': snapshot.version,
+            'articles': len(snapshot.articles),
+            'age': round(time.time() - snapshot.built_at, 1),
+            'counters': article_store.stats
+        },
+        'message': 'success'
+    })
+
+@app.route('/metrics')
+async def metrics():
+    """Prometheus 指标（本 worker）"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@app.errorhandler(404)
+async def not_found(error):
+    return await render_template('404.html'), 404
+
+@app.errorhandler(500)
+async def internal_error(error):
+    return await render_template('500.html'), 500
+
+if __name__ == '__main__':
+    app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,238 @@
+"""本地模拟的飞书开放平台，供压测与本地调试使用
+
+实现了本项目用到的接口：
+- POST /open-apis/auth/v3/tenant_access_token/internal
+- GET  /open-apis/bitable/v1/apps/<base_id>/tables/<table_id>/records
+- POST /open-apis/bitable/v1/apps/<base_id>/tables/<table_id>/records/search
+
+可配置记录数、单页上限、每次请求的延迟，以及按比例注入的错误（HTTP 状态码或令牌失效）。
+单独运行：
+
+    python benchmarks/fake_feishu.py --records 2000 --latency 50 --error-rate 0.02 --port 18080
+
+然后把应用的 FEISHU_BASE_URL 指向 http://127.0.0.1:18080/open-apis 即可。
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+TOKEN_PATH = '/open-apis/auth/v3/tenant_access_token/internal'
+RECORDS_PREFIX = '/open-apis/bitable/v1/apps/'
+# 飞书 records 接口 page_size 的上限
+MAX_PAGE_SIZE = 500
+TOKEN_INVALID_CODE = 99991663
+# 飞书按表格时区（默认东八区）的日期比较 ExactDate 条件
+TIMEZONE_OFFSET_MS = 8 * 3600 * 1000
+DAY_MS = 24 * 3600 * 1000
+
+
+def exact_date(timestamp_ms: int) -> int:
+    """毫秒时间戳在表格时区中的日期序号"""
+    return (timestamp_ms + TIMEZONE_OFFSET_MS) // DAY_MS
+
+
+def make_records(count: int, content_length: int = 600, seed: int = 42) -> List[Dict]:
+    """生成 count 条与真实表格字段一致的记录，内容可复现"""
+    rng = random.Random(seed)
+    words = ['公主', '青蛙', '国王', '森林', '魔法', '王子', '巫婆', '城堡', '金苹果', '小红帽', '狼', '猎人', '星星', '河流', '面包']
+    base_time = 1700000000000
+    records = []
+    for i in range(count):
+        content = ''.join(rng.choice(words) for _ in range(content_length // 2))[:content_length]
+        records.append({
+            'record_id': f"rec{i:07d}",
+            'last_modified_time': base_time + i,
+            'fields': {
+                '标题': f"{rng.choice(words)}与{rng.choice(words)}的故事 {i}",
+                '金句输出': ''.join(rng.choice(words) for _ in range(8)),
+                '黄叔点评': ''.join(rng.choice(words) for _ in range(20)),
+                '概要内容输出': content,
+                '最后更新时间': base_time + i
+            }
+        })
+    return records
+
+
+class FakeFeishuState:
+    """模拟服务的配置与请求计数（多线程共享）"""
+
+    def __init__(
+        self,
+        records: List[Dict],
+        max_page_size: int = MAX_PAGE_SIZE,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        token_expire: int = 7200,
+        seed: Optional[int] = None
+    ):
+        self.records = records
+        self.max_page_size = max_page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.token_expire = token_expire
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._token_serial = 0
+        self.counters: Dict[str, int] = dict.fromkeys(('token', 'records', 'search', 'injected_errors'), 0)
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self.error_rate > 0 and self._rng.random() < self.error_rate
+
+    def delay(self) -> float:
+        with self._lock:
+            return max(self.latency + self._rng.uniform(-self.jitter, self.jitter), 0)
+
+    def issue_token(self) -> str:
+        with self._lock:
+            self._token_serial += 1
+            return f"t-fake-{self._token_serial}"
+
+
+class FakeFeishuHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state: FakeFeishuState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: Dict, status: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def _inject(self) -> bool:
+        """模拟延迟，并按比例注入错误；返回是否已经发送了错误响应"""
+        time.sleep(self.state.delay())
+        if not self.state.should_fail():
+            return False
+        self.state.count('injected_errors')
+        if self.state.error_status == TOKEN_INVALID_CODE:
+            self._send_json({'code': TOKEN_INVALID_CODE, 'msg': 'invalid access token'})
+        else:
+            self._send_json({'code': -1, 'msg': 'injected error'}, self.state.error_status)
+        return True
+
+    def _page(self, records: List[Dict], query: Dict[str, List[str]], automatic_fields: bool) -> Dict:
+        page_size = min(int(query.get('page_size', ['20'])[0]), self.state.max_page_size)
+        offset = int(query.get('page_token', ['0'])[0] or 0)
+        field_names = json.loads(query['field_names'][0]) if 'field_names' in query else None
+        items = []
+        for record in records[offset:offset + page_size]:
+            item = {'record_id': record['record_id'], 'fields': record['fields']}
+            if field_names is not None:
+                item['fields'] = {name: value for name, value in record['fields'].items() if name in field_names}
+            if automatic_fields:
+                item['last_modified_time'] = record['last_modified_time']
+            items.append(item)
+        has_more = offset + page_size < len(records)
+        return {
+            'code': 0,
+            'msg': 'success',
+            'data': {
+                'items': items,
+                'has_more': has_more,
+                'page_token': str(offset + page_size) if has_more else None,
+                'total': len(records)
+            }
+        }
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._read_json()
+        if url.path == TOKEN_PATH:
+            self.state.count('token')
+            return self._send_json({
+                'code': 0,
+                'msg': 'ok',
+                'tenant_access_token': self.state.issue_token(),
+                'expire': self.state.token_expire
+            })
+        if url.path.startswith(RECORDS_PREFIX) and url.path.endswith('/records/search'):
+            self.state.count('search')
+            if self._inject():
+                return
+            since = 0
+            for condition in (body.get('filter') or {}).get('conditions') or []:
+                since = int(condition['value'][-1])
+            records = [record for record in self.state.records if exact_date(record['last_modified_time']) > exact_date(since)]
+            return self._send_json(self._page(records, parse_qs(url.query), automatic_fields=True))
+        self._send_json({'code': 404, 'msg': 'not found'}, 404)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith(RECORDS_PREFIX) and url.path.endswith('/records'):
+            self.state.count('records')
+            if self._inject():
+                return
+            query = parse_qs(url.query)
+            automatic_fields = query.get('automatic_fields', ['false'])[0] == 'true'
+            return self._send_json(self._page(self.state.records, query, automatic_fields))
+        self._send_json({'code': 404, 'msg': 'not found'}, 404)
+
+
+def start_fake_feishu(state: FakeFeishuState, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """在后台线程中启动模拟服务，port 为 0 时自动分配；返回的 server 调用 shutdown() 停止"""
+    handler = type('BoundFakeFeishuHandler', (FakeFeishuHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-feishu', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟的飞书多维表格服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--records', type=int, default=1000, help='记录条数')
+    parser.add_argument('--content-length', type=int, default=600, help='每条记录概要内容的字数')
+    parser.add_argument('--max-page-size', type=int, default=MAX_PAGE_SIZE, help='单页记录数上限')
+    parser.add_argument('--latency', type=float, default=0, help='每次请求的延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=0, help='延迟的随机波动（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0, help='注入错误的比例（0~1）')
+    parser.add_argument('--error-status', type=int, default=500, help=f"注入的 HTTP 状态码；{TOKEN_INVALID_CODE} 表示返回令牌失效")
+    args = parser.parse_args()
+
+    state = FakeFeishuState(
+        make_records(args.records, args.content_length),
+        max_page_size=args.max_page_size,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        error_status=args.error_status
+    )
+    server = start_fake_feishu(state, args.host, args.port)
+    print(f"fake feishu listening on http://{args.host}:{server.server_address[1]}/open-apis ({args.records} records)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
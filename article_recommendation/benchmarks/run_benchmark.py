@@ -0,0 +1,296 @@
+"""文章推荐站点的压测脚本
+
+启动本地模拟的飞书服务与应用进程（同步 Flask 或异步 ASGI 模式），按设定的并发度依次压测
+`/`、`/api/articles` 与 `/api/article/<id>`，输出各接口的 p50/p95/p99 延迟、吞吐量、
+错误数、文章缓存命中率与应用进程的峰值内存，并保存为 JSON 以便比较不同版本。
+
+    python benchmarks/run_benchmark.py --records 2000 --concurrency 1,8,32 --duration 10
+    python benchmarks/run_benchmark.py --server asgi --latency 80 --error-rate 0.05
+    python benchmarks/run_benchmark.py --compare benchmarks/results/上一次.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+from fake_feishu import FakeFeishuState, make_records, start_fake_feishu
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+ENDPOINTS = ('/', '/api/articles', '/api/article/<id>')
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """最近秩法求百分位数，sorted_values 须已排序"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(q / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def server_command(server: str, port: int) -> List[str]:
+    if server == 'asgi':
+        return [sys.executable, '-m', 'hypercorn', 'asgi_app:app', '--bind', f"127.0.0.1:{port}"]
+    return [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(port), '--no-reload', '--no-debugger', '--with-threads']
+
+
+def process_tree(pid: int) -> List[int]:
+    """pid 及其全部子孙进程（Linux 读取 /proc；hypercorn 等会在子进程中运行 worker）"""
+    parents: Dict[int, int] = {}
+    for name in os.listdir('/proc') if os.path.isdir('/proc') else []:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                parents[int(name)] = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    tree = [pid]
+    for current in tree:
+        tree.extend(child for child, parent in parents.items() if parent == current)
+    return tree
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """进程树的峰值常驻内存之和（读取 /proc 中的 VmHWM），无法获取时返回 None"""
+    total = None
+    for member in process_tree(pid):
+        try:
+            with open(f"/proc/{member}/status") as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        total = (total or 0) + int(line.split()[1]) / 1024
+        except OSError:
+            continue
+    return total
+
+
+def children_peak_rss_mb() -> float:
+    """已退出子进程的峰值内存（macOS 上 ru_maxrss 单位为字节，Linux 为 KB）"""
+    maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+
+
+class AppProcess:
+    """以子进程方式运行应用，飞书地址指向模拟服务，快照文件放在临时目录"""
+
+    def __init__(self, server: str, feishu_url: str, env: Dict[str, str]):
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        # stop() 时删除
+        self.snapshot_dir = tempfile.TemporaryDirectory(prefix='article-bench-')
+        self.env = dict(
+            os.environ,
+            FEISHU_BASE_URL=feishu_url,
+            FEISHU_APP_ID='bench',
+            FEISHU_APP_SECRET='bench',
+            ARTICLE_SNAPSHOT_PATH=os.path.join(self.snapshot_dir.name, 'articles_snapshot.json'),
+            **env
+        )
+        self.command = server_command(server, self.port)
+        self.process: Optional[subprocess.Popen] = None
+
+    def start(self, timeout: float = 60) -> float:
+        """启动并等待首个成功响应（冷启动加载完成），返回耗时（秒）"""
+        started = time.perf_counter()
+        self.process = subprocess.Popen(self.command, cwd=APP_DIR, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"应用进程启动失败，退出码 {self.process.returncode}: {' '.join(self.command)}")
+            try:
+                response = requests.get(f"{self.base_url}/api/articles", params={'page_size': 1}, timeout=timeout)
+                if response.ok and response.json().get('total'):
+                    return time.perf_counter() - started
+            except requests.RequestException:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError('等待应用启动超时')
+
+    def cache_stats(self) -> Dict[str, int]:
+        try:
+            return requests.get(f"{self.base_url}/api/cache/stats", timeout=10).json()['data']['counters']
+        except (requests.RequestException, ValueError, KeyError):
+            return {}
+
+    def stop(self) -> Optional[float]:
+        """停止进程并删除临时快照目录，返回其峰值内存（MB）"""
+        try:
+            if self.process is None:
+                return None
+            peak = peak_rss_mb(self.process.pid)
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            return peak if peak is not None else children_peak_rss_mb()
+        finally:
+            self.snapshot_dir.cleanup()
+
+
+def run_load(base_url: str, endpoint: str, article_ids: List[str], concurrency: int, duration: float, timeout: float) -> Dict:
+    """以 concurrency 个线程持续请求 duration 秒，每个线程使用自己的长连接"""
+    deadline = time.perf_counter() + duration
+    latencies: List[List[float]] = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+
+    def worker(index: int):
+        session = requests.Session()
+        rng = random.Random(index)
+        while time.perf_counter() < deadline:
+            path = endpoint.replace('<id>', rng.choice(article_ids)) if '<id>' in endpoint else endpoint
+            started = time.perf_counter()
+            try:
+                response = session.get(f"{base_url}{path}", timeout=timeout, headers={'Accept-Encoding': 'gzip'})
+                if response.status_code >= 400:
+                    errors[index] += 1
+            except requests.RequestException:
+                errors[index] += 1
+            latencies[index].append(time.perf_counter() - started)
+        session.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    samples = sorted(latency for per_worker in latencies for latency in per_worker)
+    return {
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'errors': sum(errors),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(samples, 50) * 1000, 2),
+            'p95': round(percentile(samples, 95) * 1000, 2),
+            'p99': round(percentile(samples, 99) * 1000, 2),
+            'mean': round(sum(samples) / len(samples) * 1000, 2) if samples else 0.0,
+            'max': round(samples[-1] * 1000, 2) if samples else 0.0
+        }
+    }
+
+
+def hit_ratio(before: Dict[str, int], after: Dict[str, int]) -> Optional[float]:
+    """两次统计之间的文章缓存命中率（过期命中也算命中）"""
+    delta = {name: after.get(name, 0) - before.get(name, 0) for name in ('hits', 'stale_hits', 'misses')}
+    total = sum(delta.values())
+    if not total:
+        return None
+    return round((delta['hits'] + delta['stale_hits']) / total, 4)
+
+
+def compare(current: Dict, baseline_path: str):
+    """打印与另一次结果的对比（吞吐量与 p95 的变化百分比）"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(item['endpoint'], item['concurrency']): item for item in baseline.get('results', [])}
+    print(f"\n与 {baseline_path} 对比：")
+    for item in current['results']:
+        old = previous.get((item['endpoint'], item['concurrency']))
+        if not old:
+            continue
+        rps_change = (item['throughput_rps'] / old['throughput_rps'] - 1) * 100 if old['throughput_rps'] else 0
+        p95_change = (item['latency_ms']['p95'] / old['latency_ms']['p95'] - 1) * 100 if old['latency_ms']['p95'] else 0
+        print(f"  {item['endpoint']:<20} c={item['concurrency']:<4} 吞吐 {rps_change:+.1f}%  p95 {p95_change:+.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='文章推荐站点压测')
+    parser.add_argument('--server', choices=('flask', 'asgi'), default='flask', help='同步 Flask 或异步 ASGI 模式')
+    parser.add_argument('--records', type=int, default=1000, help='模拟表格的记录条数')
+    parser.add_argument('--content-length', type=int, default=600, help='每条记录概要内容的字数')
+    parser.add_argument('--page-size', type=int, default=100, help='应用拉取飞书记录的分页大小（FEISHU_PAGE_SIZE）')
+    parser.add_argument('--max-page-size', type=int, default=500, help='模拟服务单页记录数上限')
+    parser.add_argument('--latency', type=float, default=20, help='模拟飞书每次请求的延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=5, help='延迟的随机波动（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0, help='模拟飞书注入错误的比例（0~1）')
+    parser.add_argument('--error-status', type=int, default=500, help='注入错误的 HTTP 状态码')
+    parser.add_argument('--cache-ttl', type=int, default=300, help='文章快照有效期（CACHE_DEFAULT_TIMEOUT）')
+    parser.add_argument('--concurrency', default='1,8,32', help='逗号分隔的并发度')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help='逗号分隔的压测路径')
+    parser.add_argument('--duration', type=float, default=10, help='每组压测的持续时间（秒）')
+    parser.add_argument('--timeout', type=float, default=30, help='单个请求的超时（秒）')
+    parser.add_argument('--output', help='结果 JSON 路径，默认保存到 benchmarks/results/')
+    parser.add_argument('--compare', help='与之前保存的结果 JSON 对比')
+    args = parser.parse_args()
+
+    state = FakeFeishuState(
+        make_records(args.records, args.content_length),
+        max_page_size=args.max_page_size,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=0
+    )
+    fake = start_fake_feishu(state)
+    feishu_url = f"http://127.0.0.1:{fake.server_address[1]}/open-apis"
+    app = AppProcess(args.server, feishu_url, {
+        'FEISHU_PAGE_SIZE': str(args.page_size),
+        'CACHE_DEFAULT_TIMEOUT': str(args.cache_ttl)
+    })
+
+    try:
+        cold_start = app.start(timeout=max(args.timeout, 60))
+        print(f"应用已启动（{args.server}），冷启动加载 {args.records} 条记录耗时 {cold_start:.2f}s")
+        article_ids = [record['record_id'] for record in state.records]
+        stats_before = app.cache_stats()
+        results = []
+        for endpoint in args.endpoints.split(','):
+            for concurrency in (int(value) for value in args.concurrency.split(',')):
+                result = run_load(app.base_url, endpoint, article_ids, concurrency, args.duration, args.timeout)
+                results.append(result)
+                latency = result['latency_ms']
+                print(
+                    f"{endpoint:<20} c={concurrency:<4} {result['throughput_rps']:>9.1f} req/s  "
+                    f"p50 {latency['p50']:.1f}ms  p95 {latency['p95']:.1f}ms  p99 {latency['p99']:.1f}ms  errors {result['errors']}"
+                )
+        stats_after = app.cache_stats()
+    finally:
+        peak_rss = app.stop()
+        fake.shutdown()
+
+    report = {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': vars(args),
+        'cold_start_seconds': round(cold_start, 3),
+        'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+        'cache': {
+            'hit_ratio': hit_ratio(stats_before, stats_after),
+            'counters': stats_after
+        },
+        'feishu_requests': dict(state.counters),
+        'results': results
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{args.server}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"缓存命中率 {report['cache']['hit_ratio']}，峰值内存 {report['peak_rss_mb']} MB，飞书请求 {report['feishu_requests']}")
+    print(f"结果已保存到 {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,15 +4,45 @@ class Config:
     # 飞书应用配置
     FEISHU_APP_ID = os.environ.get('FEISHU_APP_ID') or "cli_a7321294a738d01c"
     FEISHU_APP_SECRET = os.environ.get('FEISHU_APP_SECRET') or "L4uyDgQNH2xd7yE7A3BXubeTvrSy5dSy"
+    FEISHU_BASE_URL = os.environ.get('FEISHU_BASE_URL') or "https://open.feishu.cn/open-apis"
+    
+    # 飞书请求配置
+    FEISHU_HTTP_POOL_SIZE = int(os.environ.get('FEISHU_HTTP_POOL_SIZE') or 10)
+    FEISHU_HTTP_TIMEOUT = float(os.environ.get('FEISHU_HTTP_TIMEOUT') or 10)
+    FEISHU_MAX_RETRIES = int(os.environ.get('FEISHU_MAX_RETRIES') or 3)
+    # 令牌过期前多少秒主动刷新
+    FEISHU_TOKEN_REFRESH_MARGIN = int(os.environ.get('FEISHU_TOKEN_REFRESH_MARGIN') or 600)
     
     # 多维表格配置
     BASE_ID = os.environ.get('BASE_ID') or "HrG6bqJf4auKfPsn3cic4VSHnic"
     TABLE_ID = os.environ.get('TABLE_ID') or "tblRfPUAZ8ewftUA"
     
+    # 分页配置（飞书单页上限为500）
+    FEISHU_PAGE_SIZE = int(os.environ.get('FEISHU_PAGE_SIZE') or 100)
+    FEISHU_PREFETCH_WORKERS = int(os.environ.get('FEISHU_PREFETCH_WORKERS') or 2)
+    
+    # 增量同步配置：按“修改时间”字段只拉取变更的记录
+    ARTICLE_INCREMENTAL_SYNC = (os.environ.get('ARTICLE_INCREMENTAL_SYNC') or 'true').lower() == 'true'
+    FEISHU_MODIFIED_FIELD = os.environ.get('FEISHU_MODIFIED_FIELD') or "最后更新时间"
+    # 比对记录 id 以同步删除的间隔（秒）
+    ARTICLE_RECONCILE_INTERVAL = int(os.environ.get('ARTICLE_RECONCILE_INTERVAL') or 600)
+    
     # Flask配置
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key'
     DEBUG = True
     
-    # 缓存配置
-    CACHE_TYPE = 'simple'
-    CACHE_DEFAULT_TIMEOUT = 300
\ No newline at end of file
+    # 文章快照的有效期（秒），app.py 与 asgi_app.py 的 ArticleStore 都以此为 TTL
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT') or 300)
+    # 文章快照在 TTL 的多大比例时提前于后台刷新
+    ARTICLE_REFRESH_AHEAD = float(os.environ.get('ARTICLE_REFRESH_AHEAD') or 0.8)
+    # 刷新失败后的重试间隔（秒），期间继续使用旧快照
+    ARTICLE_REFRESH_RETRY_INTERVAL = int(os.environ.get('ARTICLE_REFRESH_RETRY_INTERVAL') or 30)
+    # 接口响应缓存与分页配置
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES') or 256)
+    # 渲染好的页面缓存条数（首页 + 每篇文章的详情页）
+    PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES') or 2048)
+    API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE') or 100)
+    # 每篇文章预先计算的相关文章数量
+    RELATED_TOP_K = int(os.environ.get('RELATED_TOP_K') or 10)
+    # 本地快照文件路径，为空时使用 instance/articles_snapshot.json
+    ARTICLE_SNAPSHOT_PATH = os.environ.get('ARTICLE_SNAPSHOT_PATH') or ''
@@ -0,0 +1,180 @@
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from article_store import records_to_articles
+from feishu_transport import (
+    RECORD_ID_PAGE_SIZE, FeishuAPIError, FeishuClientBase, changed_records_search, page_params,
+    record_ids_params, records_page, records_path
+)
+from metrics import FEISHU_TOKEN_REFRESHES, feishu_endpoint
+
+
+class AsyncFeishuAPI(FeishuClientBase):
+    """飞书多维表格接口的异步版本，供 ASGI 服务使用
+
+    与 FeishuTransport + FeishuAPI 行为一致（令牌、退避与响应解析由 FeishuClientBase 提供）：
+    - 基于 httpx.AsyncClient 的连接池，连接数与空闲长连接数有上限
+    - 每次调用都带超时（可按调用覆盖），429/5xx 及网络错误做指数退避重试（带随机抖动）
+    - 令牌刷新为单飞：同一时刻只有一个协程请求新令牌；令牌进入过期前 refresh_margin 秒后
+      由后台任务提前刷新，请求不会因为刷新令牌而等待
+    - 翻页时在处理当前页的同时预取下一页
+    """
+
+    def __init__(self, app_id: str, app_secret: str, page_size: int = 100, pool_size: int = 10, **kwargs):
+        super().__init__(app_id, app_secret, **kwargs)
+        self.page_size = page_size
+        self.pool_size = pool_size
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._token_lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """在首次使用时（事件循环内）创建连接池"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                timeout=httpx.Timeout(self.timeout)
+            )
+        return self._client
+
+    async def get_token(self) -> str:
+        """返回有效的访问令牌，必要时刷新"""
+        if self._is_token_valid():
+            return self._token
+        return await self.refresh_token()
+
+    async def refresh_token(self, stale_token: Optional[str] = None) -> str:
+        """刷新访问令牌；传入 stale_token 时若其他协程已换上新令牌则直接返回"""
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            if not self._needs_refresh(stale_token):
+                return self._token
+            url, payload = self._token_request()
+            try:
+                data = await self._send('POST', url, json=payload)
+            except FeishuAPIError:
+                FEISHU_TOKEN_REFRESHES.inc(result='error')
+                raise
+            self._schedule_refresh(self._accept_token(data))
+            return self._token
+
+    def _schedule_refresh(self, expire: float):
+        """在令牌过期前 refresh_margin 秒安排后台刷新"""
+        current = asyncio.current_task()
+        if self._refresh_task and self._refresh_task is not current:
+            self._refresh_task.cancel()
+        self._refresh_task = asyncio.create_task(self._background_refresh(self._refresh_delay(expire)))
+
+    async def _background_refresh(self, delay: float):
+        await asyncio.sleep(delay)
+        while True:
+            try:
+                await self.refresh_token(self._token)
+                return
+            except FeishuAPIError as e:
+                # 旧令牌仍在有效期内，稍后再试
+                self.logger.warning(f"后台刷新访问令牌失败，30秒后重试: {str(e)}")
+                await asyncio.sleep(30)
+
+    async def _send(self, method: str, url: str, timeout: Optional[float] = None, **kwargs) -> Dict:
+        """发送请求并解析 JSON，对可重试的失败进行退避重试"""
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        endpoint = feishu_endpoint(url)
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                self._network_error(e, endpoint, started, attempt == self.max_retries)
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            if self._should_retry(response, url, endpoint, started, attempt):
+                await asyncio.sleep(self._backoff(attempt, response))
+                continue
+            return self._parse_response(response, url, httpx.HTTPStatusError)
+
+    async def request(self, method: str, path: str, timeout: Optional[float] = None, **kwargs) -> Dict:
+        """携带访问令牌调用飞书接口，返回解析后的 JSON；timeout 覆盖本次调用的超时"""
+        url = f"{self.base_url}{path}"
+        token = await self.get_token()
+        for _ in range(2):
+            headers = self._authorized(kwargs, token)
+            data = await self._send(method, url, timeout=timeout, headers=headers, **kwargs)
+            if not self._is_token_rejected(data):
+                return data
+            token = await self.refresh_token(token)
+            kwargs['headers'] = headers
+        return data
+
+    async def _fetch_records_page(self, base_id: str, table_id: str, page_size: int, page_token: Optional[str], params: Optional[Dict] = None, search: Optional[Dict] = None) -> Dict:
+        """拉取多维表格的一页记录，返回接口的 data 部分；传入 search 时调用记录搜索接口"""
+        path = records_path(base_id, table_id)
+        params = page_params(params, page_size, page_token)
+
+        started = time.perf_counter()
+        if search is None:
+            data = await self.request('GET', path, params=params)
+        else:
+            data = await self.request('POST', f"{path}/search", params=params, json=search)
+        elapsed = time.perf_counter() - started
+
+        page = records_page(data)
+        self.logger.debug(f"拉取表格记录一页: {len(page.get('items') or [])} 条, 耗时 {elapsed * 1000:.1f} ms (page_size={page_size})")
+        return page
+
+    async def iter_record_pages(self, base_id: str, table_id: str, page_size: Optional[int] = None, params: Optional[Dict] = None, search: Optional[Dict] = None) -> AsyncIterator[List[Dict]]:
+        """逐页产出多维表格记录，拿到当前页后立即创建任务预取下一页"""
+        page_size = page_size or self.page_size
+
+        def fetch(page_token: Optional[str]) -> asyncio.Task:
+            return asyncio.create_task(self._fetch_records_page(base_id, table_id, page_size, page_token, params, search))
+
+        pending = fetch(None)
+        try:
+            while pending is not None:
+                page = await pending
+                page_token = page.get("page_token")
+                pending = fetch(page_token) if page.get("has_more") and page_token else None
+                yield page.get("items") or []
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def iter_table_records(self, base_id: str, table_id: str, page_size: Optional[int] = None, automatic_fields: bool = False) -> AsyncIterator[Dict]:
+        """逐条产出多维表格的全部记录（自动翻页）；automatic_fields 为 True 时带上 last_modified_time"""
+        params = {"automatic_fields": "true"} if automatic_fields else None
+        async for items in self.iter_record_pages(base_id, table_id, page_size, params=params):
+            for record in items:
+                yield record
+
+    async def iter_changed_records(self, base_id: str, table_id: str, modified_field: str, since_ms: int, page_size: Optional[int] = None) -> AsyncIterator[Dict]:
+        """逐条产出 modified_field 的日期晚于 since_ms 所在日期的记录（见 changed_records_search）"""
+        search = changed_records_search(modified_field, since_ms)
+        async for items in self.iter_record_pages(base_id, table_id, page_size, search=search):
+            for record in items:
+                yield record
+
+    async def iter_record_ids(self, base_id: str, table_id: str, id_field: str) -> AsyncIterator[str]:
+        """逐个产出表格中全部记录的 record_id"""
+        async for items in self.iter_record_pages(base_id, table_id, RECORD_ID_PAGE_SIZE, params=record_ids_params(id_field)):
+            for record in items:
+                yield record.get("record_id")
+
+    async def load_articles(self, base_id: str, table_id: str) -> List[Dict]:
+        """加载全部文章，失败时抛出 FeishuAPIError"""
+        records = [record async for record in self.iter_table_records(base_id, table_id)]
+        return records_to_articles(records)
+
+    async def aclose(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,283 @@
+import json
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import FEISHU_REQUEST_SECONDS, FEISHU_TOKEN_REFRESHES, feishu_endpoint
+
+# 表示访问令牌无效或过期的飞书错误码，遇到时强制刷新令牌后重试一次
+TOKEN_INVALID_CODES = {99991661, 99991663, 99991668}
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# 只拉取 record_id 时使用接口允许的最大分页
+RECORD_ID_PAGE_SIZE = 500
+
+
+class FeishuAPIError(Exception):
+    """飞书接口返回错误或请求失败，code 为飞书返回的业务错误码（网络错误时为 None）"""
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
+
+
+def records_path(base_id: str, table_id: str) -> str:
+    return f"/bitable/v1/apps/{base_id}/tables/{table_id}/records"
+
+
+def page_params(params: Optional[Dict], page_size: int, page_token: Optional[str]) -> Dict:
+    params = dict(params or {}, page_size=page_size)
+    if page_token:
+        params["page_token"] = page_token
+    return params
+
+
+def records_page(data: Dict) -> Dict:
+    """校验记录接口的响应，返回其中的 data 部分"""
+    if data.get("code") != 0:
+        raise FeishuAPIError(f"获取表格记录失败: {data.get('msg')}", data.get("code"))
+    return data.get("data") or {}
+
+
+def changed_records_search(modified_field: str, since_ms: int) -> Dict:
+    """记录搜索接口的请求体：modified_field（“修改时间”类型字段）的日期晚于 since_ms 所在日期
+
+    飞书的 ExactDate 条件只按天比较，since_ms 当天修改的记录不会返回。
+    """
+    return {
+        "automatic_fields": True,
+        "filter": {
+            "conjunction": "and",
+            "conditions": [{
+                "field_name": modified_field,
+                "operator": "isGreater",
+                "value": ["ExactDate", str(since_ms)]
+            }]
+        }
+    }
+
+
+def record_ids_params(id_field: str) -> Dict:
+    """只请求 id_field 一个字段以减小响应体"""
+    return {"field_names": json.dumps([id_field], ensure_ascii=False)}
+
+
+class FeishuClientBase:
+    """同步与异步飞书客户端共用的部分：令牌的缓存与校验、退避时间、重试判断与响应解析
+
+    子类只负责发送请求、加锁与安排后台刷新。
+    """
+
+    def __init__(
+        self,
+        app_id: str,
+        app_secret: str,
+        base_url: str = "https://open.feishu.cn/open-apis",
+        timeout: float = 10,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8,
+        refresh_margin: float = 600,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.refresh_margin = refresh_margin
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+
+    @property
+    def token(self) -> Optional[str]:
+        """当前缓存的访问令牌（可能已过期）"""
+        return self._token
+
+    def _is_token_valid(self) -> bool:
+        return self._token is not None and time.monotonic() < self._token_expires_at
+
+    def _needs_refresh(self, stale_token: Optional[str]) -> bool:
+        """持锁后判断：传入 stale_token 时若其他线程（协程）已换上新令牌则不必再请求"""
+        return not (self._is_token_valid() and (stale_token is None or self._token != stale_token))
+
+    def _token_request(self) -> Tuple[str, Dict]:
+        url = f"{self.base_url}/auth/v3/tenant_access_token/internal"
+        payload = {
+            "app_id": self.app_id,
+            "app_secret": self.app_secret
+        }
+        return url, payload
+
+    def _accept_token(self, data: Dict) -> float:
+        """校验令牌接口的响应并保存令牌，返回有效期（秒）"""
+        if data.get("code") != 0:
+            FEISHU_TOKEN_REFRESHES.inc(result='error')
+            raise FeishuAPIError(f"获取访问令牌失败: {data.get('msg')}", data.get("code"))
+        FEISHU_TOKEN_REFRESHES.inc(result='success')
+
+        expire = float(data.get("expire") or 0)
+        self._token = data.get("tenant_access_token")
+        self._token_expires_at = time.monotonic() + expire
+        return expire
+
+    def _refresh_delay(self, expire: float) -> float:
+        """在令牌过期前 refresh_margin 秒刷新"""
+        return max(expire - self.refresh_margin, 1)
+
+    def _backoff(self, attempt: int, response=None) -> float:
+        """指数退避 + 全抖动；服务端给出限流重置时间时以其为下限"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if response is not None:
+            reset = response.headers.get('x-ogw-ratelimit-reset') or response.headers.get('Retry-After')
+            if reset and reset.isdigit():
+                delay = max(delay, min(float(reset), self.backoff_max))
+        return delay
+
+    def _network_error(self, error: Exception, endpoint: str, started: float, is_last_attempt: bool):
+        """记录一次网络错误，最后一次尝试时抛出 FeishuAPIError"""
+        FEISHU_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, status='error')
+        if is_last_attempt:
+            raise FeishuAPIError(f"请求飞书接口时发生错误: {str(error) or type(error).__name__}") from error
+
+    def _should_retry(self, response, url: str, endpoint: str, started: float, attempt: int) -> bool:
+        """记录响应耗时，429/5xx 且还有重试次数时返回 True"""
+        FEISHU_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, status=response.status_code)
+        if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+            self.logger.warning(f"飞书接口返回 {response.status_code}，第 {attempt + 1} 次重试: {url}")
+            return True
+        return False
+
+    def _parse_response(self, response, url: str, http_error) -> Dict:
+        """解析 JSON 响应；无法解析时按 HTTP 状态（http_error 为对应 HTTP 库的异常类型）报错"""
+        try:
+            return response.json()
+        except ValueError:
+            pass
+        try:
+            response.raise_for_status()
+        except http_error as e:
+            raise FeishuAPIError(f"请求飞书接口时发生错误: {str(e)}") from e
+        raise FeishuAPIError(f"飞书接口返回了无法解析的响应: {url}")
+
+    def _authorized(self, kwargs: Dict, token: str) -> Dict:
+        """携带访问令牌的请求头"""
+        headers = dict(kwargs.pop('headers', None) or {})
+        headers["Authorization"] = f"Bearer {token}"
+        headers.setdefault("Content-Type", "application/json")
+        return headers
+
+    def _is_token_rejected(self, data: Dict) -> bool:
+        if data.get("code") not in TOKEN_INVALID_CODES:
+            return False
+        self.logger.info("访问令牌已失效，刷新后重试")
+        return True
+
+
+class FeishuTransport(FeishuClientBase):
+    """飞书开放平台的 HTTP 传输层
+
+    - 基于 requests.Session 的长连接池，复用 TCP/TLS 连接
+    - 缓存 tenant_access_token 并记录过期时间，在过期前由后台定时器主动刷新
+    - 并发场景下令牌刷新为单飞（single-flight）：同一时刻只有一个线程请求新令牌
+    - 对 429/5xx 及网络错误做有限次数的指数退避重试（带随机抖动）
+    """
+
+    def __init__(self, app_id: str, app_secret: str, pool_size: int = 10, **kwargs):
+        super().__init__(app_id, app_secret, **kwargs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._token_lock = threading.Lock()
+        self._refresh_timer: Optional[threading.Timer] = None
+
+    def get_token(self) -> str:
+        """返回有效的访问令牌，必要时刷新"""
+        if self._is_token_valid():
+            return self._token
+        return self.refresh_token()
+
+    def refresh_token(self, stale_token: Optional[str] = None) -> str:
+        """刷新访问令牌
+
+        传入 stale_token 时表示调用方发现该令牌已失效：若其他线程已经换上了新令牌，
+        直接返回新令牌而不再重复请求。
+        """
+        with self._token_lock:
+            if not self._needs_refresh(stale_token):
+                return self._token
+            url, payload = self._token_request()
+            try:
+                data = self._send('POST', url, json=payload)
+            except FeishuAPIError:
+                FEISHU_TOKEN_REFRESHES.inc(result='error')
+                raise
+            self._schedule_refresh(self._accept_token(data))
+            return self._token
+
+    def _schedule_refresh(self, expire: float):
+        """在令牌过期前 refresh_margin 秒安排后台刷新"""
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+        self._refresh_timer = threading.Timer(self._refresh_delay(expire), self._background_refresh)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _background_refresh(self):
+        stale_token = self._token
+        try:
+            self.refresh_token(stale_token)
+        except FeishuAPIError as e:
+            # 旧令牌仍在有效期内，稍后再试
+            self.logger.warning(f"后台刷新访问令牌失败，30秒后重试: {str(e)}")
+            self._refresh_timer = threading.Timer(30, self._background_refresh)
+            self._refresh_timer.daemon = True
+            self._refresh_timer.start()
+
+    def _send(self, method: str, url: str, **kwargs) -> Dict:
+        """发送请求并解析 JSON，对可重试的失败进行退避重试"""
+        kwargs.setdefault('timeout', self.timeout)
+        endpoint = feishu_endpoint(url)
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._network_error(e, endpoint, started, attempt == self.max_retries)
+                time.sleep(self._backoff(attempt))
+                continue
+            if self._should_retry(response, url, endpoint, started, attempt):
+                time.sleep(self._backoff(attempt, response))
+                continue
+            return self._parse_response(response, url, requests.RequestException)
+
+    def request(self, method: str, path: str, **kwargs) -> Dict:
+        """携带访问令牌调用飞书接口，返回解析后的 JSON
+
+        令牌失效时刷新一次后重试；业务错误码由调用方处理。
+        """
+        url = f"{self.base_url}{path}"
+        token = self.get_token()
+        for _ in range(2):
+            headers = self._authorized(kwargs, token)
+            data = self._send(method, url, headers=headers, **kwargs)
+            if not self._is_token_rejected(data):
+                return data
+            token = self.refresh_token(token)
+            kwargs['headers'] = headers
+        return data
+
+    def close(self):
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+        self.session.close()
@@ -0,0 +1,233 @@
+"""进程内的运行指标，按 Prometheus 文本格式输出
+
+只依赖标准库：每个指标一把锁，observe/inc 只做一次二分查找与几次加法，可以常开。
+指标按进程统计，多 worker 部署时由 Prometheus 分别抓取后聚合。
+"""
+import abc
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 默认的延迟分桶（秒），覆盖 1ms ~ 10s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric(abc.ABC):
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """指标的全部样本行（不含 HELP / TYPE）"""
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：各分桶（不累计）的计数、总数、总和
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            state[0][index] += 1
+            state[1] += 1
+            state[2] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, ([*counts], count, total)) for key, (counts, count, total) in self._values.items())
+        lines = []
+        for key, (counts, count, total) in values:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float('inf')), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+        return lines
+
+
+class GaugeCallback(_Metric):
+    """取值时才计算的指标（例如快照年龄），callback 返回 {标签值元组: 数值}"""
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], Dict[Tuple[str, ...], float]], labelnames: Sequence[str] = (), kind: str = 'gauge'):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in sorted(self.callback().items())]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name: str, documentation: str, callback: Callable[[], Dict[Tuple[str, ...], float]], labelnames: Sequence[str] = (), kind: str = 'gauge') -> GaugeCallback:
+        """注册取值时回调的指标；同名指标再次注册时替换回调（例如测试中重新创建应用）"""
+        metric = GaugeCallback(name, documentation, callback, labelnames, kind)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus 文本格式（text/plain; version=0.0.4）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            samples = metric.samples()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 飞书接口：每次 HTTP 请求（含重试）的耗时，status 为 HTTP 状态码或 error（网络错误）
+FEISHU_REQUEST_SECONDS = REGISTRY.histogram(
+    'feishu_request_duration_seconds', '飞书接口单次 HTTP 请求耗时', ('endpoint', 'status')
+)
+FEISHU_TOKEN_REFRESHES = REGISTRY.counter(
+    'feishu_token_refresh_total', '访问令牌刷新次数', ('result',)
+)
+# 文章数据的加工与缓存
+ARTICLE_TRANSFORM_SECONDS = REGISTRY.histogram(
+    'article_transform_duration_seconds', '记录转换为文章的耗时（每批）'
+)
+ARTICLE_REFRESH_SECONDS = REGISTRY.histogram(
+    'article_refresh_duration_seconds', '文章快照刷新（拉取、转换、构建快照）耗时', ('result',), buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+SNAPSHOT_FILE_SECONDS = REGISTRY.histogram(
+    'article_snapshot_file_duration_seconds', '本地快照文件读写（含 JSON 序列化）耗时', ('operation',)
+)
+RESPONSE_CACHE_REQUESTS = REGISTRY.counter(
+    'response_cache_requests_total', '接口响应缓存查询次数', ('result',)
+)
+RESPONSE_CACHE_BUILD_SECONDS = REGISTRY.histogram(
+    'response_cache_build_duration_seconds', '接口响应体序列化与 gzip 压缩耗时'
+)
+# 页面与请求
+TEMPLATE_RENDER_SECONDS = REGISTRY.histogram(
+    'template_render_duration_seconds', 'Jinja 模板渲染耗时', ('template',)
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', '请求处理耗时', ('endpoint', 'method', 'status')
+)
+
+
+def feishu_endpoint(url: str) -> str:
+    """把飞书接口地址归类为少量固定的标签值，避免 base_id / table_id 造成标签爆炸"""
+    if 'tenant_access_token' in url:
+        return 'token'
+    if url.endswith('/records/search'):
+        return 'records_search'
+    if url.endswith('/records'):
+        return 'records'
+    return 'other'
+
+
+def register_store_metrics(store, registry: Optional[MetricsRegistry] = None):
+    """把 ArticleStore / AsyncArticleStore 的命中计数、快照年龄与文章数注册为指标"""
+    registry = registry or REGISTRY
+
+    def snapshot_gauge(read: Callable) -> Callable[[], Dict[Tuple[str, ...], float]]:
+        def callback():
+            snapshot = store.current_snapshot
+            return {(): read(snapshot)} if snapshot is not None else {}
+        return callback
+
+    registry.gauge_callback(
+        'article_cache_events_total', '文章快照缓存事件（命中、过期命中、未命中、拉取等）',
+        lambda: {(name,): value for name, value in store.stats.items()}, ('event',), kind='counter'
+    )
+    registry.gauge_callback(
+        'article_snapshot_age_seconds', '当前文章快照距上次刷新的秒数', snapshot_gauge(lambda snapshot: round(time.time() - snapshot.built_at, 3))
+    )
+    registry.gauge_callback(
+        'article_snapshot_articles', '当前文章快照中的文章数', snapshot_gauge(lambda snapshot: len(snapshot.articles))
+    )
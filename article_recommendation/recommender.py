@@ -0,0 +1,245 @@
+import hashlib
+import logging
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from article_store import ArticleSnapshot
+from search_index import tokenize
+
+# 参与相似度计算的字段及权重
+RECOMMEND_FIELDS = {
+    'title': 2.0,
+    'quote': 1.0,
+    'review': 1.0,
+    'content': 1.0
+}
+
+
+class RelatedArticles:
+    """基于哈希 n-gram TF-IDF 与余弦相似度的“相关文章”推荐
+
+    快照变化时（在后台线程中计算，不阻塞快照发布）：
+    1. 每篇文章的特征（词项哈希桶及权重）按内容指纹缓存，只为新增或修改的文章重新分词
+    2. 所有文章拼成一个 CSR 稀疏矩阵，计算 IDF；出现在超过 max_df 比例文章中的特征区分度低，直接去掉，
+       每篇文章只保留权重最高的 max_terms 个特征并做 L2 归一化
+    3. 按行分块做稀疏矩阵乘法得到余弦相似度，用 argpartition 取每行的 top-k
+    结果预先算好，请求时只做一次字典查找；新结果算好之前沿用上一个快照的结果。
+    """
+
+    def __init__(
+        self,
+        top_k: int = 10,
+        n_features: int = 2 ** 18,
+        max_terms: int = 64,
+        max_df: float = 0.2,
+        block_size: int = 1024,
+        max_block_cells: int = 2 ** 23,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.top_k = top_k
+        self.n_features = n_features
+        self.max_terms = max_terms
+        self.max_df = max_df
+        self.block_size = block_size
+        # 相似度块转为稠密矩阵时的元素数上限（float32，默认 32MB）
+        self.max_block_cells = max_block_cells
+        self.logger = logger or logging.getLogger(__name__)
+        self._features: Dict[str, Tuple[str, np.ndarray, np.ndarray]] = {}
+        self._related: Dict[str, List[Tuple[str, float]]] = {}
+        self._articles: Dict[str, Dict] = {}
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        # 等待计算的最新快照；计算期间再有新快照只保留最后一个
+        self._pending: Optional[ArticleSnapshot] = None
+        self._worker: Optional[threading.Thread] = None
+        self._idle = threading.Event()
+        self._idle.set()
+
+    @property
+    def version(self) -> Optional[str]:
+        """当前推荐结果对应的快照版本，尚未算出结果时为 None"""
+        return self._version
+
+    @staticmethod
+    def _fingerprint(article: Dict) -> str:
+        text = '\x1f'.join(article.get(name) or '' for name in RECOMMEND_FIELDS)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _vectorize(self, article: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        """返回文章的 (特征列号, 次线性词频) 两个数组"""
+        counts: Dict[int, float] = {}
+        for name, weight in RECOMMEND_FIELDS.items():
+            for token, count in Counter(tokenize(article.get(name) or '', for_query=True)).items():
+                # 用 crc32 而不是 hash()：字符串的 hash 每个进程随机，同一文章在各 worker 中的特征应当一致
+                column = zlib.crc32(token.encode('utf-8')) % self.n_features
+                counts[column] = counts.get(column, 0.0) + weight * count
+        columns = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        return columns, 1 + np.log(values, dtype=np.float32)
+
+    def update(self, snapshot: ArticleSnapshot):
+        """登记新快照并在后台线程中重新计算：可直接作为 ArticleStore.subscribe 的回调，立即返回"""
+        with self._lock:
+            self._pending = snapshot
+            self._idle.clear()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='related-articles', daemon=True)
+                self._worker.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待已登记的快照全部计算完成，超时返回 False"""
+        return self._idle.wait(timeout)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                snapshot, self._pending = self._pending, None
+                if snapshot is None:
+                    self._worker = None
+                    self._idle.set()
+                    return
+            try:
+                self._rebuild(snapshot)
+            except Exception:
+                self.logger.exception("计算相关文章时发生错误")
+
+    def _rebuild(self, snapshot: ArticleSnapshot):
+        """与快照同步并重新计算全部文章的 top-k 相似文章"""
+        started = time.perf_counter()
+        article_ids = [article['id'] for article in snapshot.articles]
+        features = {}
+        for article in snapshot.articles:
+            fingerprint = self._fingerprint(article)
+            cached = self._features.get(article['id'])
+            if cached is None or cached[0] != fingerprint:
+                cached = (fingerprint, *self._vectorize(article))
+            features[article['id']] = cached
+
+        related = self._compute(article_ids, [features[article_id] for article_id in article_ids])
+        with self._lock:
+            self._features = features
+            self._related = related
+            self._articles = snapshot.by_id
+            self._version = snapshot.version
+        self.logger.info(f"相关文章已重新计算: {len(article_ids)} 篇, 耗时 {time.perf_counter() - started:.2f}s")
+
+    def _compute(self, article_ids: List[str], features: List[Tuple[str, np.ndarray, np.ndarray]]) -> Dict[str, List[Tuple[str, float]]]:
+        n_docs = len(article_ids)
+        if n_docs < 2:
+            return {article_id: [] for article_id in article_ids}
+
+        lengths = np.fromiter((len(columns) for _, columns, _ in features), dtype=np.int64, count=n_docs)
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        indices = np.concatenate([columns for _, columns, _ in features])
+        data = np.concatenate([values for _, _, values in features])
+        matrix = sparse.csr_matrix((data, indices, indptr), shape=(n_docs, self.n_features))
+
+        document_frequency = np.bincount(indices, minlength=self.n_features)
+        idf = (np.log((1 + n_docs) / (1 + document_frequency)) + 1).astype(np.float32)
+        # 过于常见的特征几乎不区分文章，却会让相似度矩阵接近稠密，计算前直接去掉
+        idf[document_frequency > max(self.max_df * n_docs, 2)] = 0
+        matrix.data *= idf[matrix.indices]
+        matrix.eliminate_zeros()
+        matrix = self._keep_top_terms(matrix)
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        matrix.data /= np.repeat(norms, np.diff(matrix.indptr)).astype(np.float32)
+        transposed = matrix.T.tocsr()
+
+        related: Dict[str, List[Tuple[str, float]]] = {}
+        block_size = max(1, min(self.block_size, self.max_block_cells // n_docs))
+        for start in range(0, n_docs, block_size):
+            stop = min(start + block_size, n_docs)
+            similarities = (matrix[start:stop] @ transposed).tocsr()
+            # 乘积较稠密时转为稠密矩阵按行 argpartition，否则直接在稀疏结构上选取
+            if similarities.nnz * 4 >= (stop - start) * n_docs:
+                top = _top_k_dense(similarities.toarray(), start, self.top_k)
+            else:
+                top = _top_k_sparse(similarities, start, self.top_k)
+            for row, (columns, scores) in enumerate(top):
+                related[article_ids[start + row]] = [
+                    (article_ids[column], score) for column, score in zip(columns, scores)
+                ]
+        return related
+
+    def _keep_top_terms(self, matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+        """每篇文章只保留 TF-IDF 权重最高的 max_terms 个特征
+
+        常见二元组几乎在每篇文章中出现，全部保留会让相似度矩阵接近稠密，
+        稀疏矩阵乘法的开销随之变成 O(n²)；截断后乘积保持稀疏，也减少了噪声。
+        """
+        keep = np.ones(matrix.nnz, dtype=bool)
+        for row in np.flatnonzero(np.diff(matrix.indptr) > self.max_terms):
+            start, stop = matrix.indptr[row], matrix.indptr[row + 1]
+            weakest = np.argpartition(matrix.data[start:stop], -self.max_terms)[:-self.max_terms]
+            keep[start + weakest] = False
+        if keep.all():
+            return matrix
+        return sparse.csr_matrix((matrix.data[keep], (_row_ids(matrix)[keep], matrix.indices[keep])), shape=matrix.shape)
+
+    def get_related(self, article_id: str, limit: Optional[int] = None, articles: Optional[Dict[str, Dict]] = None) -> List[Tuple[Dict, float]]:
+        """返回 (相关文章, 相似度) 列表，按相似度从高到低排列
+
+        articles 为当前快照的 by_id 时，结果按当前快照取文章，已删除的文章不会出现在结果中。
+        """
+        with self._lock:
+            related = self._related.get(article_id) or []
+            articles = articles if articles is not None else self._articles
+        return [(articles[related_id], score) for related_id, score in related[:limit or self.top_k] if related_id in articles]
+
+
+def _row_ids(matrix: sparse.csr_matrix) -> np.ndarray:
+    """CSR 矩阵每个非零元素所在的行号"""
+    return np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+
+
+def _top_k_sparse(similarities: sparse.csr_matrix, offset: int, k: int) -> List[Tuple[List[int], List[float]]]:
+    """稀疏相似度块中每行的 top-k（去掉文章与自身），返回每行的 (列号列表, 相似度列表)"""
+    rows = _row_ids(similarities)
+    similarities.data[similarities.indices == rows + offset] = 0
+    similarities.eliminate_zeros()
+    rows = _row_ids(similarities)
+    selected = _top_per_row(similarities, rows, k)
+    columns = similarities.indices[selected].tolist()
+    scores = similarities.data[selected].tolist()
+    boundaries = np.searchsorted(rows[selected], np.arange(similarities.shape[0] + 1)).tolist()
+    return [
+        (columns[boundaries[row]:boundaries[row + 1]], scores[boundaries[row]:boundaries[row + 1]])
+        for row in range(similarities.shape[0])
+    ]
+
+
+def _top_k_dense(similarities: np.ndarray, offset: int, k: int) -> List[Tuple[List[int], List[float]]]:
+    """稠密相似度块中每行的 top-k（去掉文章与自身与相似度为 0 的文章），返回每行的 (列号列表, 相似度列表)"""
+    n_rows, n_columns = similarities.shape
+    similarities[np.arange(n_rows), np.arange(offset, offset + n_rows)] = 0
+    k = min(k, n_columns)
+    if k < n_columns:
+        candidates = np.argpartition(similarities, n_columns - k, axis=1)[:, n_columns - k:]
+    else:
+        candidates = np.broadcast_to(np.arange(n_columns), (n_rows, n_columns))
+    values = np.take_along_axis(similarities, candidates, axis=1)
+    order = np.argsort(-values, axis=1)
+    candidates = np.take_along_axis(candidates, order, axis=1).tolist()
+    values = np.take_along_axis(values, order, axis=1).tolist()
+    return [
+        ([column for column, score in zip(columns, scores) if score > 0], [score for score in scores if score > 0])
+        for columns, scores in zip(candidates, values)
+    ]
+
+
+def _top_per_row(matrix: sparse.csr_matrix, rows: np.ndarray, n: int) -> np.ndarray:
+    """每行取值最大的 n 个非零元素，返回它们在 matrix.data 中的下标（按行、再按值从大到小排列）
+
+    元素取值须在 [0, 2) 内（余弦相似度），这样 行号 * 4 - 值 一个键即可完成“按行、再按值降序”的排序，
+    比 np.lexsort 快数倍。
+    """
+    order = np.argsort(rows * 4.0 - matrix.data)
+    ranks = np.arange(matrix.nnz) - matrix.indptr[rows[order]]
+    return order[ranks < n]
@@ -0,0 +1,86 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Hashable, Optional, Tuple
+
+from metrics import RESPONSE_CACHE_BUILD_SECONDS, RESPONSE_CACHE_REQUESTS
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    """序列化好的响应体及其 gzip 压缩版本"""
+    body: bytes
+    gzipped: bytes
+
+
+class VersionedResponseCache:
+    """按快照版本缓存序列化后的响应体
+
+    条目以 (快照版本, key) 为键，同一快照版本下每个 key（接口 + 参数）只序列化、压缩一次。
+    publish 新版本后才淘汰旧版本的条目：还持有旧快照的请求不会清空新版本的缓存，
+    旧版本的请求也不会再写入条目。
+    条目数有上限，按最近使用淘汰，避免参数组合过多时占用过多内存。
+    """
+
+    def __init__(self, max_entries: int = 256, compresslevel: int = 6):
+        self.max_entries = max_entries
+        self.compresslevel = compresslevel
+        # 最近一次发布的快照版本；未发布过时不限制版本，只按条数淘汰
+        self._version: Optional[str] = None
+        self._entries: 'OrderedDict[Tuple[str, Hashable], CachedBody]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def publish(self, version: str):
+        """新快照发布后调用：淘汰其他版本的条目，之后只缓存该版本的响应"""
+        with self._lock:
+            if version == self._version:
+                return
+            self._version = version
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[0] != version]:
+                del self._entries[entry_key]
+
+    @staticmethod
+    def etag(version: str, key: Hashable) -> str:
+        """由快照版本与 key 得到强 ETag，不需要先序列化响应体"""
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:12]
+        return f"{version}-{digest}"
+
+    def _lookup(self, version: str, key: Hashable) -> Optional[CachedBody]:
+        with self._lock:
+            cached = self._entries.get((version, key))
+            if cached is not None:
+                self._entries.move_to_end((version, key))
+        RESPONSE_CACHE_REQUESTS.inc(result='hit' if cached is not None else 'miss')
+        return cached
+
+    def _store(self, version: str, key: Hashable, body: bytes) -> CachedBody:
+        cached = CachedBody(body=body, gzipped=gzip.compress(body, compresslevel=self.compresslevel, mtime=0))
+        with self._lock:
+            if self._version is None or version == self._version:
+                self._entries[(version, key)] = cached
+                self._entries.move_to_end((version, key))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return cached
+
+    def get_or_build(self, version: str, key: Hashable, build: Callable[[], bytes]) -> CachedBody:
+        cached = self._lookup(version, key)
+        if cached is not None:
+            return cached
+        # 在锁外序列化，并发构建同一个 key 时结果相同，后写入的覆盖即可
+        with RESPONSE_CACHE_BUILD_SECONDS.time():
+            return self._store(version, key, build())
+
+    async def get_or_build_async(self, version: str, key: Hashable, build: Callable[[], Awaitable[bytes]]) -> CachedBody:
+        """build 为协程函数（例如 Quart 的异步模板渲染）时使用"""
+        cached = self._lookup(version, key)
+        if cached is not None:
+            return cached
+        with RESPONSE_CACHE_BUILD_SECONDS.time():
+            return self._store(version, key, await build())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,124 @@
+import hashlib
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from article_store import ArticleSnapshot
+
+# 参与检索的字段及权重：标题命中比正文命中更重要
+SEARCH_FIELDS = {
+    'title': 3.0,
+    'quote': 2.0,
+    'review': 1.0,
+    'content': 1.0
+}
+
+_CJK_RUN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_WORD = re.compile(r'[0-9a-z]+')
+
+
+def tokenize(text: str, for_query: bool = False) -> List[str]:
+    """中英文混合分词
+
+    连续的汉字切成二元组（“公主青蛙” -> 公主/主青/青蛙），索引时额外收录单字，
+    以便单字查询也能命中；字母数字按词切分并转小写。
+    查询时长度不少于 2 的汉字串只使用二元组，避免单字带来大量噪声。
+    """
+    text = text.lower()
+    tokens = _WORD.findall(text)
+    for run in _CJK_RUN.findall(text):
+        bigrams = [run[i:i + 2] for i in range(len(run) - 1)]
+        if for_query and bigrams:
+            tokens.extend(bigrams)
+            continue
+        tokens.extend(run)
+        tokens.extend(bigrams)
+    return tokens
+
+
+class SearchIndex:
+    """文章的内存倒排索引，BM25 排序
+
+    快照变化时通过 update 增量维护：只对新增、删除或内容发生变化的文章修改倒排表。
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_lengths: Dict[str, float] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._articles: Dict[str, Dict] = {}
+        self._total_length = 0.0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _fingerprint(article: Dict) -> str:
+        text = '\x1f'.join(article.get(name) or '' for name in SEARCH_FIELDS)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def update(self, snapshot: ArticleSnapshot):
+        """与快照同步：可直接作为 ArticleStore.subscribe 的回调"""
+        with self._lock:
+            for article_id in self._fingerprints.keys() - snapshot.by_id.keys():
+                self._remove(article_id)
+            for article_id, article in snapshot.by_id.items():
+                fingerprint = self._fingerprint(article)
+                if self._fingerprints.get(article_id) == fingerprint:
+                    self._articles[article_id] = article
+                    continue
+                self._remove(article_id)
+                self._add(article_id, article, fingerprint)
+
+    def _add(self, article_id: str, article: Dict, fingerprint: str):
+        terms: Dict[str, float] = {}
+        length = 0.0
+        for name, weight in SEARCH_FIELDS.items():
+            tokens = tokenize(article.get(name) or '')
+            length += weight * len(tokens)
+            for token, count in Counter(tokens).items():
+                terms[token] = terms.get(token, 0.0) + weight * count
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[article_id] = tf
+        self._doc_terms[article_id] = terms
+        self._doc_lengths[article_id] = length
+        self._total_length += length
+        self._fingerprints[article_id] = fingerprint
+        self._articles[article_id] = article
+
+    def _remove(self, article_id: str):
+        terms = self._doc_terms.pop(article_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[article_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(article_id)
+        del self._fingerprints[article_id]
+        del self._articles[article_id]
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[Dict, float]]:
+        """返回按 BM25 得分从高到低排列的 (文章, 得分)"""
+        query_terms = set(tokenize(query, for_query=True))
+        with self._lock:
+            doc_count = len(self._doc_terms)
+            if not query_terms or not doc_count:
+                return []
+            avg_length = self._total_length / doc_count or 1.0
+            scores: Dict[str, float] = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for article_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[article_id] / avg_length)
+                    scores[article_id] = scores.get(article_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(self._articles[article_id], score) for article_id, score in top]
@@ -0,0 +1,139 @@
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from article_store import ArticleSnapshot
+from metrics import SNAPSHOT_FILE_SECONDS
+
+try:
+    import fcntl
+except ImportError:  # Windows 本地开发只有单个进程，不需要跨进程文件锁
+    fcntl = None
+
+SNAPSHOT_FORMAT = 1
+
+
+def save_snapshot(path: str, snapshot: ArticleSnapshot, sync_state: Optional[Dict] = None):
+    """把快照写入本地文件
+
+    先写同目录下的临时文件再 os.replace，读者（包括其他 worker）只会看到完整的旧文件或新文件。
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    payload = {
+        'format': SNAPSHOT_FORMAT,
+        'version': snapshot.version,
+        'built_at': snapshot.built_at,
+        'sync': sync_state or {},
+        'articles': snapshot.articles
+    }
+    fd, tmp_path = tempfile.mkstemp(prefix='.articles-', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_snapshot(path: str) -> Optional[Tuple[ArticleSnapshot, Dict]]:
+    """读取本地快照文件，返回 (快照, 同步状态)；文件不存在或格式不符时返回 None"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if payload.get('format') != SNAPSHOT_FORMAT:
+        return None
+
+    articles = payload.get('articles') or []
+    snapshot = ArticleSnapshot(
+        articles=articles,
+        by_id={article['id']: article for article in articles},
+        version=payload.get('version') or '',
+        built_at=payload.get('built_at') or 0.0
+    )
+    return snapshot, payload.get('sync') or {}
+
+
+class SharedSnapshotFile:
+    """多个 worker 共享的快照文件，配合 ArticleStore 的 shared 参数使用
+
+    文件的 mtime 即快照的 built_at：判断“是否有更新的快照”只需一次 stat，
+    快照内容未变化时续期也只需更新 mtime。跨进程互斥使用旁边的 .lock 文件（flock）。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        get_state: Optional[Callable[[], Dict]] = None,
+        on_load: Optional[Callable[[List[Dict], Dict], None]] = None,
+        lock_timeout: float = 30
+    ):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        # 写入时附带的同步状态（例如增量同步水位线），以及加载后用于恢复状态的回调
+        self.get_state = get_state
+        self.on_load = on_load
+        self.lock_timeout = lock_timeout
+
+    def _mtime(self) -> float:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return 0.0
+
+    def load_if_newer(self, built_at: float) -> Optional[ArticleSnapshot]:
+        """文件中的快照比 built_at 新时读取并返回，否则返回 None"""
+        mtime = self._mtime()
+        # 文件系统保存的 mtime 精度有限，留出 1ms 的误差以免把自己刚写入的快照当成新的
+        if mtime <= built_at + 0.001:
+            return None
+        with SNAPSHOT_FILE_SECONDS.time(operation='load'):
+            restored = load_snapshot(self.path)
+        if restored is None:
+            return None
+        snapshot, sync_state = restored
+        if self.on_load:
+            self.on_load(snapshot.articles, sync_state)
+        return replace(snapshot, built_at=mtime)
+
+    def save(self, snapshot: ArticleSnapshot):
+        with SNAPSHOT_FILE_SECONDS.time(operation='save'):
+            save_snapshot(self.path, snapshot, self.get_state() if self.get_state else None)
+        self.touch(snapshot.built_at)
+
+    def touch(self, built_at: float):
+        """快照内容未变化时只续期"""
+        os.utime(self.path, (built_at, built_at))
+
+    @contextmanager
+    def lock(self, blocking: bool = False) -> Iterator[bool]:
+        """获取跨进程刷新锁，产出是否获取成功；blocking 时最多等待 lock_timeout 秒"""
+        if fcntl is None:
+            yield True
+            return
+        os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        is_acquired = False
+        try:
+            deadline = time.monotonic() + self.lock_timeout
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    is_acquired = True
+                    break
+                except BlockingIOError:
+                    if not blocking or time.monotonic() >= deadline:
+                        break
+                    time.sleep(0.05)
+            yield is_acquired
+        finally:
+            if is_acquired:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
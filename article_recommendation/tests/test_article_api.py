@@ -0,0 +1,30 @@
+import os
+import sys
+import unittest
+
+from werkzeug.datastructures import MultiDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from article_api import ArticleQueryError, parse_list_query  # noqa: E402
+
+
+class ParseListQueryTest(unittest.TestCase):
+
+    def test_defaults(self):
+        self.assertEqual(parse_list_query(MultiDict(), 100), (1, None, None))
+        self.assertEqual(parse_list_query(MultiDict({'page': '2', 'page_size': '10', 'fields': 'title'}), 100), (2, 10, ('id', 'title')))
+
+    def test_non_integer_values_are_rejected(self):
+        for args in ({'page_size': 'abc'}, {'page': 'abc'}, {'page': '1.5', 'page_size': '10'}):
+            with self.assertRaises(ArticleQueryError):
+                parse_list_query(MultiDict(args), 100)
+
+    def test_out_of_range_values_are_rejected(self):
+        for args in ({'page': '0'}, {'page_size': '0'}, {'page_size': '101'}, {'fields': 'title,secret'}):
+            with self.assertRaises(ArticleQueryError):
+                parse_list_query(MultiDict(args), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
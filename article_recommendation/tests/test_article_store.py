@@ -0,0 +1,77 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from article_store import ArticleStore, AsyncArticleStore  # noqa: E402
+
+
+class FailingLoader:
+    """模拟飞书不可用：每次调用都抛出异常并记录调用次数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        raise RuntimeError("feishu unavailable")
+
+
+class SchedulerIdleTest(unittest.TestCase):
+    """冷启动加载失败且没有快照时，后台刷新不应空转占满 CPU，而是按退避间隔重试"""
+
+    IDLE_SECONDS = 1.0
+    MAX_CPU_SECONDS = 0.2
+
+    def test_sync_store_does_not_spin_without_snapshot(self):
+        loader = FailingLoader()
+        store = ArticleStore(loader, ttl=300, retry_interval=30)
+        self.assertEqual(store.get_articles(), [])
+
+        cpu_started = time.process_time()
+        time.sleep(self.IDLE_SECONDS)
+        cpu_used = time.process_time() - cpu_started
+
+        self.assertLess(cpu_used, self.MAX_CPU_SECONDS)
+        # 首次请求加载一次，之后后台按 1s 起的退避间隔重试
+        self.assertLessEqual(loader.calls, 3)
+        self.assertGreater(store._retry_at, time.time())
+
+    def test_async_store_does_not_spin_without_snapshot(self):
+        loader = FailingLoader()
+
+        async def async_loader():
+            return loader()
+
+        async def run():
+            store = AsyncArticleStore(async_loader, ttl=300, retry_interval=30)
+            await store.start()
+            try:
+                cpu_started = time.process_time()
+                await asyncio.sleep(self.IDLE_SECONDS)
+                cpu_used = time.process_time() - cpu_started
+                self.assertEqual(await store.get_articles(), [])
+            finally:
+                await store.stop()
+            return cpu_used
+
+        cpu_used = asyncio.run(run())
+        self.assertLess(cpu_used, self.MAX_CPU_SECONDS)
+        # 没有请求时后台也会尝试加载，失败后按退避间隔重试
+        self.assertGreaterEqual(loader.calls, 1)
+        self.assertLessEqual(loader.calls, 3)
+
+    def test_cold_retry_backs_off(self):
+        store = ArticleStore(FailingLoader(), retry_interval=30)
+        delays = []
+        for _ in range(7):
+            store._schedule_retry()
+            delays.append(round(store._retry_at - time.time()))
+        self.assertEqual(delays, [1, 2, 4, 8, 16, 30, 30])
+
+
+if __name__ == '__main__':
+    unittest.main()
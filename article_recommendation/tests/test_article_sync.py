@@ -0,0 +1,85 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from article_sync import AsyncIncrementalArticleSync, IncrementalArticleSync  # noqa: E402
+from benchmarks.fake_feishu import exact_date  # noqa: E402
+
+# 2023-11-15 10:00（东八区）
+MORNING = 1700013600000
+
+
+def make_record(record_id, title, modified_time):
+    return {'record_id': record_id, 'last_modified_time': modified_time, 'fields': {'标题': title}}
+
+
+class DayLevelFeishuAPI:
+    """按飞书语义过滤：ExactDate 条件只比较日期"""
+
+    def __init__(self, records):
+        self.records = {record['record_id']: record for record in records}
+        self.changed_calls = 0
+
+    def iter_table_records(self, base_id, table_id, automatic_fields=False):
+        return list(self.records.values())
+
+    def iter_changed_records(self, base_id, table_id, modified_field, since_ms):
+        self.changed_calls += 1
+        return [record for record in self.records.values() if exact_date(record['last_modified_time']) > exact_date(since_ms)]
+
+    def iter_record_ids(self, base_id, table_id, id_field):
+        return list(self.records)
+
+
+class AsyncDayLevelFeishuAPI:
+    """DayLevelFeishuAPI 的异步接口"""
+
+    def __init__(self, api):
+        self.api = api
+
+    def __getattr__(self, name):
+        method = getattr(self.api, name)
+
+        async def iterate(*args, **kwargs):
+            for item in method(*args, **kwargs):
+                yield item
+        return iterate
+
+
+class IncrementalArticleSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.api = DayLevelFeishuAPI([make_record('a', '青蛙王子', MORNING), make_record('b', '小红帽', MORNING + 1000)])
+        self.sync = IncrementalArticleSync(self.api, 'base', 'table', modified_field='修改时间', reconcile_interval=3600)
+
+    def titles(self, articles):
+        return {article['id']: article['title'] for article in articles}
+
+    def test_same_day_edit_is_synced(self):
+        self.sync()
+        self.api.records['a'] = make_record('a', '青蛙王子（修订）', MORNING + 3600 * 1000)
+        self.assertEqual(self.titles(self.sync()), {'a': '青蛙王子（修订）', 'b': '小红帽'})
+        self.assertEqual(self.api.changed_calls, 1)
+
+    def test_unchanged_same_day_records_keep_list(self):
+        first = self.sync()
+        self.assertIs(self.sync(), first)
+        self.assertIs(self.sync(), first)
+
+    def test_async_sync_shares_state_logic(self):
+        sync = AsyncIncrementalArticleSync(AsyncDayLevelFeishuAPI(self.api), 'base', 'table', modified_field='修改时间', reconcile_interval=0)
+
+        async def run():
+            first = await sync()
+            self.assertIs(await sync(), first)
+            self.api.records['a'] = make_record('a', '青蛙王子（修订）', MORNING + 3600 * 1000)
+            del self.api.records['b']
+            return await sync()
+        self.assertEqual(self.titles(asyncio.run(run())), {'a': '青蛙王子（修订）'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from scipy import sparse  # noqa: E402
+
+from article_store import build_snapshot  # noqa: E402
+from recommender import RelatedArticles, _top_k_dense, _top_k_sparse  # noqa: E402
+
+
+def make_article(article_id, title, content):
+    return {'id': article_id, 'title': title, 'quote': '', 'review': '', 'content': content}
+
+
+class RelatedArticlesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.articles = [
+            make_article('a', '青蛙王子', '公主把金球掉进井里，青蛙帮她捞了上来'),
+            make_article('b', '青蛙与金球', '井边的青蛙替公主捞起金球'),
+            make_article('c', '小红帽', '小红帽去森林看望外婆，遇到了大灰狼'),
+            make_article('d', '狼和七只小山羊', '大灰狼装成山羊妈妈骗小山羊开门'),
+        ]
+
+    def test_update_runs_in_background(self):
+        related = RelatedArticles(top_k=2)
+        snapshot = build_snapshot(self.articles)
+        related.update(snapshot)
+        self.assertTrue(related.wait(10))
+        self.assertEqual(related.version, snapshot.version)
+        self.assertEqual([article['id'] for article, _ in related.get_related('a')][:1], ['b'])
+        self.assertEqual([article['id'] for article, _ in related.get_related('c')][:1], ['d'])
+
+    def test_deleted_articles_are_skipped_with_current_snapshot(self):
+        related = RelatedArticles(top_k=2)
+        related.update(build_snapshot(self.articles))
+        related.wait(10)
+        current = build_snapshot([article for article in self.articles if article['id'] != 'b'])
+        self.assertNotIn('b', [article['id'] for article, _ in related.get_related('a', articles=current.by_id)])
+
+    def test_dense_and_sparse_top_k_agree(self):
+        similarities = sparse.random(200, 200, density=0.3, random_state=1, format='csr', dtype=np.float32)
+        for offset in (0, 50):
+            block = similarities[offset:offset + 100]
+            dense = _top_k_dense(block.toarray(), offset, 5)
+            sparse_top = _top_k_sparse(block.tocsr(copy=True), offset, 5)
+            self.assertEqual([columns for columns, _ in dense], [columns for columns, _ in sparse_top])
+            for row, (columns, _) in enumerate(dense):
+                self.assertNotIn(offset + row, columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import VersionedResponseCache  # noqa: E402
+
+
+class VersionedResponseCacheTest(unittest.TestCase):
+    """旧版本的请求不应清空新版本的缓存，旧条目在新版本发布后才淘汰"""
+
+    def setUp(self):
+        self.cache = VersionedResponseCache(max_entries=16)
+        self.builds = []
+
+    def build(self, version, key):
+        def build():
+            self.builds.append((version, key))
+            return f"{version}:{key}".encode('utf-8')
+        return self.cache.get_or_build(version, key, build)
+
+    def test_old_version_request_keeps_new_entries(self):
+        self.cache.publish('v1')
+        self.build('v1', 'list')
+        self.cache.publish('v2')
+        self.build('v2', 'list')
+        # 仍持有旧快照的请求：重新构建但不写入，也不影响 v2 的条目
+        self.assertEqual(self.build('v1', 'list').body, b'v1:list')
+        self.assertEqual(self.build('v2', 'list').body, b'v2:list')
+        self.assertEqual(self.builds, [('v1', 'list'), ('v2', 'list'), ('v1', 'list')])
+
+    def test_publish_evicts_older_versions(self):
+        self.cache.publish('v1')
+        self.build('v1', 'list')
+        self.build('v1', 'detail')
+        self.cache.publish('v2')
+        self.assertEqual(len(self.cache._entries), 0)
+        self.build('v2', 'list')
+        self.cache.publish('v2')
+        self.build('v2', 'list')
+        self.assertEqual(self.builds.count(('v2', 'list')), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
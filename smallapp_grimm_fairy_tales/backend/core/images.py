@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# 接受的图片格式（Pillow 识别结果）-> 保存时的扩展名
+IMAGE_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+# 生成的衍生图：名称 -> 最长边像素（None 表示保持原尺寸，只转为 WebP）
+VARIANTS = {"thumb": 320, "webp": None}
+
+
+def _inspect_image(path: str) -> Tuple[str, int, int]:
+    """校验文件确实是支持的图片，返回 (格式, 宽, 高)；在子进程中执行"""
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image.verify()
+        return image.format, image.width, image.height
+
+
+def _render_variants(source: str, targets: Dict[str, Optional[int]]):
+    """生成缩略图与 WebP 版本；先写临时文件再改名，中途失败不会留下不完整的文件"""
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        for target, max_side in targets.items():
+            variant = image.copy()
+            if max_side is not None:
+                variant.thumbnail((max_side, max_side))
+            partial = target + ".part"
+            variant.save(partial, format="WEBP", quality=80, method=4)
+            os.replace(partial, target)
+
+
+class ImageStore:
+    """按内容寻址的图片存储
+
+    - 上传内容分块写入临时文件，写盘放到线程中，同时计算 sha256 并检查大小上限
+    - 最终文件名为 <sha256>.<扩展名>，相同图片只保存一份
+    - 缩略图与 WebP 版本在进程池中后台生成（<sha256>_thumb.webp、<sha256>.webp）
+    - 上传校验与缩略图生成使用各自的进程池，校验不会排在缩略图任务后面
+    """
+
+    def __init__(self, root: Path, url_prefix: str, max_bytes: int, workers: int = 1):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/")
+        self.max_bytes = max_bytes
+        self.workers = workers
+        # "verify"：上传请求等待的图片校验；"render"：后台生成衍生图
+        self._executors: Dict[str, ProcessPoolExecutor] = {}
+        self._rendering: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _pool(self, kind: str) -> ProcessPoolExecutor:
+        executor = self._executors.get(kind)
+        if executor is None:
+            # spawn：子进程不继承事件循环与数据库连接等状态
+            executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            self._executors[kind] = executor
+        return executor
+
+    def variant_names(self, digest: str) -> Dict[str, str]:
+        return {name: f"{digest}.webp" if name == "webp" else f"{digest}_{name}.webp" for name in VARIANTS}
+
+    def url(self, filename: str) -> str:
+        return f"{self.url_prefix}/{filename}"
+
+    async def save(self, chunks: AsyncIterator[bytes]) -> Dict:
+        """保存上传内容，超过大小上限返回 413，不是支持的图片返回 400"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, partial = tempfile.mkstemp(dir=self.root, prefix=".upload-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as buffer:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"Image exceeds the {self.max_bytes} byte limit",
+                        )
+                    digest.update(chunk)
+                    await asyncio.to_thread(buffer.write, chunk)
+            if not size:
+                raise HTTPException(status_code=400, detail="Empty file")
+            try:
+                image_format, width, height = await asyncio.get_running_loop().run_in_executor(self._pool("verify"), _inspect_image, partial)
+            except Exception:
+                image_format = None
+            if image_format not in IMAGE_EXTENSIONS:
+                raise HTTPException(status_code=400, detail="Invalid file type. Only images are allowed.")
+
+            filename = f"{digest.hexdigest()}.{IMAGE_EXTENSIONS[image_format]}"
+            path = self.root / filename
+            duplicate = path.exists()
+            if not duplicate:
+                # mkstemp 创建的文件只有属主可读，静态文件需要对其他用户（例如前置的 Web 服务器）可读
+                os.chmod(partial, 0o644)
+                os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+        variants = self.variant_names(digest.hexdigest())
+        self._schedule_variants(path, variants)
+        return {
+            "filename": filename,
+            "file_url": self.url(filename),
+            "sha256": digest.hexdigest(),
+            "size": size,
+            "width": width,
+            "height": height,
+            "duplicate": duplicate,
+            "thumbnail_url": self.url(variants["thumb"]),
+            "webp_url": self.url(variants["webp"]),
+        }
+
+    def _schedule_variants(self, source: Path, variants: Dict[str, str]):
+        targets = {str(self.root / variants[name]): max_side for name, max_side in VARIANTS.items()}
+        targets = {target: max_side for target, max_side in targets.items() if not os.path.exists(target)}
+        if not targets or str(source) in self._rendering:
+            return
+        self._rendering.add(str(source))
+        task = asyncio.create_task(self._render(source, targets))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _render(self, source: Path, targets: Dict[str, Optional[int]]):
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._pool("render"), _render_variants, str(source), targets)
+        except Exception:
+            logger.exception("生成图片 %s 的缩略图失败", source.name)
+        finally:
+            self._rendering.discard(str(source))
+
+    async def close(self):
+        """等待进行中的缩略图任务完成并关闭进程池"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        for executor in self._executors.values():
+            executor.shutdown()
+        self._executors.clear()
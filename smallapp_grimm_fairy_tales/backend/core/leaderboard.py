@@ -0,0 +1,194 @@
+import heapq
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+# 排行榜中返回的故事字段（阅读量由排行榜自身提供）
+STORY_FIELDS = ("id", "title", "content", "image_url", "created_at", "updated_at")
+WINDOWS = ("today", "week")
+
+
+class Leaderboard:
+    """内存中的阅读量排行榜
+
+    - 总榜：启动时从数据库读取全部故事的阅读量，之后随每次阅读增量维护一个有序的 top-K 列表，
+      读取时不访问数据库，阅读量包含尚未写入数据库的增量
+    - 今日 / 本周榜：按天分桶统计阅读量（UTC 日期），本周为最近 7 天（含今天）；
+      分桶随阅读量写回（ReadCounter 的 flush）持久化到 story_read_stats 表，重启后可恢复
+    - 榜单中故事的详情只在首次进入榜单时查询一次，之后由 update_story / delete_story 通知失效
+    """
+
+    def __init__(self, session_factory, story_model, stat_model, size: int = 100, window_days: int = 7, window_ttl: float = 1.0):
+        self.session_factory = session_factory
+        self.story_model = story_model
+        self.stat_model = stat_model
+        self.size = size
+        self.window_days = window_days
+        # 时间窗口榜单的最短重新计算间隔（秒），频繁轮询时直接复用上次结果
+        self.window_ttl = window_ttl
+        self._totals: Dict[int, int] = {}
+        self._top: List[int] = []
+        self._top_set = set()
+        self._days: Dict[date, Counter] = {}
+        self._week: Counter = Counter()
+        self._window_cache: Dict[str, Tuple[float, List[Tuple[int, int]]]] = {}
+        self._details: Dict[int, dict] = {}
+        self._upsert = None
+
+    @staticmethod
+    def _today() -> date:
+        return datetime.utcnow().date()
+
+    def _key(self, story_id: int) -> Tuple[int, int]:
+        return (self._totals[story_id], -story_id)
+
+    async def load(self):
+        """从数据库加载全部故事的阅读量及最近 window_days 天的分桶（丢弃缓存的详情）"""
+        since = self._today() - timedelta(days=self.window_days - 1)
+        async with self.session_factory() as db:
+            totals = await db.execute(select(self.story_model.id, self.story_model.read_count))
+            stats = await db.execute(
+                select(self.stat_model.story_id, self.stat_model.day, self.stat_model.read_count)
+                .where(self.stat_model.day >= since)
+            )
+            self._totals = {story_id: read_count or 0 for story_id, read_count in totals}
+            self._days = {}
+            for story_id, day, read_count in stats:
+                self._days.setdefault(day, Counter())[story_id] += read_count
+        self._week = sum(self._days.values(), Counter())
+        self._rebuild_top()
+        self._window_cache.clear()
+        self._details.clear()
+
+    def _rebuild_top(self):
+        self._top = heapq.nlargest(self.size, self._totals, key=self._key)
+        self._top_set = set(self._top)
+
+    def _promote(self, story_id: int):
+        """story_id 的阅读量增加后调整 top-K 列表（阅读量只增不减，只需向前移动）"""
+        if story_id not in self._top_set:
+            if len(self._top) >= self.size and self._key(story_id) <= self._key(self._top[-1]):
+                return
+            self._top.append(story_id)
+            self._top_set.add(story_id)
+        index = self._top.index(story_id)
+        key = self._key(story_id)
+        while index > 0 and self._key(self._top[index - 1]) < key:
+            self._top[index] = self._top[index - 1]
+            index -= 1
+        self._top[index] = story_id
+        if len(self._top) > self.size:
+            self._top_set.discard(self._top.pop())
+
+    def _roll_days(self, today: date):
+        oldest = today - timedelta(days=self.window_days - 1)
+        for day in [day for day in self._days if day < oldest]:
+            self._week.subtract(self._days.pop(day))
+            self._week += Counter()  # 去掉计数为 0 的条目
+
+    def record(self, story_id: int, count: int = 1):
+        """记录阅读（与 ReadCounter.record 一同调用）"""
+        if story_id not in self._totals:
+            return
+        self._totals[story_id] += count
+        self._promote(story_id)
+        today = self._today()
+        if today not in self._days:
+            self._roll_days(today)
+            self._days[today] = Counter()
+        self._days[today][story_id] += count
+        self._week[story_id] += count
+
+    def read_count(self, story_id: int) -> Optional[int]:
+        """故事的总阅读量（含尚未写入数据库的增量），排行榜不认识该故事时返回 None"""
+        return self._totals.get(story_id)
+
+    def add_story(self, story_id: int, read_count: int = 0):
+        self._totals[story_id] = read_count
+        self._promote(story_id)
+
+    def remove_story(self, story_id: int):
+        if self._totals.pop(story_id, None) is None:
+            return
+        for counter in (*self._days.values(), self._week):
+            counter.pop(story_id, None)
+        self._details.pop(story_id, None)
+        self._window_cache.clear()
+        if story_id in self._top_set:
+            self._rebuild_top()
+
+    def invalidate_story(self, story_id: int):
+        """故事内容变化时丢弃缓存的详情"""
+        self._details.pop(story_id, None)
+
+    async def persist(self, deltas: Dict[int, int]):
+        """ReadCounter 写入成功后的回调：把增量累加到当天的分桶"""
+        stat = self.stat_model.__table__
+        if self._upsert is None:
+            statement = sqlite_insert(stat).values(
+                story_id=bindparam("story_id"), day=bindparam("day"), read_count=bindparam("delta")
+            )
+            self._upsert = statement.on_conflict_do_update(
+                index_elements=[stat.c.story_id, stat.c.day],
+                set_={"read_count": stat.c.read_count + statement.excluded.read_count}
+            )
+        today = self._today()
+        # 已删除的故事不再记录
+        params = [{"story_id": story_id, "day": today, "delta": delta} for story_id, delta in deltas.items() if story_id in self._totals]
+        if not params:
+            return
+        async with self.session_factory() as db:
+            await db.execute(self._upsert, params)
+            await db.commit()
+
+    def _ranked(self, window: Optional[str]) -> List[Tuple[int, int]]:
+        """返回 [(story_id, 阅读量)]，按阅读量从高到低"""
+        if window is None:
+            return [(story_id, self._totals[story_id]) for story_id in self._top]
+        cached = self._window_cache.get(window)
+        now = time.monotonic()
+        if cached is not None and now - cached[0] < self.window_ttl:
+            return cached[1]
+        self._roll_days(self._today())
+        counter = self._days.get(self._today(), Counter()) if window == "today" else self._week
+        ranked = heapq.nlargest(self.size, ((story_id, count) for story_id, count in counter.items() if count > 0), key=lambda item: (item[1], -item[0]))
+        self._window_cache[window] = (now, ranked)
+        return ranked
+
+    async def _load_details(self, story_ids: Iterable[int]):
+        missing = [story_id for story_id in story_ids if story_id not in self._details]
+        if not missing:
+            return
+        columns = [getattr(self.story_model, name) for name in STORY_FIELDS]
+        async with self.session_factory() as db:
+            rows = await db.execute(select(*columns).where(self.story_model.id.in_(missing)))
+            for row in rows:
+                self._details[row.id] = dict(row._mapping)
+        # 详情缓存只保留当前榜单中的故事
+        if len(self._details) > self.size * 4:
+            keep = set(self._top)
+            for _, ranked in self._window_cache.values():
+                keep.update(story_id for story_id, _ in ranked)
+            self._details = {story_id: details for story_id, details in self._details.items() if story_id in keep}
+
+    async def top(self, limit: int, window: Optional[str] = None) -> List[dict]:
+        """榜单前 limit 个故事；window 为 None（总榜）、"today" 或 "week"
+
+        返回的 read_count 为总阅读量，时间窗口榜单额外带 period_read_count。
+        """
+        ranked = self._ranked(window)[:limit]
+        await self._load_details(story_id for story_id, _ in ranked)
+        stories = []
+        for story_id, count in ranked:
+            details = self._details.get(story_id)
+            if details is None:
+                continue
+            story = dict(details, read_count=self._totals.get(story_id, 0))
+            if window is not None:
+                story["period_read_count"] = count
+            stories.append(story)
+        return stories
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from fastapi import HTTPException, status
+
+
+class PasswordHasher:
+    """在独立的线程池中执行密码哈希与校验（bcrypt）
+
+    bcrypt 每次计算要占用 100ms 以上的 CPU，直接在 async 接口里调用会阻塞事件循环，
+    期间所有请求（包括读故事）都会卡住。这里把计算放到固定大小的线程池里
+    （bcrypt 计算时会释放 GIL），并限制排队数：正在执行和等待的任务超过 max_pending
+    时直接返回 503，登录高峰不会无限堆积请求。
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 32):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+        self._pending = 0
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self.rejected = 0
+
+    async def run(self, operation: str, func: Callable, *args) -> Any:
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent authentication requests",
+                headers={"Retry-After": "1"},
+            )
+        self._pending += 1
+        submitted = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._timed, operation, submitted, func, *args)
+        finally:
+            self._pending -= 1
+
+    def _timed(self, operation: str, submitted: float, func: Callable, *args) -> Any:
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            finished = time.perf_counter()
+            self._observe(operation, started - submitted, finished - started)
+
+    def _observe(self, operation: str, wait: float, duration: float):
+        # 在线程池中调用：各项只做简单累加，统计值允许极少量的竞争误差
+        stats = self.stats.setdefault(operation, {"count": 0, "wait_seconds": 0.0, "seconds": 0.0, "max_seconds": 0.0})
+        stats["count"] += 1
+        stats["wait_seconds"] += wait
+        stats["seconds"] += duration
+        stats["max_seconds"] = max(stats["max_seconds"], duration)
+
+    def info(self) -> Dict[str, Any]:
+        operations = {}
+        for operation, stats in self.stats.items():
+            count = stats["count"] or 1
+            operations[operation] = {
+                "count": stats["count"],
+                "avg_wait_ms": round(stats["wait_seconds"] / count * 1000, 2),
+                "avg_ms": round(stats["seconds"] / count * 1000, 2),
+                "max_ms": round(stats["max_seconds"] * 1000, 2),
+            }
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "rejected": self.rejected,
+            "operations": operations,
+        }
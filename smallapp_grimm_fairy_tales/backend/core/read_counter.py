@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import bindparam
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+
+class ReadCounter:
+    """阅读量的写回（write-behind）计数器
+
+    每次阅读只在内存中累加增量并立即返回；后台任务每隔 flush_interval 秒把累计的增量
+    用一条批量的 `UPDATE stories SET read_count = read_count + ? WHERE id = ?`
+    在一个事务里写入数据库，增量在 SQL 中相加，并发阅读不会丢失计数。
+    写入失败时增量会合并回内存，下次重试；应用关闭时再写入一次。
+    """
+
+    def __init__(self, engine: AsyncEngine, table, flush_interval: float = 1.0):
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self._pending: Dict[int, int] = defaultdict(int)
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._listeners: List[Callable[[Dict[int, int]], Awaitable[None]]] = []
+        self._statement = (
+            table.update()
+            .where(table.c.id == bindparam("story_id"))
+            .values(read_count=table.c.read_count + bindparam("delta"))
+        )
+
+    def record(self, story_id: int, count: int = 1):
+        """记录一次阅读（不访问数据库）"""
+        self._pending[story_id] += count
+
+    def pending(self, story_id: int) -> int:
+        """尚未写入数据库的阅读增量"""
+        return self._pending.get(story_id, 0)
+
+    def subscribe(self, listener: Callable[[Dict[int, int]], Awaitable[None]]):
+        """注册写入成功后的回调，参数为本次写入的 {story_id: 增量}"""
+        self._listeners.append(listener)
+
+    async def flush(self) -> int:
+        """把累计的增量写入数据库，返回写入的故事数"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            deltas, self._pending = dict(self._pending), defaultdict(int)
+            params = [{"story_id": story_id, "delta": delta} for story_id, delta in deltas.items()]
+            try:
+                async with self.engine.begin() as conn:
+                    await conn.execute(self._statement, params)
+            except Exception:
+                for story_id, delta in deltas.items():
+                    self._pending[story_id] += delta
+                raise
+            for listener in self._listeners:
+                try:
+                    await listener(deltas)
+                except Exception:
+                    logger.exception("处理阅读量写入回调时发生错误")
+            return len(deltas)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("写入阅读量失败，稍后重试")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台任务并写入剩余的增量"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
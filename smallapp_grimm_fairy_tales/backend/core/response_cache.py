@@ -0,0 +1,109 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+
+def json_bytes(content: Any) -> bytes:
+    """与 FastAPI 默认 JSONResponse 相同的序列化结果"""
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class ResponseCache:
+    """已序列化接口响应（JSON 字节）的进程内缓存
+
+    - 按总字节数限制大小，超出时淘汰最久未使用的条目；每个条目 ttl 秒后过期
+    - 每个条目带若干标签（例如 ("story", 1)、"ranking"），invalidate 按标签精确失效
+    - get_or_build 在构建前记录标签版本，构建期间标签被失效时不写入缓存，避免写回旧数据
+
+    只在事件循环线程中使用，不做额外加锁。
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, ttl: float = 60):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, bytes, Tuple[Hashable, ...]]]" = OrderedDict()
+        self._keys_by_tag: Dict[Hashable, set] = {}
+        self._tag_versions: Dict[Hashable, int] = {}
+        self._bytes = 0
+        self.stats = {"hit": 0, "miss": 0, "expired": 0, "evicted": 0, "invalidated": 0, "stale_build": 0}
+
+    def get(self, key: Hashable):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["miss"] += 1
+            return None
+        if time.monotonic() >= entry[0]:
+            self._remove(key)
+            self.stats["expired"] += 1
+            self.stats["miss"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hit"] += 1
+        return entry[1]
+
+    async def get_or_build(self, key: Hashable, tags: Iterable[Hashable], build: Callable[[], Awaitable[bytes]]) -> bytes:
+        body = self.get(key)
+        if body is not None:
+            return body
+        tags = tuple(tags)
+        versions = [self._tag_versions.get(tag, 0) for tag in tags]
+        body = await build()
+        if versions == [self._tag_versions.get(tag, 0) for tag in tags]:
+            self._store(key, body, tags)
+        else:
+            self.stats["stale_build"] += 1
+        return body
+
+    def _store(self, key: Hashable, body: bytes, tags: Tuple[Hashable, ...]):
+        if len(body) > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, body, tags)
+        self._bytes += len(body)
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.stats["evicted"] += 1
+
+    def invalidate(self, *tags: Hashable) -> int:
+        """使带有任一标签的条目失效，返回移除的条目数"""
+        removed = 0
+        for tag in tags:
+            self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+            for key in list(self._keys_by_tag.pop(tag, ())):
+                if key in self._entries:
+                    self._remove(key)
+                    removed += 1
+        self.stats["invalidated"] += removed
+        return removed
+
+    def clear(self):
+        self._entries.clear()
+        self._keys_by_tag.clear()
+        self._bytes = 0
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry[1])
+        for tag in entry[2]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def info(self) -> Dict[str, Any]:
+        lookups = self.stats["hit"] + self.stats["miss"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hit_ratio": round(self.stats["hit"] / lookups, 4) if lookups else None,
+        }
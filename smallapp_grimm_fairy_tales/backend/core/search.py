@@ -0,0 +1,230 @@
+import html
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# trigram 分词：中文没有空格分词，按三字切分后可做任意子串匹配（需要 SQLite 3.34+）
+FTS_TABLE = "stories_fts"
+# trigram 无法匹配少于三个字的关键词，这类关键词走二元组索引：
+# 写入时把连续的汉字切成以空格分隔的二元组（外加每段的最后一个字），用 unicode61 分词
+BIGRAM_TABLE = "stories_bigram_fts"
+BIGRAM_PENDING_TABLE = "stories_bigram_pending"
+# 早期版本在触发器中调用 Python 函数 story_bigrams，启动时删除
+_LEGACY_BIGRAM_TRIGGERS = ("stories_bigram_insert", "stories_bigram_delete", "stories_bigram_update")
+_CJK_RUN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+# 高亮用的临时标记，转义 HTML 后再替换为 <mark>
+_MARK_START, _MARK_END = "\x02", "\x03"
+
+_SETUP_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content, content='stories', content_rowid='id', tokenize='trigram'
+    )""",
+    # 外部内容表：由触发器与 stories 保持同步；阅读量等其他列的更新不会触发重建索引
+    f"""CREATE TRIGGER IF NOT EXISTS stories_fts_insert AFTER INSERT ON stories BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stories_fts_delete AFTER DELETE ON stories BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stories_fts_update AFTER UPDATE OF title, content ON stories BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    # 二元组切分需要 Python，不能放进触发器（其他程序写库时没有该函数）：
+    # 触发器只用内置 SQL 把变化的故事 id 记入待处理表，由 sync_bigram_index 重新切分写入
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {BIGRAM_TABLE} USING fts5(
+        title, content, tokenize='unicode61'
+    )""",
+    f"CREATE TABLE IF NOT EXISTS {BIGRAM_PENDING_TABLE} (story_id INTEGER PRIMARY KEY)",
+    f"""CREATE TRIGGER IF NOT EXISTS stories_bigram_pending_insert AFTER INSERT ON stories BEGIN
+        INSERT OR IGNORE INTO {BIGRAM_PENDING_TABLE}(story_id) VALUES (new.id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stories_bigram_pending_delete AFTER DELETE ON stories BEGIN
+        INSERT OR IGNORE INTO {BIGRAM_PENDING_TABLE}(story_id) VALUES (old.id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stories_bigram_pending_update AFTER UPDATE OF title, content ON stories BEGIN
+        INSERT OR IGNORE INTO {BIGRAM_PENDING_TABLE}(story_id) VALUES (new.id);
+    END""",
+]
+
+_SEARCH_SQL = text(f"""
+    SELECT s.id, s.title, s.image_url, s.read_count, s.created_at, s.updated_at,
+           highlight({FTS_TABLE}, 0, :mark_start, :mark_end) AS title_highlight,
+           snippet({FTS_TABLE}, 1, :mark_start, :mark_end, '…', :snippet_tokens) AS snippet
+    FROM {FTS_TABLE} JOIN stories AS s ON s.id = {FTS_TABLE}.rowid
+    WHERE {FTS_TABLE} MATCH :query
+    ORDER BY bm25({FTS_TABLE}, 10.0, 1.0)
+    LIMIT :limit
+""")
+
+# 含少于三个字的关键词时：短关键词匹配二元组索引，其余关键词仍匹配 trigram 索引，
+# 两边各自只查询一次再按 rowid 求交集，bm25 相加排序；二元组索引保存的是切分后的文本，高亮在 Python 中完成
+_BIGRAM_SEARCH_SQL = f"""
+    WITH short_hits AS MATERIALIZED (
+        SELECT rowid AS id, bm25({BIGRAM_TABLE}, 10.0, 1.0) AS rank FROM {BIGRAM_TABLE} WHERE {BIGRAM_TABLE} MATCH :bigram_query
+    ){{long_hits}}
+    SELECT s.id, s.title, s.image_url, s.read_count, s.created_at, s.updated_at, s.title, s.content
+    FROM short_hits JOIN stories AS s ON s.id = short_hits.id{{long_join}}
+    ORDER BY short_hits.rank{{long_rank}}
+    LIMIT :limit
+"""
+_LONG_HITS_SQL = {
+    "long_hits": f""", long_hits AS MATERIALIZED (
+        SELECT rowid AS id, bm25({FTS_TABLE}, 10.0, 1.0) AS rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :query
+    )""",
+    "long_join": " JOIN long_hits ON long_hits.id = s.id",
+    "long_rank": " + long_hits.rank",
+}
+
+
+def story_bigrams(value: Optional[str]) -> Optional[str]:
+    """把连续的汉字切成以空格分隔的二元组，每段末尾再加上最后一个字，其余字符保持不变
+
+    "公主和青蛙" -> " 公主 主和 和青 青蛙 蛙 "。每个字都是某个二元组的开头或某段的最后一个字，
+    因此单字关键词可以用前缀查询（"公"*）找到全部出现位置。
+    """
+    if value is None:
+        return None
+    return _CJK_RUN.sub(lambda match: " " + " ".join(_run_bigrams(match.group(0)) + [match.group(0)[-1]]) + " ", value)
+
+
+def _run_bigrams(run: str) -> List[str]:
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def _bigram_match(term: str) -> str:
+    """短关键词在二元组索引中的查询：两个汉字按二元组精确匹配，其余情况对最后一个词元做前缀匹配
+
+    字母数字按 unicode61 分词后的整词前缀匹配，例如 "ox" 能匹配 "Oxford"，不能匹配 "box"。
+    """
+    runs = _CJK_RUN.split(term)
+    cjk = _CJK_RUN.findall(term)
+    tokens = []
+    for index, other in enumerate(runs):
+        tokens.append(other)
+        if index < len(cjk):
+            tokens.extend(_run_bigrams(cjk[index]) or [cjk[index]])
+    phrase = " ".join(token for token in tokens if token.strip())
+    exact = len(cjk) == 1 and cjk[0] == term and len(term) == 2
+    return '"' + phrase.replace('"', '""') + '"' + ("" if exact else "*")
+
+
+def setup_story_search(connection):
+    """创建 FTS5 索引与同步触发器；首次创建时为已有故事建立索引（在 run_sync 中调用）
+
+    启动时顺带处理其他程序写入后尚未切分的故事。
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    tables = dict(connection.execute(
+        text("SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name IN (:fts, :bigram)"),
+        {"fts": FTS_TABLE, "bigram": BIGRAM_TABLE},
+    ).all())
+    for trigger in _LEGACY_BIGRAM_TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    if "content=''" in (tables.get(BIGRAM_TABLE) or ""):
+        # 早期的无内容表无法按 rowid 删除旧条目，重建为普通 FTS5 表
+        connection.execute(text(f"DROP TABLE {BIGRAM_TABLE}"))
+        del tables[BIGRAM_TABLE]
+    for statement in _SETUP_STATEMENTS:
+        connection.execute(text(statement))
+    if FTS_TABLE not in tables:
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    if BIGRAM_TABLE not in tables:
+        connection.execute(text(f"INSERT OR IGNORE INTO {BIGRAM_PENDING_TABLE}(story_id) SELECT id FROM stories"))
+    sync_bigram_index(connection)
+
+
+_PENDING_SQL = text(f"SELECT story_id FROM {BIGRAM_PENDING_TABLE} ORDER BY story_id LIMIT :limit")
+_PENDING_STORIES_SQL = text("SELECT id, title, content FROM stories WHERE id IN :ids").bindparams(
+    bindparam("ids", expanding=True)
+)
+
+
+def sync_bigram_index(connection, batch_size: int = 500) -> int:
+    """把待处理表中的故事重新切分写入二元组索引（已删除的故事只删除索引），返回处理的故事数"""
+    synced = 0
+    while True:
+        story_ids = connection.execute(_PENDING_SQL, {"limit": batch_size}).scalars().all()
+        if not story_ids:
+            return synced
+        params = [{"id": story_id} for story_id in story_ids]
+        connection.execute(text(f"DELETE FROM {BIGRAM_TABLE} WHERE rowid = :id"), params)
+        rows = [
+            {"id": story_id, "title": story_bigrams(title), "content": story_bigrams(content)}
+            for story_id, title, content in connection.execute(_PENDING_STORIES_SQL, {"ids": story_ids})
+        ]
+        if rows:
+            connection.execute(text(f"INSERT INTO {BIGRAM_TABLE}(rowid, title, content) VALUES (:id, :title, :content)"), rows)
+        connection.execute(text(f"DELETE FROM {BIGRAM_PENDING_TABLE} WHERE story_id = :id"), params)
+        synced += len(story_ids)
+
+
+async def sync_story_search(db: AsyncSession) -> int:
+    """在当前事务中更新二元组索引，返回处理的故事数；不提交
+
+    写入故事的接口在 flush 之后、提交之前调用，索引随故事一同提交；
+    其他程序直接写库的故事在下一次短关键词搜索或重启时补上。
+    """
+    if await db.scalar(text(f"SELECT 1 FROM {BIGRAM_PENDING_TABLE} LIMIT 1")) is None:
+        return 0
+    return await db.run_sync(lambda session: sync_bigram_index(session.connection()))
+
+
+def _highlight(value: str) -> str:
+    return html.escape(value or "").replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+
+def _mark_terms(value: str, terms: List[str], width: Optional[int] = None) -> str:
+    """LIKE 查询结果的高亮：width 不为空时截取第一个命中位置附近的 width 个字符"""
+    value = value or ""
+    if width is not None and len(value) > width:
+        lowered = value.lower()
+        first = min((position for position in (lowered.find(term.lower()) for term in terms) if position >= 0), default=0)
+        start = max(first - width // 4, 0)
+        value = ("…" if start else "") + value[start:start + width] + ("…" if start + width < len(value) else "")
+    pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    return pattern.sub(lambda match: _MARK_START + match.group(0) + _MARK_END, value)
+
+
+async def search_stories(db: AsyncSession, query: str, limit: int = 20, snippet_tokens: int = 24) -> List[Dict]:
+    """按相关度（bm25，标题权重更高）搜索故事，返回带高亮标题与正文片段的摘要
+
+    每个空格分隔的关键词都必须出现；关键词按字面匹配，不支持 FTS5 查询语法。
+    三个字及以上的关键词做子串匹配；更短的关键词走二元组索引，字母数字按整词前缀匹配。
+    title_highlight 与 snippet 已做 HTML 转义，命中部分用 <mark> 包裹。
+    """
+    terms = query.split()
+    if not terms:
+        return []
+    if all(len(term) >= 3 for term in terms):
+        match = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        rows = await db.execute(_SEARCH_SQL, {
+            "query": match, "limit": limit, "snippet_tokens": snippet_tokens,
+            "mark_start": _MARK_START, "mark_end": _MARK_END,
+        })
+    else:
+        if await sync_story_search(db):
+            await db.commit()
+        short_terms = [term for term in terms if len(term) < 3]
+        long_terms = [term for term in terms if len(term) >= 3]
+        params = {"limit": limit, "bigram_query": " ".join(_bigram_match(term) for term in short_terms)}
+        sql = dict.fromkeys(_LONG_HITS_SQL, "")
+        if long_terms:
+            params["query"] = " ".join('"' + term.replace('"', '""') + '"' for term in long_terms)
+            sql = _LONG_HITS_SQL
+        result = await db.execute(text(_BIGRAM_SEARCH_SQL.format(**sql)), params)
+        rows = [
+            (*row[:6], _mark_terms(row[6], terms), _mark_terms(row[7], terms, width=snippet_tokens * 2))
+            for row in result
+        ]
+    results = []
+    for story_id, title, image_url, read_count, created_at, updated_at, title_highlight, snippet in rows:
+        results.append({
+            "id": story_id, "title": title, "image_url": image_url, "read_count": read_count,
+            "created_at": created_at, "updated_at": updated_at,
+            "title_highlight": _highlight(title_highlight), "snippet": _highlight(snippet),
+        })
+    return results
@@ -1,21 +1,39 @@
 from datetime import datetime, timedelta
 from typing import Optional
+import os
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 
 from .. import main as database # Adjusted for database session and User model
 from ..models import user as user_models # Adjusted for Pydantic models
+from .password_hasher import PasswordHasher
+from .token_cache import TokenCache
 
 # JWT Configuration
 SECRET_KEY = "YOUR_SECRET_KEY"  # 请在生产环境中更改此密钥并使用环境变量
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 已验证令牌的缓存：命中时不再验签、不再查询用户。
+# 缓存的用户信息最多 AUTH_CACHE_TTL 秒后重新从数据库读取；以后增加改密码、删除用户等接口时
+# 需要相应缩短 TTL 或按用户清除缓存
+token_cache = TokenCache(
+    max_entries=int(os.environ.get("AUTH_CACHE_MAX_ENTRIES", "10000")),
+    ttl=float(os.environ.get("AUTH_CACHE_TTL", "300")),
+)
+
+# bcrypt 的计算成本（2^rounds 次迭代），每加 1 耗时翻倍；只影响新生成的哈希
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+# 密码哈希与校验在独立线程池中执行，不阻塞事件循环
+password_hasher = PasswordHasher(
+    max_workers=int(os.environ.get("PASSWORD_HASH_WORKERS") or max(1, (os.cpu_count() or 2) // 2)),
+    max_pending=int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "32")),
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -24,6 +42,12 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run("verify", verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.run("hash", get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -34,7 +58,11 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> user_models.User:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> user_models.User:
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -49,9 +77,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = db.query(database.User).filter(database.User.username == token_data.username).first()
+    # 只在缓存未命中时才打开数据库会话
+    async with database.AsyncSessionLocal() as db:
+        user = await db.scalar(select(database.User).where(database.User.username == token_data.username))
     if user is None:
         raise credentials_exception
+    token_cache.set(token, user, exp=payload.get("exp"))
     return user
 
 async def get_current_active_user(current_user: user_models.User = Depends(get_current_user)) -> user_models.User:
@@ -60,10 +91,12 @@ async def get_current_active_user(current_user: user_models.User = Depends(get_c
     #     raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[database.User]:
-    user = db.query(database.User).filter(database.User.username == username).first()
+async def authenticate_user(username: str, password: str) -> Optional[database.User]:
+    # 自行打开只用于查询的会话，校验密码前就归还连接，哈希计算期间不占用连接池
+    async with database.AsyncSessionLocal() as db:
+        user = await db.scalar(select(database.User).where(database.User.username == username))
     if not user:
         return None
-    if not verify_password(password, user.password_hash):
+    if not await verify_password_async(password, user.password_hash):
         return None
     return user
\ No newline at end of file
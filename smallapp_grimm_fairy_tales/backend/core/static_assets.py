@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只提供 gzip
+    brotli = None
+
+# 文件名中带内容哈希（例如上传图片的 <sha256>.png、<sha256>_thumb.webp）的资源内容永不变化
+HASHED_NAME = re.compile(r"(?:^|[._-])[0-9a-f]{16,}(?:[._-]|$)")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 其他静态文件与 HTML 页面：允许缓存，但每次使用前用 ETag 重新验证
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# 值得压缩的类型；图片等已压缩的格式直接从磁盘发送
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/xml")
+MIN_COMPRESS_SIZE = 512
+
+
+class Asset:
+    """内存中的静态资源：原始内容与预先压缩好的 gzip / br 版本"""
+
+    def __init__(self, body: bytes, media_type: str):
+        self.media_type = media_type
+        self.variants: Dict[str, bytes] = {"identity": body}
+        if is_compressible(media_type) and len(body) >= MIN_COMPRESS_SIZE:
+            compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(body, quality=11)
+            # 只保留确实更小的版本
+            self.variants.update({encoding: data for encoding, data in compressed.items() if len(data) < len(body)})
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+
+    def select(self, accept_encoding: str) -> Tuple[str, bytes]:
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and encoding in accepted:
+                return encoding, self.variants[encoding]
+        return "identity", self.variants["identity"]
+
+    def response(self, request_headers: Headers, cache_control: str, status_code: int = 200) -> Response:
+        """按 Accept-Encoding 选择版本；If-None-Match 命中时返回 304"""
+        encoding, body = self.select(request_headers.get("accept-encoding", ""))
+        # 强 ETag 对应具体的字节内容，不同编码的版本使用不同的 ETag
+        etag = f'"{self.etag}"' if encoding == "identity" else f'"{self.etag}-{encoding}"'
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if len(self.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, status_code=status_code, media_type=self.media_type, headers=headers)
+
+
+def is_compressible(media_type: str) -> bool:
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def parse_accept_encoding(value: str) -> set:
+    """返回客户端接受的编码（忽略 q=0 的项）"""
+    accepted = set()
+    for item in value.lower().split(","):
+        encoding, _, params = item.partition(";")
+        quality = params.strip()
+        if quality.startswith("q=") and quality[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        if encoding.strip():
+            accepted.add(encoding.strip())
+    return accepted
+
+
+class AssetCache:
+    """启动时把固定的页面文件读入内存并预先压缩，之后的请求不再访问磁盘"""
+
+    def __init__(self):
+        self._assets: Dict[str, Asset] = {}
+
+    def load(self, name: str, path: str, media_type: Optional[str] = None) -> Optional[Asset]:
+        if not os.path.isfile(path):
+            self._assets.pop(name, None)
+            return None
+        with open(path, "rb") as f:
+            body = f.read()
+        media_type = media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if media_type.startswith("text/"):
+            media_type += "; charset=utf-8"
+        self._assets[name] = asset = Asset(body, media_type)
+        return asset
+
+    def get(self, name: str) -> Optional[Asset]:
+        return self._assets.get(name)
+
+    def response(self, request: Request, name: str, cache_control: str = REVALIDATE_CACHE_CONTROL) -> Optional[Response]:
+        asset = self._assets.get(name)
+        if asset is None:
+            return None
+        return asset.response(request.headers, cache_control)
+
+
+class CachedStaticFiles(StaticFiles):
+    """带缓存头的 StaticFiles
+
+    - 文件名带内容哈希的资源返回一年的 immutable Cache-Control，其他文件要求重新验证
+    - 可压缩的小文件（文本、JS、SVG 等）在首次请求时读入内存并预先压缩，
+      按 (路径, 修改时间, 大小) 缓存，文件变化后自动重新加载
+    """
+
+    def __init__(self, *args, max_cached_size: int = 256 * 1024, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_cached_size = max_cached_size
+        self._assets: Dict[str, Tuple[Tuple[float, int], Asset]] = {}
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        name = os.path.basename(full_path)
+        cache_control = IMMUTABLE_CACHE_CONTROL if HASHED_NAME.search(name) else REVALIDATE_CACHE_CONTROL
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if is_compressible(media_type) and stat_result.st_size <= self.max_cached_size:
+            return self._cached_asset(str(full_path), stat_result, media_type).response(
+                Headers(scope=scope), cache_control, status_code
+            )
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = cache_control
+        return response
+
+    def _cached_asset(self, path: str, stat_result: os.stat_result, media_type: str) -> Asset:
+        version = (stat_result.st_mtime, stat_result.st_size)
+        cached = self._assets.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with open(path, "rb") as f:
+            asset = Asset(f.read(), media_type + ("; charset=utf-8" if media_type.startswith("text/") else ""))
+        self._assets[path] = (version, asset)
+        return asset
@@ -0,0 +1,57 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class TokenCache:
+    """已验证的访问令牌 -> 用户 的 LRU + TTL 缓存
+
+    - 以令牌字符串为键，命中时既跳过 JWT 验签也跳过用户查询
+    - 每个条目在 ttl 秒后过期，且不会晚于令牌自身的 exp
+    - 最多保留 max_entries 个条目，超出时淘汰最久未使用的
+    - 用户信息的变化最多 ttl 秒后生效（缓存的是验证时读到的用户对象）
+
+    只在事件循环线程中使用，不做额外加锁。
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stats = {"hit": 0, "miss": 0, "expired": 0, "evicted": 0}
+
+    def get(self, token: str) -> Optional[Any]:
+        entry = self._entries.get(token)
+        if entry is None:
+            self.stats["miss"] += 1
+            return None
+        expires_at, user = entry
+        if time.time() >= expires_at:
+            del self._entries[token]
+            self.stats["expired"] += 1
+            self.stats["miss"] += 1
+            return None
+        self._entries.move_to_end(token)
+        self.stats["hit"] += 1
+        return user
+
+    def set(self, token: str, user: Any, exp: Optional[float] = None):
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        self._entries[token] = (expires_at, user)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def info(self) -> Dict[str, Any]:
+        lookups = self.stats["hit"] + self.stats["miss"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_ratio": round(self.stats["hit"] / lookups, 4) if lookups else None,
+        }
@@ -1,11 +1,14 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import event, inspect, Column, Integer, String, Text, Date, DateTime, ForeignKey, Index, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
 from datetime import datetime
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # 创建FastAPI应用实例
 app = FastAPI(title="童话故事API", description="格林童话故事应用后端API服务")
 
@@ -18,12 +21,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 数据库配置
-DATABASE_URL = "sqlite:///./fairytales.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 数据库配置：异步引擎（aiosqlite），查询不会阻塞事件循环
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite+aiosqlite:///./fairytales.db")
+engine = create_async_engine(DATABASE_URL)
+# expire_on_commit=False：提交后仍可直接读取对象属性用于序列化，不会触发隐式的（同步）懒加载
+AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
 Base = declarative_base()
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL 模式下读写互不阻塞，适合多个并发请求
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
 # 数据库模型
 class Story(Base):
     __tablename__ = "stories"
@@ -36,6 +50,9 @@ class Story(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # 列表按 (created_at, id) 倒序做游标分页
+    __table_args__ = (Index("ix_stories_created_at_id", "created_at", "id"),)
+
 class User(Base):
     __tablename__ = "users"
     
@@ -44,29 +61,99 @@ class User(Base):
     password_hash = Column(String(100))
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class StoryReadStat(Base):
+    """按天（UTC）统计的阅读量，用于今日/本周排行"""
+    __tablename__ = "story_read_stats"
+    
+    story_id = Column(Integer, ForeignKey("stories.id"), primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    read_count = Column(Integer, default=0)
+
 class Favorite(Base):
     __tablename__ = "favorites"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     story_id = Column(Integer, ForeignKey("stories.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+    # 同一用户不能重复收藏同一故事；收藏检查与去重都走这个索引
+    __table_args__ = (Index("ux_favorites_user_story", "user_id", "story_id", unique=True),)
+
+# 阅读量写回计数器：阅读只在内存中累加，按间隔批量写入数据库
+from .core.read_counter import ReadCounter
+READ_COUNT_FLUSH_INTERVAL = float(os.environ.get("READ_COUNT_FLUSH_INTERVAL", "1.0"))
+read_counter = ReadCounter(engine, Story.__table__, flush_interval=READ_COUNT_FLUSH_INTERVAL)
+
+# 阅读量排行榜：总榜在内存中随阅读实时更新，今日/本周榜按天分桶
+# 注意：阅读量增量与排行榜都保存在进程内，只支持单 worker 运行（uvicorn 不要加 --workers）；
+# 多个 worker 时各自的榜单互不相同，尚未写入的阅读量也只有所在的 worker 能看到
+from .core.leaderboard import Leaderboard
+LEADERBOARD_SIZE = int(os.environ.get("LEADERBOARD_SIZE", "100"))
+leaderboard = Leaderboard(AsyncSessionLocal, Story, StoryReadStat, size=LEADERBOARD_SIZE)
+read_counter.subscribe(leaderboard.persist)
+
+# 故事详情与排行榜的响应缓存（已序列化的 JSON），由故事的修改、删除与阅读量写入精确失效
+from .core.response_cache import ResponseCache
+response_cache = ResponseCache(
+    max_bytes=int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl=float(os.environ.get("RESPONSE_CACHE_TTL", "60")),
+)
+
+async def _invalidate_flushed_stories(deltas):
+    response_cache.invalidate("ranking", *(("story", story_id) for story_id in deltas))
+
+read_counter.subscribe(_invalidate_flushed_stories)
+
+def _dedupe_favorites(connection):
+    """建唯一索引前清理旧数据中的重复收藏（保留最早的一条），只在索引尚未建立时执行一次"""
+    if any(index["name"] == "ux_favorites_user_story" for index in inspect(connection).get_indexes("favorites")):
+        return
+    removed = connection.execute(text(
+        "DELETE FROM favorites WHERE id NOT IN (SELECT MIN(id) FROM favorites GROUP BY user_id, story_id)"
+    )).rowcount
+    if removed:
+        logger.warning("建立收藏唯一索引前删除了 %d 条重复收藏", removed)
+
+def _create_missing_indexes(connection):
+    _dedupe_favorites(connection)
+    # create_all 不会为已存在的表补建新增的索引
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+# 故事全文搜索（trigram 索引由触发器同步，二元组索引由触发器排队、应用内切分）
+from .core.search import setup_story_search
+
+# 启动时创建数据库表
+@app.on_event("startup")
+async def startup():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_missing_indexes)
+        await conn.run_sync(setup_story_search)
+    if int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+        logger.warning("排行榜与阅读量增量保存在进程内，多个 worker 时各 worker 的榜单不一致，请以单 worker 运行")
+    await leaderboard.load()
+    read_counter.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    # 先写入尚未落盘的阅读量，再关闭连接池
+    await read_counter.stop()
+    await engine.dispose()
+    await uploads.image_store.close()
 
 # 依赖项
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # 导入路由
 from .routers import stories, auth, favorites, ranking, uploads, ai_generation
-from fastapi.staticfiles import StaticFiles # 新增
-import os # 新增
+from .core.security import password_hasher, token_cache
+from fastapi.responses import Response
+from .core.static_assets import AssetCache, CachedStaticFiles
 
 # 创建静态文件目录 (如果尚不存在)
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "static") # 新增
@@ -83,51 +170,56 @@ app.include_router(ranking.router)
 app.include_router(uploads.router) # 新增
 app.include_router(ai_generation.router) # 新增
 
-# 挂载静态文件目录
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static") # 新增
+# 挂载静态文件目录：带内容哈希的文件名返回 immutable 缓存头，文本类文件预压缩后从内存发送
+app.mount("/static", CachedStaticFiles(directory=STATIC_DIR), name="static") # 新增
 
-from fastapi.responses import FileResponse # 新增
+# 页面文件位于项目的根目录，即 backend 目录的上一级；启动时读入内存并预先压缩（gzip / br）
+SCREENS_DIR = os.path.join(os.path.dirname(__file__), "..")
+SCREENS = ("home_screen.html", "create_screen.html", "ranking_screen.html", "favorites_screen.html")
+screens = AssetCache()
+
+@app.on_event("startup")
+async def load_screens():
+    for name in SCREENS:
+        screens.load(name, os.path.join(SCREENS_DIR, name))
+
+def serve_screen(request: Request, name: str) -> Response:
+    response = screens.response(request, name)
+    if response is None:
+        raise HTTPException(status_code=404, detail=f"{name} not found")
+    return response
 
 # 基本路由
 @app.get("/")
-async def read_root():
-    # home_screen.html 位于项目的根目录，即 backend 目录的上一级
-    home_html_path = os.path.join(os.path.dirname(__file__), "..", "home_screen.html")
-    if os.path.exists(home_html_path):
-        return FileResponse(home_html_path)
-    else:
+async def read_root(request: Request):
+    response = screens.response(request, "home_screen.html")
+    if response is None:
         return {"message": "home_screen.html not found"}
+    return response
 
 # 健康检查
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow()}
 
+# 进程内缓存的命中统计
+@app.get("/cache/stats")
+async def cache_stats():
+    return {"auth": token_cache.info(), "responses": response_cache.info()}
+
+# 密码哈希线程池的排队与耗时统计
+@app.get("/password-hashing/stats")
+async def password_hashing_stats():
+    return password_hasher.info()
+
 @app.get("/create")
-async def serve_create_screen():
-    html_path = os.path.join(os.path.dirname(__file__), "..", "create_screen.html")
-    if os.path.exists(html_path):
-        return FileResponse(html_path)
-    else:
-        raise HTTPException(status_code=404, detail="create_screen.html not found")
+async def serve_create_screen(request: Request):
+    return serve_screen(request, "create_screen.html")
 
 @app.get("/ranking")
-async def serve_ranking_screen():
-    html_path = os.path.join(os.path.dirname(__file__), "..", "ranking_screen.html")
-    if os.path.exists(html_path):
-        return FileResponse(html_path)
-    else:
-        raise HTTPException(status_code=404, detail="ranking_screen.html not found")
+async def serve_ranking_screen(request: Request):
+    return serve_screen(request, "ranking_screen.html")
 
 @app.get("/favorites")
-async def serve_favorites_screen():
-    html_path = os.path.join(os.path.dirname(__file__), "..", "favorites_screen.html")
-    if os.path.exists(html_path):
-        return FileResponse(html_path)
-    else:
-        raise HTTPException(status_code=404, detail="favorites_screen.html not found")
-
-# 健康检查
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy", "timestamp": datetime.utcnow()}
\ No newline at end of file
+async def serve_favorites_screen(request: Request):
+    return serve_screen(request, "favorites_screen.html")
\ No newline at end of file
@@ -1,5 +1,8 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import List, Optional
+
+from .story import StorySummary
 
 class FavoriteBase(BaseModel):
     story_id: int
@@ -13,4 +16,16 @@ class Favorite(FavoriteBase):
     created_at: datetime
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class FavoriteWithStory(Favorite):
+    # include_story=true 时附带的故事摘要
+    story: Optional[StorySummary] = None
+
+class FavoriteCheck(BaseModel):
+    story_ids: List[int]
+
+class FavoritePage(BaseModel):
+    items: List[FavoriteWithStory]
+    # 下一页的游标，没有更多数据时为空
+    next_cursor: Optional[str] = None
\ No newline at end of file
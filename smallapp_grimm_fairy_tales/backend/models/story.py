@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class StoryBase(BaseModel):
@@ -22,4 +22,30 @@ class Story(StoryBase):
     updated_at: datetime
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class StorySummary(BaseModel):
+    # 列表接口使用的精简字段，不含正文 content
+    id: int
+    title: str
+    image_url: Optional[str] = None
+    read_count: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class StoryPage(BaseModel):
+    items: List[StorySummary]
+    # 下一页的游标，没有更多数据时为空
+    next_cursor: Optional[str] = None
+
+class StorySearchResult(StorySummary):
+    # 已做 HTML 转义，命中的关键词用 <mark> 包裹
+    title_highlight: str
+    snippet: str
+
+class RankedStory(Story):
+    # 时间窗口（今日/本周）内的阅读量，总榜中为空
+    period_read_count: Optional[int] = None
\ No newline at end of file
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import main as database # For DB session if needed
 from ..models import ai_story as ai_story_models
@@ -14,7 +14,7 @@ router = APIRouter(
 @router.post("/generate-story/", response_model=ai_story_models.AIStoryResponse)
 async def generate_story_via_ai(
     prompt_data: ai_story_models.AIStoryPrompt,
-    db: Session = Depends(database.get_db), # Included for potential future use (e.g., logging requests)
+    db: AsyncSession = Depends(database.get_db), # Included for potential future use (e.g., logging requests)
     # current_user: database.User = Depends(get_current_active_user) # Uncomment if auth is needed
 ):
     """
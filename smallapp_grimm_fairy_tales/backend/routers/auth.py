@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from datetime import timedelta
 
 from .. import main as database # Adjusted import for database session and models
@@ -12,20 +13,28 @@ router = APIRouter(
 )
 
 @router.post("/register", response_model=user_models.User, status_code=status.HTTP_201_CREATED)
-async def register_user(user: user_models.UserCreate, db: Session = Depends(database.get_db)):
-    db_user = db.query(database.User).filter(database.User.username == user.username).first()
+async def register_user(user: user_models.UserCreate):
+    # 查询与写入各用一个短会话，哈希计算期间不占用数据库连接
+    async with database.AsyncSessionLocal() as db:
+        db_user = await db.scalar(select(database.User).where(database.User.username == user.username))
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    hashed_password = security.get_password_hash(user.password)
-    new_user = database.User(username=user.username, password_hash=hashed_password)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    hashed_password = await security.get_password_hash_async(user.password)
+    async with database.AsyncSessionLocal() as db:
+        new_user = database.User(username=user.username, password_hash=hashed_password)
+        db.add(new_user)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # 哈希期间同名用户被并发注册，由唯一索引拦截
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="Username already registered")
+        await db.refresh(new_user)
     return new_user
 
 @router.post("/token", response_model=user_models.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    user = security.authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await security.authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
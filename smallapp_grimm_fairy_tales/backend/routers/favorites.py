@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 from .. import main as database
 from ..models import favorite as favorite_models
+from ..core.pagination import decode_cursor, encode_cursor
 from ..core.security import get_current_active_user
+from .stories import SUMMARY_COLUMNS
+
+# 批量检查收藏时一次最多的故事数
+MAX_CHECK_IDS = 500
 
 router = APIRouter(
     prefix="/favorites",
@@ -15,19 +22,19 @@ router = APIRouter(
 @router.post("/", response_model=favorite_models.Favorite, status_code=status.HTTP_201_CREATED)
 async def add_favorite(
     favorite: favorite_models.FavoriteCreate,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: database.User = Depends(get_current_active_user)
 ):
     # 检查故事是否存在
-    story = db.query(database.Story).filter(database.Story.id == favorite.story_id).first()
+    story = await db.get(database.Story, favorite.story_id)
     if not story:
         raise HTTPException(status_code=404, detail="Story not found")
     
     # 检查是否已经收藏
-    existing_favorite = db.query(database.Favorite).filter(
+    existing_favorite = await db.scalar(select(database.Favorite).where(
         database.Favorite.user_id == current_user.id,
         database.Favorite.story_id == favorite.story_id
-    ).first()
+    ))
     if existing_favorite:
         raise HTTPException(status_code=400, detail="Story already in favorites")
     
@@ -37,49 +44,100 @@ async def add_favorite(
         story_id=favorite.story_id
     )
     db.add(db_favorite)
-    db.commit()
-    db.refresh(db_favorite)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # 并发的重复收藏由唯一索引拦截
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Story already in favorites")
+    await db.refresh(db_favorite)
     return db_favorite
 
-@router.get("/", response_model=List[favorite_models.Favorite])
+@router.get("/", response_model=favorite_models.FavoritePage)
 async def read_favorites(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(database.get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    include_story: bool = False,
+    db: AsyncSession = Depends(database.get_db),
     current_user: database.User = Depends(get_current_active_user)
 ):
-    favorites = db.query(database.Favorite)\
-        .filter(database.Favorite.user_id == current_user.id)\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    return favorites
+    """
+    按收藏时间倒序分页获取当前用户的收藏。
+    - **cursor**: 上一页返回的 next_cursor，为空时从最新的收藏开始。
+    - **limit**: 每页数量，默认为20，最多100。
+    - **include_story**: 为 true 时通过一次联表查询附带故事摘要（不含正文），故事已删除时 story 为 null。
+    """
+    columns = [database.Favorite]
+    if include_story:
+        columns += SUMMARY_COLUMNS
+    query = (
+        select(*columns)
+        .where(database.Favorite.user_id == current_user.id)
+        .order_by(database.Favorite.id.desc())
+    )
+    if include_story:
+        # 外连接：故事已被删除的收藏仍然返回
+        query = query.outerjoin(database.Story, database.Story.id == database.Favorite.story_id)
+    if cursor:
+        favorite_id, = decode_cursor(cursor, 1)
+        query = query.where(database.Favorite.id < favorite_id)
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    items = []
+    for row in rows[:limit]:
+        favorite = row[0]
+        item = {"id": favorite.id, "user_id": favorite.user_id, "story_id": favorite.story_id, "created_at": favorite.created_at}
+        if include_story:
+            # row[1] 为 Story.id，为 NULL 说明故事已不存在
+            item["story"] = {column.key: value for column, value in zip(SUMMARY_COLUMNS, row[1:])} if row[1] is not None else None
+        items.append(item)
+    next_cursor = encode_cursor(rows[limit - 1][0].id) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
 
 @router.delete("/{story_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_favorite(
     story_id: int,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: database.User = Depends(get_current_active_user)
 ):
-    favorite = db.query(database.Favorite).filter(
+    favorite = await db.scalar(select(database.Favorite).where(
         database.Favorite.user_id == current_user.id,
         database.Favorite.story_id == story_id
-    ).first()
+    ))
     if not favorite:
         raise HTTPException(status_code=404, detail="Favorite not found")
     
-    db.delete(favorite)
-    db.commit()
+    await db.delete(favorite)
+    await db.commit()
     return
 
 @router.get("/check/{story_id}", response_model=bool)
 async def check_favorite(
     story_id: int,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: database.User = Depends(get_current_active_user)
 ):
-    favorite = db.query(database.Favorite).filter(
+    favorite_id = await db.scalar(select(database.Favorite.id).where(
         database.Favorite.user_id == current_user.id,
         database.Favorite.story_id == story_id
-    ).first()
-    return favorite is not None
\ No newline at end of file
+    ))
+    return favorite_id is not None
+
+@router.post("/check", response_model=List[int])
+async def check_favorites(
+    check: favorite_models.FavoriteCheck,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: database.User = Depends(get_current_active_user)
+):
+    """
+    批量检查收藏状态：返回 story_ids 中已被当前用户收藏的故事 id（一次查询）。
+    - **story_ids**: 要检查的故事 id 列表，最多500个。
+    """
+    if len(check.story_ids) > MAX_CHECK_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_CHECK_IDS} story ids per request")
+    if not check.story_ids:
+        return []
+    result = await db.execute(select(database.Favorite.story_id).where(
+        database.Favorite.user_id == current_user.id,
+        database.Favorite.story_id.in_(set(check.story_ids))
+    ))
+    return result.scalars().all()
\ No newline at end of file
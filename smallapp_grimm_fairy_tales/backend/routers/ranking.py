@@ -1,10 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from fastapi import APIRouter, Query, Response
 from typing import List
 
 from .. import main as database
 from ..models import story as story_models # Using existing story model for response
+from ..core.response_cache import json_bytes
 
 router = APIRouter(
     prefix="/ranking",
@@ -13,23 +12,30 @@ router = APIRouter(
 )
 
 @router.get("/popular", response_model=List[story_models.Story])
-async def get_popular_stories(
-    limit: int = 10, 
-    db: Session = Depends(database.get_db)
+async def get_popular_stories(limit: int = Query(10, ge=1, le=database.LEADERBOARD_SIZE)):
+    """
+    获取阅读量最高的童话故事列表（内存排行榜，不访问数据库）。
+    响应缓存到下一次阅读量写入数据库（READ_COUNT_FLUSH_INTERVAL）为止。
+    - **limit**: 返回的故事数量上限，默认为10，最多为排行榜容量（LEADERBOARD_SIZE），超出时返回 422。
+    """
+    async def build() -> bytes:
+        return json_bytes(await database.leaderboard.top(limit))
+
+    body = await database.response_cache.get_or_build(("popular", limit), ["ranking"], build)
+    return Response(content=body, media_type="application/json")
+
+@router.get("/trending", response_model=List[story_models.RankedStory])
+async def get_trending_stories(
+    window: str = Query("today", pattern="^(today|week)$"),
+    limit: int = Query(10, ge=1, le=database.LEADERBOARD_SIZE)
 ):
     """
-    获取阅读量最高的童话故事列表。
-    - **limit**: 返回的故事数量上限，默认为10。
+    获取时间窗口内阅读量最高的故事。
+    - **window**: today（今天，UTC）或 week（最近 7 天）。
+    - **limit**: 返回的故事数量上限，默认为10，最多为排行榜容量（LEADERBOARD_SIZE），超出时返回 422。
     """
-    popular_stories = db.query(database.Story)\
-        .order_by(desc(database.Story.read_count))\
-        .limit(limit)\
-        .all()
-    
-    if not popular_stories:
-        #  虽然技术上不是“未找到”，但如果没有故事，返回空列表是合适的。
-        #  或者可以考虑返回一个特定的消息或状态码，但这取决于API设计决策。
-        return [] 
-        # raise HTTPException(status_code=404, detail="No stories found to rank")
+    async def build() -> bytes:
+        return json_bytes(await database.leaderboard.top(limit, window=window))
 
-    return popular_stories
\ No newline at end of file
+    body = await database.response_cache.get_or_build(("trending", window, limit), ["ranking"], build)
+    return Response(content=body, media_type="application/json")
\ No newline at end of file
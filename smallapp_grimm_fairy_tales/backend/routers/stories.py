@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
+import json
 
 from .. import main as database  # Adjusted import path
 from ..models import story as story_models # Placeholder for Pydantic models
+from ..core import search
+from ..core.pagination import decode_cursor, encode_cursor
+from ..core.response_cache import json_bytes
 
 router = APIRouter(
     prefix="/stories",
@@ -36,56 +41,112 @@ class Story(StoryBase):
         orm_mode = True
 
 # API Endpoints for Stories
-@router.post("/", response_model=Story, status_code=status.HTTP_201_CREATED)
-async def create_story(story: StoryCreate, db: Session = Depends(database.get_db)):
-    db_story = database.Story(**story.dict())
-    db.add(db_story)
-    db.commit()
-    db.refresh(db_story)
-    return db_story
-
-@router.get("/", response_model=List[Story])
-async def read_stories(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    stories = db.query(database.Story).offset(skip).limit(limit).all()
-    return stories
-
-@router.get("/{story_id}", response_model=Story)
-async def read_story(story_id: int, db: Session = Depends(database.get_db)):
-    db_story = db.query(database.Story).filter(database.Story.id == story_id).first()
+async def get_story_or_404(db: AsyncSession, story_id: int) -> database.Story:
+    db_story = await db.get(database.Story, story_id)
     if db_story is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Story not found")
     return db_story
 
 @router.post("/", response_model=Story, status_code=status.HTTP_201_CREATED)
-async def create_story(story: StoryCreate, db: Session = Depends(database.get_db)):
+async def create_story(story: StoryCreate, db: AsyncSession = Depends(database.get_db)):
     db_story = database.Story(**story.dict())
     db.add(db_story)
-    db.commit()
-    db.refresh(db_story)
+    await db.flush()
+    await search.sync_story_search(db)
+    await db.commit()
+    await db.refresh(db_story)
+    database.leaderboard.add_story(db_story.id, db_story.read_count or 0)
+    database.response_cache.invalidate("ranking")
     return db_story
 
+# 列表只查询摘要字段，不读取正文
+SUMMARY_COLUMNS = [
+    database.Story.id, database.Story.title, database.Story.image_url,
+    database.Story.read_count, database.Story.created_at, database.Story.updated_at
+]
+
+@router.get("/", response_model=story_models.StoryPage)
+async def read_stories(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(database.get_db)
+):
+    """
+    按创建时间倒序分页获取故事摘要（不含正文）。
+    - **cursor**: 上一页返回的 next_cursor，为空时从最新的故事开始。
+    - **limit**: 每页数量，默认为20，最多100。
+    """
+    query = select(*SUMMARY_COLUMNS).order_by(database.Story.created_at.desc(), database.Story.id.desc())
+    if cursor:
+        created_at, story_id = decode_cursor(cursor, 2)
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        query = query.where(or_(
+            database.Story.created_at < created_at,
+            and_(database.Story.created_at == created_at, database.Story.id < story_id)
+        ))
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    items = [dict(row._mapping) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(items[-1]["created_at"].isoformat(), items[-1]["id"])
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/search", response_model=List[story_models.StorySearchResult])
+async def search_stories(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=50),
+    db: AsyncSession = Depends(database.get_db)
+):
+    """
+    在标题和正文中全文搜索故事（SQLite FTS5），按相关度排序。
+    - **q**: 关键词，多个关键词用空格分隔，需全部命中。
+    - **limit**: 返回数量，默认为20，最多50。
+    """
+    return await search.search_stories(db, q, limit=limit)
+
+async def story_body(db: AsyncSession, story_id: int) -> bytes:
+    """故事详情的 JSON 响应体（带缓存，由修改、删除与阅读量写入失效）"""
+    async def build() -> bytes:
+        db_story = await get_story_or_404(db, story_id)
+        # 响应字段与 stories 表的列一一对应
+        return json_bytes({column.key: getattr(db_story, column.key) for column in database.Story.__table__.columns})
+
+    return await database.response_cache.get_or_build(("story", story_id), [("story", story_id)], build)
+
+@router.get("/{story_id}", response_model=Story)
+async def read_story(story_id: int, db: AsyncSession = Depends(database.get_db)):
+    return Response(content=await story_body(db, story_id), media_type="application/json")
+
 @router.put("/{story_id}", response_model=Story)
-async def update_story(story_id: int, story: StoryUpdate, db: Session = Depends(database.get_db)):
-    db_story = db.query(database.Story).filter(database.Story.id == story_id).first()
-    if db_story is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Story not found")
+async def update_story(story_id: int, story: StoryUpdate, db: AsyncSession = Depends(database.get_db)):
+    db_story = await get_story_or_404(db, story_id)
     
     update_data = story.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_story, key, value)
     
     db_story.updated_at = datetime.utcnow() # Ensure datetime is imported and used
-    db.commit()
-    db.refresh(db_story)
+    await db.flush()
+    await search.sync_story_search(db)
+    await db.commit()
+    await db.refresh(db_story)
+    database.leaderboard.invalidate_story(story_id)
+    database.response_cache.invalidate("ranking", ("story", story_id))
     return db_story
 
 @router.delete("/{story_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_story(story_id: int, db: Session = Depends(database.get_db)):
-    db_story = db.query(database.Story).filter(database.Story.id == story_id).first()
-    if db_story is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Story not found")
-    db.delete(db_story)
-    db.commit()
+async def delete_story(story_id: int, db: AsyncSession = Depends(database.get_db)):
+    db_story = await get_story_or_404(db, story_id)
+    await db.execute(delete(database.StoryReadStat).where(database.StoryReadStat.story_id == story_id))
+    await db.delete(db_story)
+    await db.flush()
+    await search.sync_story_search(db)
+    await db.commit()
+    database.leaderboard.remove_story(story_id)
+    database.response_cache.invalidate("ranking", ("story", story_id))
     return
 
 # Ensure to add a health check or root endpoint if not present in main.py
@@ -94,11 +155,18 @@ async def delete_story(story_id: int, db: Session = Depends(database.get_db)):
 #     return {"status": "healthy"}
 
 @router.post("/{story_id}/read", response_model=Story)
-async def increment_read_count(story_id: int, db: Session = Depends(database.get_db)):
-    db_story = db.query(database.Story).filter(database.Story.id == story_id).first()
-    if db_story is None:
-        raise HTTPException(status_code=404, detail="Story not found")
-    db_story.read_count += 1
-    db.commit()
-    db.refresh(db_story)
-    return db_story
\ No newline at end of file
+async def increment_read_count(story_id: int, db: AsyncSession = Depends(database.get_db)):
+    """
+    记录一次阅读。阅读量先在内存中累加，由 read_counter 定期批量写入数据库；
+    返回的 read_count 已包含尚未写入的增量。
+    故事是否存在由内存排行榜判断，故事内容取自详情缓存，阅读本身不查询数据库。
+    """
+    if database.leaderboard.read_count(story_id) is None:
+        # 排行榜不认识的故事（例如由其他程序直接写入数据库的）查询一次后加入排行榜
+        db_story = await get_story_or_404(db, story_id)
+        database.leaderboard.add_story(story_id, (db_story.read_count or 0) + database.read_counter.pending(story_id))
+    database.read_counter.record(story_id)
+    database.leaderboard.record(story_id)
+    story = json.loads(await story_body(db, story_id))
+    story["read_count"] = database.leaderboard.read_count(story_id)
+    return Response(content=json_bytes(story), media_type="application/json")
\ No newline at end of file
@@ -1,12 +1,12 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-import shutil
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from typing import AsyncIterator, List
 import os
 from pathlib import Path
-from datetime import datetime
 
-from .. import main as database # For DB session if needed, though not directly for file saving
+from ..core.images import ImageStore
 from ..core.security import get_current_active_user # Optional: if uploads are user-specific
 
 router = APIRouter(
@@ -20,37 +20,108 @@ UPLOAD_DIR = Path(__file__).resolve().parent.parent / "static" / "images"
 # Ensure the upload directory exists
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# 单张图片的大小上限（字节），默认 10MB
+IMAGE_MAX_BYTES = int(os.environ.get("IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+# 图片以外的部分（边界、字段头、其他表单字段）允许的字节数
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# 单个字段头的长度上限
+MAX_PART_HEADER_BYTES = 8 * 1024
+image_store = ImageStore(
+    UPLOAD_DIR, "/static/images", max_bytes=IMAGE_MAX_BYTES,
+    workers=int(os.environ.get("IMAGE_WORKERS", "1")),
+)
+
+async def iter_multipart_file(request: Request, field_name: str = "file", max_body: int = IMAGE_MAX_BYTES + MULTIPART_OVERHEAD_BYTES) -> AsyncIterator[bytes]:
+    """边接收边解析 multipart 请求体，逐块产出 field_name 字段的文件内容（不整体缓存请求体）
+
+    其他字段的内容直接丢弃；请求体总长超过 max_body 时返回 413（没有 Content-Length 的分块上传也会被限制），
+    字段头超长时返回 400。
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    chunks: List[bytes] = []
+    state = {"header_field": b"", "headers": {}, "header_bytes": 0, "in_file": False, "found": False}
+
+    def count_header_bytes(size: int):
+        state["header_bytes"] += size
+        if state["header_bytes"] > MAX_PART_HEADER_BYTES:
+            raise HTTPException(status_code=400, detail="Multipart part headers are too large")
+
+    def on_part_begin():
+        state["headers"] = {}
+        state["header_bytes"] = 0
+
+    def on_header_field(data, start, end):
+        count_header_bytes(end - start)
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        count_header_bytes(end - start)
+        field = state["header_field"].lower()
+        state["headers"][field] = state["headers"].get(field, b"") + data[start:end]
+
+    def on_header_end():
+        state["header_field"] = b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        state["in_file"] = not state["found"] and disposition.get(b"name") == field_name.encode()
+        if state["in_file"]:
+            state["found"] = True
+            part_type = state["headers"].get(b"content-type", b"").decode("latin-1")
+            if not part_type.startswith("image/"):
+                raise HTTPException(status_code=400, detail="Invalid file type. Only images are allowed.")
+
+    def on_part_data(data, start, end):
+        if state["in_file"]:
+            chunks.append(data[start:end])
+
+    def on_part_end():
+        state["in_file"] = False
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin, "on_header_field": on_header_field, "on_header_value": on_header_value,
+        "on_header_end": on_header_end, "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data, "on_part_end": on_part_end,
+    })
+    received = 0
+    async for body in request.stream():
+        received += len(body)
+        if received > max_body:
+            raise HTTPException(status_code=413, detail=f"Image exceeds the {IMAGE_MAX_BYTES} byte limit")
+        try:
+            parser.write(body)
+        except FormParserError:
+            raise HTTPException(status_code=400, detail="Malformed multipart body")
+        if chunks:
+            yield b"".join(chunks)
+            chunks.clear()
+    try:
+        parser.finalize()
+    except FormParserError:
+        raise HTTPException(status_code=400, detail="Malformed multipart body")
+    if not state["found"]:
+        raise HTTPException(status_code=400, detail=f"Missing form field '{field_name}'")
+
 @router.post("/image/")
 async def upload_image(
-    file: UploadFile = File(...),
+    request: Request,
     # current_user: database.User = Depends(get_current_active_user) # Uncomment if auth is needed
 ):
     """
-    上传图片文件。
-    - **file**: 要上传的图片文件。
+    上传图片文件（multipart/form-data，字段名 file）。
+    - 请求体边接收边写盘，超过 IMAGE_MAX_BYTES 时返回 413。
+    - 文件按内容的 sha256 命名，重复上传同一图片只保存一份。
+    - 缩略图（thumbnail_url，最长边 320px）与 WebP 版本（webp_url）在后台生成，可能稍后才可访问。
     """
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="Invalid file type. Only images are allowed.")
-
-    try:
-        # Create a unique filename to avoid overwrites
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
-        filename = f"{timestamp}_{file.filename}"
-        file_path = UPLOAD_DIR / filename
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Construct the URL to access the file (adjust if your static files are served differently)
-        # This assumes static files are served from /static/images relative to the API base URL
-        file_url = f"/static/images/{filename}" 
-        
-        return JSONResponse(content={"filename": filename, "file_url": file_url}, status_code=201)
-    except Exception as e:
-        # Log the exception e for debugging
-        raise HTTPException(status_code=500, detail=f"Could not upload file: {e}")
-
-# Note: To serve these static files, you'll need to configure static file serving in your main.py
-# For example:
-# from fastapi.staticfiles import StaticFiles
-# app.mount("/static", StaticFiles(directory="backend/static"), name="static")
\ No newline at end of file
+    content_length = request.headers.get("content-length")
+    # multipart 的边界与字段头只占很少的字节，声明的长度明显超限时不必读取请求体
+    if content_length and content_length.isdigit() and int(content_length) > IMAGE_MAX_BYTES + MULTIPART_OVERHEAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Image exceeds the {IMAGE_MAX_BYTES} byte limit",
+        )
+    result = await image_store.save(iter_multipart_file(request))
+    return JSONResponse(content=result, status_code=201)
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import httpx
+import pytest
+from passlib.context import CryptContext
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.tests.helpers import DB_PATH  # noqa: E402
+
+# 应用在导入时按 DATABASE_URL 创建引擎，必须先指向临时数据库
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DB_PATH}"
+
+from backend import main  # noqa: E402
+from backend.core import security  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """每个测试使用一个新建的数据库，并经过应用的启动与关闭流程"""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
+    # 测试关注接口行为，密码哈希换成计算快的方案
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["sha256_crypt"], sha256_crypt__default_rounds=1000))
+    main.response_cache.clear()
+    security.token_cache.clear()
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+
@@ -0,0 +1,17 @@
+import os
+import tempfile
+
+# 测试用的数据库文件，每个测试开始前删除重建（见 conftest.client）
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="fairytales-test-"), "test.db")
+
+
+async def create_story(client, title="青蛙王子", content="公主的金球掉进了井里"):
+    response = await client.post("/stories/", json={"title": title, "content": content})
+    assert response.status_code == 201
+    return response.json()
+
+
+async def auth_headers(client, username="hans", password="secret"):
+    assert (await client.post("/register", json={"username": username, "password": password})).status_code == 201
+    response = await client.post("/token", data={"username": username, "password": password})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,50 @@
+import pytest
+
+from backend.core import security
+from backend.core.token_cache import TokenCache
+
+from .helpers import auth_headers
+
+pytestmark = pytest.mark.anyio
+
+
+def test_evicts_least_recently_used():
+    cache = TokenCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats["evicted"] == 1
+
+
+def test_entries_expire_with_ttl_or_token_exp(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("backend.core.token_cache.time.time", lambda: now[0])
+    cache = TokenCache(ttl=60)
+    cache.set("long", 1, exp=now[0] + 3600)
+    cache.set("short", 2, exp=now[0] + 10)
+    now[0] += 11
+    assert cache.get("short") is None
+    assert cache.get("long") == 1
+    now[0] += 50
+    assert cache.get("long") is None
+    assert cache.stats["expired"] == 2
+
+
+async def test_current_user_is_served_from_cache(client, monkeypatch):
+    headers = await auth_headers(client)
+    assert (await client.get("/users/me", headers=headers)).json()["username"] == "hans"
+    hits = security.token_cache.stats["hit"]
+
+    def no_decode(*args, **kwargs):
+        raise AssertionError("cached tokens are not decoded again")
+    monkeypatch.setattr(security.jwt, "decode", no_decode)
+    assert (await client.get("/users/me", headers=headers)).json()["username"] == "hans"
+    assert security.token_cache.stats["hit"] == hits + 1
+
+
+async def test_invalid_token_is_rejected(client):
+    response = await client.get("/users/me", headers={"Authorization": "Bearer not-a-jwt"})
+    assert response.status_code == 401
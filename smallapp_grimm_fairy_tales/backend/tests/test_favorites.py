@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from backend import main
+from backend.routers.favorites import MAX_CHECK_IDS
+
+from .helpers import auth_headers, create_story
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_bulk_check_returns_only_own_favorites(client):
+    headers = await auth_headers(client)
+    other = await auth_headers(client, username="grete")
+    stories = [(await create_story(client, title=f"故事{i}"))["id"] for i in range(3)]
+    await client.post("/favorites/", json={"story_id": stories[0]}, headers=headers)
+    await client.post("/favorites/", json={"story_id": stories[2]}, headers=other)
+
+    response = await client.post("/favorites/check", json={"story_ids": stories + [stories[0], 999]}, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == [stories[0]]
+    assert (await client.post("/favorites/check", json={"story_ids": []}, headers=headers)).json() == []
+    response = await client.post("/favorites/check", json={"story_ids": list(range(MAX_CHECK_IDS + 1))}, headers=headers)
+    assert response.status_code == 400
+
+
+async def test_duplicate_favorite_is_rejected(client):
+    headers = await auth_headers(client)
+    story = await create_story(client)
+    assert (await client.post("/favorites/", json={"story_id": story["id"]}, headers=headers)).status_code == 201
+    response = await client.post("/favorites/", json={"story_id": story["id"]}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Story already in favorites"
+
+
+async def test_unique_index_blocks_concurrent_duplicates(client):
+    headers = await auth_headers(client)
+    story = await create_story(client)
+    await client.post("/favorites/", json={"story_id": story["id"]}, headers=headers)
+    user_id = (await client.get("/users/me", headers=headers)).json()["id"]
+    async with main.AsyncSessionLocal() as db:
+        with pytest.raises(IntegrityError):
+            await db.execute(insert(main.Favorite).values(user_id=user_id, story_id=story["id"]))
+
+
+async def test_listing_includes_deleted_stories(client):
+    headers = await auth_headers(client)
+    kept, deleted = (await create_story(client, title="留下")), (await create_story(client, title="删除"))
+    for story in (kept, deleted):
+        await client.post("/favorites/", json={"story_id": story["id"]}, headers=headers)
+    await client.delete(f"/stories/{deleted['id']}")
+
+    items = (await client.get("/favorites/", params={"include_story": "true"}, headers=headers)).json()["items"]
+    assert [(item["story_id"], item["story"] and item["story"]["title"]) for item in items] == [(deleted["id"], None), (kept["id"], "留下")]
+    assert "content" not in items[1]["story"]
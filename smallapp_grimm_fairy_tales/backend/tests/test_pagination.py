@@ -0,0 +1,53 @@
+import pytest
+
+from backend.core.pagination import encode_cursor
+
+from .helpers import auth_headers, create_story
+
+pytestmark = pytest.mark.anyio
+
+
+async def collect_pages(client, url, limit, **kwargs):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get(url, params=params, **kwargs)).json()
+        ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+async def test_story_pages_cover_all_without_content(client):
+    created = [(await create_story(client, title=f"故事{i}"))["id"] for i in range(5)]
+    assert await collect_pages(client, "/stories/", 2) == created[::-1]
+    page = (await client.get("/stories/", params={"limit": 5})).json()
+    assert page["next_cursor"] is None
+    assert "content" not in page["items"][0]
+
+
+async def test_cursor_of_deleted_story_still_continues(client):
+    created = [(await create_story(client, title=f"故事{i}"))["id"] for i in range(4)]
+    page = (await client.get("/stories/", params={"limit": 2})).json()
+    # 游标指向的故事被删除后，仍从它的位置继续
+    await client.delete(f"/stories/{page['items'][-1]['id']}")
+    rest = (await client.get("/stories/", params={"limit": 2, "cursor": page["next_cursor"]})).json()
+    assert [item["id"] for item in rest["items"]] == created[1::-1]
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor("2024-01-01T00:00:00"), encode_cursor("yesterday", 1), "W10"])
+async def test_invalid_story_cursor_returns_400(client, cursor):
+    response = await client.get("/stories/", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+async def test_favorite_pages(client):
+    headers = await auth_headers(client)
+    story_ids = [(await create_story(client, title=f"故事{i}"))["id"] for i in range(3)]
+    for story_id in story_ids:
+        await client.post("/favorites/", json={"story_id": story_id}, headers=headers)
+    favorite_ids = await collect_pages(client, "/favorites/", 2, headers=headers)
+    assert len(favorite_ids) == 3 and favorite_ids == sorted(favorite_ids, reverse=True)
+    response = await client.get("/favorites/", params={"cursor": encode_cursor(1, 2)}, headers=headers)
+    assert response.status_code == 400
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from backend.core import security
+from backend.core.password_hasher import PasswordHasher
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_rejects_with_503_when_saturated():
+    hasher = PasswordHasher(max_workers=1, max_pending=2)
+    release = threading.Event()
+    running = [asyncio.create_task(hasher.run("hash", release.wait)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as error:
+        await hasher.run("hash", lambda: None)
+    assert error.value.status_code == 503
+    assert error.value.headers["Retry-After"] == "1"
+    assert hasher.info()["rejected"] == 1
+
+    release.set()
+    await asyncio.gather(*running)
+    assert await hasher.run("hash", lambda: "done") == "done"
+    assert hasher.info()["operations"]["hash"]["count"] == 3
+
+
+async def test_login_returns_503_when_hasher_is_busy(client, monkeypatch):
+    await client.post("/register", json={"username": "hans", "password": "secret"})
+    monkeypatch.setattr(security, "password_hasher", PasswordHasher(max_workers=1, max_pending=0))
+    response = await client.post("/token", data={"username": "hans", "password": "secret"})
+    assert response.status_code == 503
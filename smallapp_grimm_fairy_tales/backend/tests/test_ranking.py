@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+import pytest
+
+from backend import main
+from backend.core.leaderboard import Leaderboard
+
+from .helpers import create_story
+
+pytestmark = pytest.mark.anyio
+
+
+async def read(client, story_id, times):
+    for _ in range(times):
+        await client.post(f"/stories/{story_id}/read")
+
+
+async def test_popular_follows_reads(client):
+    stories = [await create_story(client, title=f"故事{i}") for i in range(3)]
+    await read(client, stories[1]["id"], 3)
+    await read(client, stories[2]["id"], 1)
+
+    response = await client.get("/ranking/popular", params={"limit": 2})
+    assert [(story["id"], story["read_count"]) for story in response.json()] == [(stories[1]["id"], 3), (stories[2]["id"], 1)]
+
+    # 阅读量写入数据库时排行榜的响应缓存失效
+    await read(client, stories[2]["id"], 3)
+    await main.read_counter.flush()
+    response = await client.get("/ranking/popular", params={"limit": 2})
+    assert [story["id"] for story in response.json()] == [stories[2]["id"], stories[1]["id"]]
+
+
+async def test_limit_above_leaderboard_size_is_rejected(client):
+    assert (await client.get("/ranking/popular", params={"limit": main.LEADERBOARD_SIZE + 1})).status_code == 422
+    assert (await client.get("/ranking/trending", params={"limit": 0})).status_code == 422
+
+
+async def test_trending_buckets_roll_over_and_survive_reload(client, monkeypatch):
+    story = await create_story(client)
+    await read(client, story["id"], 2)
+    response = await client.get("/ranking/trending", params={"window": "today"})
+    assert [(item["id"], item["period_read_count"]) for item in response.json()] == [(story["id"], 2)]
+
+    # 分桶随阅读量写回持久化，重新加载后仍在
+    await main.read_counter.flush()
+    await main.leaderboard.load()
+    assert [item["period_read_count"] for item in await main.leaderboard.top(10, window="week")] == [2]
+
+    # 不复用上次计算的时间窗口榜单
+    monkeypatch.setattr(main.leaderboard, "window_ttl", 0)
+    tomorrow = Leaderboard._today() + timedelta(days=1)
+    monkeypatch.setattr(Leaderboard, "_today", staticmethod(lambda: tomorrow))
+    assert await main.leaderboard.top(10, window="today") == []
+    assert [item["period_read_count"] for item in await main.leaderboard.top(10, window="week")] == [2]
+
+    # 超出 7 天的分桶被淘汰
+    later = tomorrow + timedelta(days=main.leaderboard.window_days)
+    monkeypatch.setattr(Leaderboard, "_today", staticmethod(lambda: later))
+    assert await main.leaderboard.top(10, window="week") == []
+    assert [item["read_count"] for item in await main.leaderboard.top(10)] == [2]
+
+
+async def test_deleted_story_leaves_rankings(client):
+    story = await create_story(client)
+    await read(client, story["id"], 1)
+    await client.delete(f"/stories/{story['id']}")
+    assert (await client.get("/ranking/popular")).json() == []
+    assert (await client.get("/ranking/trending", params={"window": "week"})).json() == []
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import select
+
+from backend import main
+
+from .helpers import create_story
+
+pytestmark = pytest.mark.anyio
+
+
+async def stored_read_count(story_id):
+    async with main.AsyncSessionLocal() as db:
+        return await db.scalar(select(main.Story.read_count).where(main.Story.id == story_id))
+
+
+async def test_reads_are_counted_in_memory_until_flush(client):
+    story = await create_story(client)
+    for expected in range(1, 4):
+        response = await client.post(f"/stories/{story['id']}/read")
+        assert response.json()["read_count"] == expected
+    assert main.read_counter.pending(story["id"]) == 3
+    assert await stored_read_count(story["id"]) == 0
+
+    assert await main.read_counter.flush() == 1
+    assert main.read_counter.pending(story["id"]) == 0
+    assert await stored_read_count(story["id"]) == 3
+    # 写入后详情缓存失效，读到的是数据库中的新值
+    assert (await client.get(f"/stories/{story['id']}")).json()["read_count"] == 3
+
+
+async def test_failed_flush_keeps_deltas(client, monkeypatch):
+    story = await create_story(client)
+    await client.post(f"/stories/{story['id']}/read")
+
+    class LockedEngine:
+        def begin(self):
+            raise RuntimeError("database is locked")
+    monkeypatch.setattr(main.read_counter, "engine", LockedEngine())
+    with pytest.raises(RuntimeError):
+        await main.read_counter.flush()
+    assert main.read_counter.pending(story["id"]) == 1
+
+    monkeypatch.undo()
+    await main.read_counter.flush()
+    assert await stored_read_count(story["id"]) == 1
+
+
+async def test_read_of_missing_story_returns_404(client):
+    assert (await client.post("/stories/999/read")).status_code == 404
+    assert main.read_counter.pending(999) == 0
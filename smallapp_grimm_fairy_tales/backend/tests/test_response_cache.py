@@ -0,0 +1,61 @@
+import pytest
+
+from backend import main
+from backend.core.response_cache import ResponseCache
+
+from .helpers import create_story
+
+pytestmark = pytest.mark.anyio
+
+
+def builder(body, calls):
+    async def build():
+        calls.append(body)
+        return body
+    return build
+
+
+async def test_invalidate_removes_only_tagged_entries():
+    cache, calls = ResponseCache(), []
+    await cache.get_or_build(("story", 1), [("story", 1)], builder(b"1", calls))
+    await cache.get_or_build(("story", 2), [("story", 2)], builder(b"2", calls))
+    await cache.get_or_build("popular", ["ranking"], builder(b"p", calls))
+
+    assert cache.invalidate(("story", 1), "ranking") == 2
+    assert cache.get(("story", 2)) == b"2"
+    assert cache.get(("story", 1)) is None and cache.get("popular") is None
+
+
+async def test_build_racing_an_invalidation_is_not_stored():
+    cache = ResponseCache()
+
+    async def build():
+        # 构建期间故事被修改
+        cache.invalidate(("story", 1))
+        return b"old"
+    assert await cache.get_or_build(("story", 1), [("story", 1)], build) == b"old"
+    assert cache.get(("story", 1)) is None
+    assert cache.stats["stale_build"] == 1
+
+
+async def test_size_limit_evicts_least_recently_used():
+    cache, calls = ResponseCache(max_bytes=10), []
+    await cache.get_or_build("a", [], builder(b"aaaa", calls))
+    await cache.get_or_build("b", [], builder(b"bbbb", calls))
+    cache.get("a")
+    await cache.get_or_build("c", [], builder(b"cccc", calls))
+    assert cache.get("b") is None and cache.get("a") == b"aaaa"
+    assert cache.info()["bytes"] <= 10
+
+
+async def test_story_detail_is_cached_until_changed(client):
+    story = await create_story(client)
+    await client.get(f"/stories/{story['id']}")
+    hits = main.response_cache.stats["hit"]
+    await client.get(f"/stories/{story['id']}")
+    assert main.response_cache.stats["hit"] == hits + 1
+
+    await client.put(f"/stories/{story['id']}", json={"title": "青蛙国王"})
+    assert (await client.get(f"/stories/{story['id']}")).json()["title"] == "青蛙国王"
+    await client.delete(f"/stories/{story['id']}")
+    assert (await client.get(f"/stories/{story['id']}")).status_code == 404
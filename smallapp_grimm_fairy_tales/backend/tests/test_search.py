@@ -0,0 +1,61 @@
+import sqlite3
+
+import pytest
+
+from .helpers import DB_PATH, create_story
+
+pytestmark = pytest.mark.anyio
+
+
+async def search(client, query):
+    response = await client.get("/stories/search", params={"q": query})
+    assert response.status_code == 200
+    return response.json()
+
+
+async def titles(client, query):
+    return [story["title"] for story in await search(client, query)]
+
+
+async def test_long_and_short_terms(client):
+    await create_story(client, "青蛙王子", "公主的金球掉进了井里。Oxford 的青蛙")
+    await create_story(client, "小红帽", "外婆住在森林里，大灰狼来了")
+
+    assert await titles(client, "金球掉进") == ["青蛙王子"]
+    assert await titles(client, "公主") == ["青蛙王子"]
+    assert await titles(client, "狼") == ["小红帽"]
+    assert await titles(client, "ox") == ["青蛙王子"]
+    assert await titles(client, "金球 青蛙王子") == ["青蛙王子"]
+    assert await titles(client, "森林 公主") == []
+
+
+async def test_highlight_is_escaped(client):
+    await create_story(client, "<b>公主</b>", "公主")
+    result = (await search(client, "公主"))[0]
+    assert result["title_highlight"] == "&lt;b&gt;<mark>公主</mark>&lt;/b&gt;"
+    assert "<mark>公主</mark>" in result["snippet"]
+
+
+async def test_index_follows_updates_and_deletes(client):
+    frog = await create_story(client, "青蛙王子", "公主的金球")
+    hood = await create_story(client, "小红帽", "大灰狼")
+    await client.put(f"/stories/{hood['id']}", json={"title": "小红帽与公主", "content": "外婆"})
+    assert await titles(client, "狼") == []
+    # 标题命中的权重更高
+    assert await titles(client, "公主") == ["小红帽与公主", "青蛙王子"]
+    await client.delete(f"/stories/{frog['id']}")
+    assert await titles(client, "金球") == []
+    assert await titles(client, "公主") == ["小红帽与公主"]
+
+
+async def test_rows_written_by_other_programs_are_indexed(client):
+    # 其他程序（sqlite3 命令行、导入脚本）写库时没有应用注册的函数，触发器只能用内置 SQL
+    connection = sqlite3.connect(DB_PATH)
+    connection.execute(
+        "INSERT INTO stories(title, content, read_count, created_at, updated_at) "
+        "VALUES ('灰姑娘', '水晶鞋', 0, '2024-01-01', '2024-01-01')"
+    )
+    connection.commit()
+    connection.close()
+    assert await titles(client, "鞋") == ["灰姑娘"]
+    assert await titles(client, "水晶鞋") == ["灰姑娘"]
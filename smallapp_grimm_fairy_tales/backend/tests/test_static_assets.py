@@ -0,0 +1,73 @@
+import gzip
+import os
+
+import pytest
+from starlette.datastructures import Headers
+
+from backend import main
+from backend.core.static_assets import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, Asset, brotli
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def static_file():
+    created = set()
+
+    def write(name, body):
+        path = os.path.join(main.STATIC_DIR, name)
+        with open(path, "wb") as f:
+            f.write(body)
+        created.add(path)
+        return f"/static/{name}"
+    yield write
+    for path in created:
+        os.remove(path)
+
+
+def test_asset_keeps_only_smaller_variants():
+    asset = Asset(b"once upon a time " * 100, "text/html; charset=utf-8")
+    assert set(asset.variants) == {"identity", "gzip"} | ({"br"} if brotli else set())
+    assert gzip.decompress(asset.variants["gzip"]) == b"once upon a time " * 100
+    assert set(Asset(os.urandom(1024), "text/plain").variants) == {"identity"}
+    assert set(Asset(b"x" * 100, "text/plain").variants) == {"identity"}
+
+
+def test_encoding_negotiation_and_etags():
+    asset = Asset(b"<p>hello</p>" * 100, "text/html")
+    gzipped = asset.response(Headers({"accept-encoding": "br;q=0, gzip"}), REVALIDATE_CACHE_CONTROL)
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["etag"] == f'"{asset.etag}-gzip"'
+    plain = asset.response(Headers({}), REVALIDATE_CACHE_CONTROL)
+    assert "content-encoding" not in plain.headers and plain.headers["etag"] == f'"{asset.etag}"'
+    assert plain.headers["vary"] == "Accept-Encoding"
+    # 不同编码的 ETag 不能互相匹配
+    assert asset.response(Headers({"if-none-match": plain.headers["etag"], "accept-encoding": "gzip"}), "").status_code == 200
+
+
+async def test_screen_is_precompressed_and_revalidated(client):
+    response = await client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+    assert "<html" in response.text.lower()
+
+    response = await client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+async def test_static_files_cache_headers(client, static_file):
+    css = static_file("theme.css", b"body { color: #333; }\n" * 100)
+    response = await client.get(css, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+    assert (await client.get(css, headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})).status_code == 304
+
+    # 文件内容变化后 ETag 随之变化
+    static_file("theme.css", b"body { color: black; }\n" * 100)
+    changed = await client.get(css, headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert changed.status_code == 200 and changed.headers["etag"] != response.headers["etag"]
+
+    hashed = static_file("app.0123456789abcdef0123.js", b"console.log(1);")
+    assert (await client.get(hashed)).headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
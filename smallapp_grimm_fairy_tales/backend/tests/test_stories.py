@@ -0,0 +1,27 @@
+import pytest
+
+from .helpers import create_story
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_story_crud(client):
+    story = await create_story(client)
+    assert story["read_count"] == 0
+
+    response = await client.get(f"/stories/{story['id']}")
+    assert response.status_code == 200
+    assert response.json()["title"] == "青蛙王子"
+
+    response = await client.put(f"/stories/{story['id']}", json={"title": "青蛙国王"})
+    assert response.status_code == 200
+    assert response.json()["content"] == "公主的金球掉进了井里"
+
+    assert (await client.delete(f"/stories/{story['id']}")).status_code == 204
+    assert (await client.get(f"/stories/{story['id']}")).status_code == 404
+
+
+async def test_missing_story_returns_404(client):
+    assert (await client.get("/stories/999")).status_code == 404
+    assert (await client.put("/stories/999", json={"title": "x"})).status_code == 404
+    assert (await client.delete("/stories/999")).status_code == 404
@@ -0,0 +1,64 @@
+import io
+
+import pytest
+from PIL import Image
+
+from backend.routers import uploads
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def image_root(monkeypatch, tmp_path):
+    monkeypatch.setattr(uploads.image_store, "root", tmp_path)
+    return tmp_path
+
+
+def png_bytes(size=(40, 30)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+async def upload(client, data, content_type="image/png", field="file"):
+    return await client.post("/upload/image/", files={field: ("picture.png", data, content_type)})
+
+
+async def test_upload_is_content_addressed(client, image_root):
+    data = png_bytes()
+    response = await upload(client, data)
+    assert response.status_code == 201
+    result = response.json()
+    assert (result["width"], result["height"], result["size"]) == (40, 30, len(data))
+    assert result["filename"] == f"{result['sha256']}.png"
+    assert (image_root / result["filename"]).read_bytes() == data
+    assert (image_root / result["filename"]).stat().st_mode & 0o777 == 0o644
+    assert not result["duplicate"]
+    assert (await upload(client, data)).json()["duplicate"]
+
+
+async def test_non_image_types_are_rejected(client, image_root):
+    assert (await upload(client, b"hello", content_type="text/plain")).status_code == 400
+    # 声明为图片但内容不是图片
+    assert (await upload(client, b"not really a png", content_type="image/png")).status_code == 400
+    assert list(image_root.iterdir()) == []
+
+
+async def test_oversized_uploads_are_rejected(client, image_root, monkeypatch):
+    monkeypatch.setattr(uploads.image_store, "max_bytes", 1024)
+    assert (await upload(client, png_bytes((400, 400)))).status_code == 413
+    assert list(image_root.iterdir()) == []
+
+    # 声明的长度明显超限时不读取请求体
+    monkeypatch.setattr(uploads, "IMAGE_MAX_BYTES", 1024)
+    data = b"x" * (uploads.MULTIPART_OVERHEAD_BYTES + 2048)
+    assert (await upload(client, data)).status_code == 413
+
+
+async def test_malformed_multipart_is_rejected(client, image_root):
+    assert (await upload(client, png_bytes(), field="image")).status_code == 400
+    response = await client.post("/upload/image/", content=b"{}", headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+    huge_header = b"--b\r\nX-Padding: " + b"a" * (uploads.MAX_PART_HEADER_BYTES + 1) + b"\r\n\r\ndata\r\n--b--\r\n"
+    response = await client.post("/upload/image/", content=huge_header, headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 400